@@ -1,4 +1,4 @@
-from vnmc.logics.ltl import X, AP, G, Implies
+from vnmc.logics.ltl.utils import X, AP, G, Implies
 from vnmc.model_checking.ltl_model_checking import model_check_ltl
 from vnmc.timp.parser import imp_parser, TIMPTransformer
 
@@ -14,5 +14,11 @@ result, cex = model_check_ltl(module=module, phi=phi)
 print(f"Model checking result: {result}")
 
 if not result:
-    for config in cex:
+    # The counterexample is a lasso: the stem is followed by the cycle, which repeats forever
+    stem, cycle = cex
+    print("Stem:")
+    for config in stem:
+        print(str(config))
+    print("Cycle:")
+    for config in cycle:
         print(str(config))
\ No newline at end of file
@@ -0,0 +1,84 @@
+import itertools
+import random
+
+import pytest
+
+from vnmc.common.bdd import BDD
+
+
+def manager(names):
+    bdd = BDD()
+    for name in names:
+        bdd.add_var(name)
+    return bdd
+
+
+def assignments(names):
+    for values in itertools.product([False, True], repeat=len(names)):
+        yield dict(zip(names, values))
+
+
+def random_function(bdd, names, rng, depth=4):
+    """
+    Builds a random BDD together with the Python predicate it represents
+    """
+    if depth == 0 or rng.random() < 0.2:
+        name = rng.choice(names)
+        return bdd.var(name), lambda a: a[name]
+    (u, f), (v, g) = random_function(bdd, names, rng, depth - 1), random_function(bdd, names, rng, depth - 1)
+    op = rng.randrange(4)
+    if op == 0:
+        return bdd.conj(u, v), lambda a: f(a) and g(a)
+    if op == 1:
+        return bdd.disj(u, v), lambda a: f(a) or g(a)
+    if op == 2:
+        return bdd.iff(u, v), lambda a: f(a) == g(a)
+    return bdd.neg(u), lambda a: not f(a)
+
+
+def test_apply_agrees_with_truth_tables():
+    names = ["a", "b", "c", "d"]
+    bdd, rng = manager(names), random.Random(0)
+    for _ in range(100):
+        u, f = random_function(bdd, names, rng)
+        assert all(bdd.evaluate(u, a) == f(a) for a in assignments(names))
+        assert bdd.sat_count(u, range(len(names))) == sum(f(a) for a in assignments(names))
+
+
+def test_nodes_are_canonical():
+    bdd = manager(["a", "b"])
+    a, b = bdd.var("a"), bdd.var("b")
+    assert bdd.disj(bdd.conj(a, b), bdd.conj(a, bdd.neg(b))) == a
+    assert bdd.neg(bdd.conj(a, b)) == bdd.disj(bdd.neg(a), bdd.neg(b))
+    assert bdd.conj(a, bdd.neg(a)) == BDD.FALSE
+    assert bdd.disj(a, bdd.neg(a)) == BDD.TRUE
+
+
+def test_exists_and_and_exists():
+    names = ["a", "b", "c", "d"]
+    bdd, rng = manager(names), random.Random(1)
+    levels = frozenset({bdd.name_to_level["b"], bdd.name_to_level["d"]})
+    for _ in range(100):
+        (u, f), (v, g) = random_function(bdd, names, rng), random_function(bdd, names, rng)
+        expected = {(a["a"], a["c"]) for a in assignments(names) if f(a) and g(a)}
+        for result in [bdd.exists(bdd.conj(u, v), levels), bdd.and_exists(u, v, levels)]:
+            assert {(a["a"], a["c"]) for a in assignments(names) if bdd.evaluate(result, a)} == expected
+
+
+def test_rename_between_interleaved_copies():
+    names = ["a", "a'", "b", "b'", "c", "c'"]
+    bdd, rng = manager(names), random.Random(2)
+    to_next = {bdd.name_to_level[x]: bdd.name_to_level[f"{x}'"] for x in "abc"}
+    for _ in range(50):
+        u, f = random_function(bdd, ["a", "b", "c"], rng)
+        renamed = bdd.rename(u, to_next)
+        for a in assignments(names):
+            assert bdd.evaluate(renamed, a) == f({x: a[f"{x}'"] for x in "abc"})
+        assert bdd.rename(renamed, {n: c for c, n in to_next.items()}) == u
+
+
+def test_rename_rejects_order_violations():
+    bdd = manager(["a", "b", "c"])
+    u = bdd.conj(bdd.var("a"), bdd.var("b"))
+    with pytest.raises(ValueError):
+        bdd.rename(u, {0: 2})
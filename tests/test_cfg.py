@@ -0,0 +1,47 @@
+from vnmc.logics.ctl import ctl_factory as ctl
+from vnmc.logics.ltl import utils as ltl
+from vnmc.model_checking.ctl_model_checking import model_check_ctl
+from vnmc.model_checking.ltl_model_checking import model_check_ltl
+from vnmc.timp.cfg import compile_module
+from vnmc.timp.parser import TIMPTransformer, imp_parser
+
+
+def parse(source):
+    return TIMPTransformer().transform(imp_parser.parse(source))
+
+
+DEAD_REPEAT_SKIP = """module test:
+    x = false
+    if x then
+        repeat
+            skip
+        endrepeat
+    else
+        skip @a
+    endif"""
+
+LIVE_REPEAT_SKIP = """module test:
+    x = true
+    repeat
+        skip @a
+    endrepeat"""
+
+
+def test_dead_repeat_skip_compiles():
+    module = parse(DEAD_REPEAT_SKIP)
+    cfg = compile_module(module)
+    assert len(cfg.locations) > 1
+    assert model_check_ltl(module, ltl.AP("a"))[0] is False
+    assert model_check_ltl(module, ltl.F(ltl.AP("a")))[0] is True
+    assert model_check_ctl(module, ctl.AP("a")) is False
+    assert model_check_ctl(module, ctl.AF(ctl.AP("a"))) is True
+
+
+def test_repeat_skip_is_a_self_loop_location():
+    module = parse(LIVE_REPEAT_SKIP)
+    cfg = compile_module(module)
+    key = cfg.get_successors(cfg.initial)[0]
+    assert cfg.get_successors(key) == [key]
+    assert cfg.get_annotations(key) == {"a"}
+    assert model_check_ltl(module, ltl.F(ltl.G(ltl.AP("a"))))[0] is True
+    assert model_check_ctl(module, ctl.AF(ctl.AG(ctl.AP("a")))) is True
@@ -0,0 +1,72 @@
+from vnmc.logics.ctl.ctl_factory import AP, And, AG, EF, EG, EX, Implies, Neg, Or
+from vnmc.model_checking.ctl_model_checking import VectorizedCTLModelChecker
+from vnmc.model_checking.kripke import KripkeStructure
+
+
+def kripke_structure():
+    """
+    s0 -> s1 -> s2 -> s2 and s0 -> s3 -> s0, where a holds in s2 and b holds in s0 and s3
+    """
+    kripke = KripkeStructure()
+    s0 = kripke.create_state("s0", atomic_propositions={AP("b")})
+    s1 = kripke.create_state("s1", atomic_propositions=set())
+    s2 = kripke.create_state("s2", atomic_propositions={AP("a")})
+    s3 = kripke.create_state("s3", atomic_propositions={AP("b")})
+    for source, target in [(s0, s1), (s1, s2), (s2, s2), (s0, s3), (s3, s0)]:
+        kripke.create_transition(source, target)
+    kripke.initial_states.add(s0)
+    return kripke, [s0, s1, s2, s3]
+
+
+def check(kripke, phi):
+    checker = VectorizedCTLModelChecker(kripke, record_evidence=True)
+    return checker, phi.accept(checker)
+
+
+def test_witness_of_conjunction_explains_both_temporal_operands():
+    kripke, (s0, s1, s2, s3) = kripke_structure()
+    phi = And(EF(AP("a")), EG(AP("b")))
+    checker, result = check(kripke, phi)
+    assert result[s0.state_id]
+
+    witness = checker.get_witness(phi, s0)
+    assert witness.holds and witness.stem == [s0] and witness.cycle == []
+    eventually, globally = witness.children
+    assert eventually.formula == EF(AP("a"))
+    assert eventually.stem == [s0, s1, s2] and eventually.cycle == []
+    assert eventually.children[0].formula == AP("a") and eventually.children[0].state == s2
+    assert globally.formula == EG(AP("b"))
+    assert globally.stem == [] and globally.cycle == [s0, s3]
+
+
+def test_counterexample_of_disjunction_explains_both_universal_operands():
+    kripke, (s0, s1, s2, s3) = kripke_structure()
+    # AG b fails via s1 and AG(a -> EX b) fails via s2, whose only successor violates b
+    phi = Or(AG(AP("b")), AG(Implies(AP("a"), EX(AP("b")))))
+    checker, result = check(kripke, phi)
+    assert not result[s0.state_id]
+
+    counterexample = checker.get_counterexample(phi, s0)
+    assert not counterexample.holds
+    first, second = counterexample.children
+    # The counterexample of AG psi is a witness of EF not psi
+    assert first.holds and first.stem == [s0, s1]
+    assert second.holds and second.stem == [s0, s1, s2]
+
+
+def test_counterexample_of_conjunction_explains_violated_operand():
+    kripke, (s0, s1, s2, s3) = kripke_structure()
+    phi = And(EF(AP("a")), Neg(EF(AP("a"))))
+    checker, result = check(kripke, phi)
+    counterexample = checker.get_counterexample(phi, s0)
+    assert [child.formula for child in counterexample.children] == [EF(AP("a"))]
+    assert counterexample.children[0].holds and counterexample.children[0].stem[-1] == s2
+
+
+def test_transitions_are_cached_until_modified():
+    kripke, (s0, s1, s2, s3) = kripke_structure()
+    transitions = kripke.transitions
+    assert kripke.transitions is transitions
+    assert {(t.source, t.target) for t in transitions} == {(s0, s1), (s1, s2), (s2, s2), (s0, s3), (s3, s0)}
+    kripke.create_transition(s1, s0)
+    assert (s1, s0) in {(t.source, t.target) for t in kripke.transitions}
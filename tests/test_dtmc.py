@@ -0,0 +1,66 @@
+import pytest
+
+from vnmc.logics.pctl.pctl_factory import AP
+from vnmc.probabilistic import DTMC
+
+ENGINES = ["sparse", "dense", "dense-numba"]
+
+
+def dtmc_with_two_bsccs(engine):
+    """
+    s0 moves to the BSCC {s1, s3} with probability 1/4 and to the BSCC {s2} with probability 3/4, where s1 -> s3,
+    s3 -> s1 and s3 -> s3 with probability 1/2 each, hence the stationary distribution of {s1, s3} is (1/3, 2/3)
+    """
+    dtmc = DTMC()
+    s0 = dtmc.create_state("s0")
+    s1 = dtmc.create_state("s1")
+    s2 = dtmc.create_state("s2", atomic_propositions={AP("b")})
+    s3 = dtmc.create_state("s3", atomic_propositions={AP("a")})
+    dtmc.create_transition(s0, 0.25, s1)
+    dtmc.create_transition(s0, 0.75, s2)
+    dtmc.create_transition(s1, 1, s3)
+    dtmc.create_transition(s3, 0.5, s1)
+    dtmc.create_transition(s3, 0.5, s3)
+    dtmc.create_transition(s2, 1, s2)
+    dtmc.build(engine=engine)
+    return dtmc, [s0, s1, s2, s3]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_steady_state_distribution_weights_every_bscc(engine):
+    dtmc, (s0, s1, s2, s3) = dtmc_with_two_bsccs(engine)
+    distribution = dtmc.compute_steady_state_distribution({s0: 1})
+    assert s0 not in distribution
+    assert distribution[s1] == pytest.approx(1 / 12)
+    assert distribution[s2] == pytest.approx(3 / 4)
+    assert distribution[s3] == pytest.approx(1 / 6)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_steady_state_distribution_of_initial_distribution(engine):
+    dtmc, (s0, s1, s2, s3) = dtmc_with_two_bsccs(engine)
+    distribution = dtmc.compute_steady_state_distribution({s0: 0.5, s3: 0.5})
+    assert distribution[s1] == pytest.approx(0.5 / 12 + 0.5 / 3)
+    assert distribution[s2] == pytest.approx(0.5 * 3 / 4)
+    assert distribution[s3] == pytest.approx(0.5 / 6 + 0.5 * 2 / 3)
+    assert sum(distribution.values()) == pytest.approx(1)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_long_run_probabilities(engine):
+    dtmc, (s0, s1, s2, s3) = dtmc_with_two_bsccs(engine)
+    probabilities = dtmc.compute_long_run_probabilities({s3})
+    assert probabilities[s0] == pytest.approx(1 / 6)
+    assert probabilities[s1] == pytest.approx(2 / 3)
+    assert probabilities[s3] == pytest.approx(2 / 3)
+    assert probabilities.get(s2, 0) == pytest.approx(0)
+
+
+def test_transitions_are_cached_until_modified():
+    dtmc, (s0, s1, s2, s3) = dtmc_with_two_bsccs("sparse")
+    transitions = dtmc.transitions
+    assert dtmc.transitions is transitions
+    assert len(transitions) == 6
+    s4 = dtmc.create_state("s4")
+    dtmc.create_transition(s4, 1, s4)
+    assert len(dtmc.transitions) == 7
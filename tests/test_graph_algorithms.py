@@ -0,0 +1,43 @@
+import sys
+
+import numpy as np
+
+from vnmc.common.graph import CSRAdjacency
+from vnmc.common.graph_algorithms import bottom_sccs, compute_sccs
+
+
+def chain(num_nodes, back_edge=False):
+    """
+    0 -> 1 -> ... -> n-1, optionally closed to a cycle by n-1 -> 0
+    """
+    sources, targets = list(range(num_nodes - 1)), list(range(1, num_nodes))
+    if back_edge:
+        sources.append(num_nodes - 1)
+        targets.append(0)
+    return CSRAdjacency(num_nodes, np.array(sources), np.array(targets))
+
+
+def test_sccs_of_chain_deeper_than_recursion_limit():
+    num_nodes = 10 * sys.getrecursionlimit()
+    num_sccs, labels = compute_sccs(chain(num_nodes))
+    assert num_sccs == num_nodes
+    # Every edge leads to a smaller label
+    assert np.all(labels[:-1] > labels[1:])
+    bottom = bottom_sccs(chain(num_nodes), num_sccs, labels)
+    assert [list(scc) for scc in bottom] == [[num_nodes - 1]]
+
+
+def test_cycle_deeper_than_recursion_limit_is_one_scc():
+    num_nodes = 10 * sys.getrecursionlimit()
+    num_sccs, labels = compute_sccs(chain(num_nodes, back_edge=True))
+    assert num_sccs == 1
+    assert np.all(labels == 0)
+
+
+def test_sccs_of_allowed_subgraph():
+    adjacency = chain(6, back_edge=True)
+    allowed = np.array([True, True, True, False, True, True])
+    num_sccs, labels = compute_sccs(adjacency, allowed)
+    assert num_sccs == 5
+    assert labels[3] == -1
+    assert len(set(labels[allowed])) == 5
@@ -0,0 +1,253 @@
+import os
+import random
+
+import numpy as np
+
+from vnmc.common.graph import CSRAdjacency
+from vnmc.common.graph_algorithms import compute_sccs, nested_dfs
+from vnmc.logics.ltl.syntax import AtomicPropositionLTL, ConjunctionLTL, DisjunctionLTL, FalseLTL, NegationLTL, \
+    NextLTL, TrueLTL, UntilLTL
+from vnmc.logics.ltl.utils import AP, And, F, G, Implies, Neg, Or, Until, X, _check_consistent, compute_closure, \
+    compute_elementary_sets, ltl_to_gba
+from vnmc.model_checking.ltl_model_checking import model_check_ltl
+from vnmc.timp.command import AssignmentCommand, Configuration, IfElseCommand, RepeatCommand, \
+    SequentialCompositionCommand
+from vnmc.timp.expr import Conjunction, Disjunction, Negation, Variable
+from vnmc.timp.module import Module
+from vnmc.timp.parser import TIMPTransformer, imp_parser
+
+APS = [AP("a"), AP("b")]
+LETTERS = [frozenset(), frozenset({AP("a")}), frozenset({AP("b")}), frozenset(APS)]
+VARIABLES = ["x", "y", "z"]
+
+
+def holds(phi, stem, cycle):
+    """
+    Decides whether the lasso-shaped word stem cycle^omega satisfies the formula, positions beyond the word wrap
+    around to the start of the cycle
+    """
+    word = stem + cycle
+
+    def successor(i):
+        return i + 1 if i + 1 < len(word) else len(stem)
+
+    def evaluate(psi):
+        if isinstance(psi, TrueLTL):
+            return [True] * len(word)
+        if isinstance(psi, FalseLTL):
+            return [False] * len(word)
+        if isinstance(psi, AtomicPropositionLTL):
+            return [psi in letter for letter in word]
+        if isinstance(psi, NegationLTL):
+            return [not value for value in evaluate(psi.phi)]
+        if isinstance(psi, ConjunctionLTL):
+            return [v1 and v2 for v1, v2 in zip(evaluate(psi.phi1), evaluate(psi.phi2))]
+        if isinstance(psi, DisjunctionLTL):
+            return [v1 or v2 for v1, v2 in zip(evaluate(psi.phi1), evaluate(psi.phi2))]
+        if isinstance(psi, NextLTL):
+            values = evaluate(psi.phi)
+            return [values[successor(i)] for i in range(len(word))]
+        assert isinstance(psi, UntilLTL)
+        values1, values2 = evaluate(psi.phi1), evaluate(psi.phi2)
+        # Least fixpoint, every position is revisited after at most len(word) steps
+        result = list(values2)
+        for _ in range(len(word) + 1):
+            result = [values2[i] or (values1[i] and result[successor(i)]) for i in range(len(word))]
+        return result
+
+    return evaluate(phi)[0]
+
+
+def accepts(gba, stem, cycle):
+    """
+    Decides whether the GBA accepts the word stem cycle^omega by searching the product of the GBA with the word for a
+    reachable non-trivial SCC that intersects every accepting set
+    """
+    word = stem + cycle
+    nodes = {(q, 0): idx for idx, q in enumerate(gba.initial_states)}
+    stack, edges = list(nodes), []
+    while stack:
+        q, i = stack.pop()
+        j = i + 1 if i + 1 < len(word) else len(stem)
+        for succ in gba.get_successors(q, word[i]):
+            if (succ, j) not in nodes:
+                nodes[(succ, j)] = len(nodes)
+                stack.append((succ, j))
+            edges.append((nodes[(q, i)], nodes[(succ, j)]))
+    if not edges:
+        return False
+    sources, targets = zip(*edges)
+    num_sccs, labels = compute_sccs(CSRAdjacency(len(nodes), np.array(sources), np.array(targets)))
+    id_to_state = {idx: q for (q, _), idx in nodes.items()}
+    for scc in range(num_sccs):
+        members = set(np.flatnonzero(labels == scc).tolist())
+        if not any(s in members and t in members for s, t in edges):
+            continue
+        states = {id_to_state[idx] for idx in members}
+        if all(states & accepting for accepting in gba.accepting_state_sets):
+            return True
+    return False
+
+
+def random_formula(rng, depth):
+    if depth == 0:
+        return rng.choice(APS)
+    sub = lambda: random_formula(rng, depth - 1)
+    return rng.choice([lambda: And(sub(), sub()), lambda: Or(sub(), sub()), lambda: Neg(sub()), lambda: X(sub()),
+                       lambda: Until(sub(), sub()), lambda: F(sub()), lambda: G(sub())])()
+
+
+def random_word(rng):
+    stem = [rng.choice(LETTERS) for _ in range(rng.randint(0, 3))]
+    cycle = [rng.choice(LETTERS) for _ in range(rng.randint(1, 3))]
+    return stem, cycle
+
+
+def random_expr(rng, depth=2):
+    if depth == 0 or rng.random() < 0.3:
+        return Variable(rng.choice(VARIABLES))
+    choice = rng.randrange(3)
+    if choice == 0:
+        return Conjunction(random_expr(rng, depth - 1), random_expr(rng, depth - 1))
+    if choice == 1:
+        return Disjunction(random_expr(rng, depth - 1), random_expr(rng, depth - 1))
+    return Negation(random_expr(rng, depth - 1))
+
+
+def random_command(rng, depth=3):
+    choice = rng.randrange(4) if depth > 0 else 0
+    if choice <= 1:
+        command = AssignmentCommand(Variable(rng.choice(VARIABLES)), random_expr(rng))
+        if rng.random() < 0.5:
+            command = command.with_annotations({rng.choice("ab")})
+        return command
+    if choice == 2:
+        return IfElseCommand(random_expr(rng), random_command(rng, depth - 1), random_command(rng, depth - 1))
+    return SequentialCompositionCommand(random_command(rng, depth - 1), random_command(rng, depth - 1))
+
+
+def random_module(rng):
+    # Both annotations occur in the module, such that every formula over a and b can be checked
+    annotated = SequentialCompositionCommand(AssignmentCommand(Variable("x"), Variable("y")).with_annotations({"a"}),
+                                             AssignmentCommand(Variable("y"), Variable("z")).with_annotations({"b"}))
+    body = SequentialCompositionCommand(random_command(rng), annotated)
+    command = RepeatCommand(body) if rng.random() < 0.8 else body
+    return Module("random", SequentialCompositionCommand(random_command(rng, 1), command))
+
+
+def letter(config):
+    return frozenset(AP(annotation) for annotation in config.command.get_annotations(config.state))
+
+
+def assert_violating_run(module, phi, stem, cycle):
+    """
+    Asserts that the lasso is a run of the module starting in its initial configuration and violating the formula
+    """
+    run = stem + cycle
+    initial_state = {variable: False for variable in module.variables}
+    assert run[0] == Configuration(command=module.command, state=initial_state)
+    for config, successor in zip(run, run[1:] + [cycle[0]]):
+        assert successor in config.get_successors()
+    assert not holds(phi, [letter(config) for config in stem], [letter(config) for config in cycle])
+
+
+def test_tableau_and_elementary_sets_accept_the_same_words():
+    rng = random.Random(0)
+    for _ in range(60):
+        phi = random_formula(rng, rng.randint(1, 3))
+        if len(compute_closure(phi)) > 10:
+            continue
+        tableau, elementary = ltl_to_gba(phi, APS), ltl_to_gba(phi, APS, tableau=False)
+        for _ in range(20):
+            stem, cycle = random_word(rng)
+            expected = holds(phi, stem, cycle)
+            assert accepts(tableau, stem, cycle) == expected, (phi, stem, cycle)
+            assert accepts(elementary, stem, cycle) == expected, (phi, stem, cycle)
+
+
+def test_tableau_of_larger_formulae():
+    rng = random.Random(1)
+    for _ in range(100):
+        phi = random_formula(rng, rng.randint(3, 5))
+        gba = ltl_to_gba(phi, APS)
+        for _ in range(10):
+            stem, cycle = random_word(rng)
+            assert accepts(gba, stem, cycle) == holds(phi, stem, cycle), (phi, stem, cycle)
+
+
+def test_elementary_sets_contain_both_conjuncts():
+    a, b = AP("a"), AP("b")
+    phi = And(a, b)
+    closure = compute_closure(phi)
+    assert not _check_consistent({phi, a, b.negate()}, closure)
+    assert not _check_consistent({phi, a.negate(), b}, closure)
+    assert _check_consistent({phi, a, b}, closure)
+    for elementary in compute_elementary_sets(phi):
+        if phi in elementary:
+            assert a in elementary and b in elementary
+
+
+def test_nested_dfs_finds_accepting_lassos():
+    rng = random.Random(2)
+    for _ in range(300):
+        n = rng.randint(1, 10)
+        edges = {(rng.randrange(n), rng.randrange(n)) for _ in range(rng.randint(0, 2 * n))}
+        accepting = {node for node in range(n) if rng.random() < 0.3}
+        successors = {node: [t for s, t in sorted(edges) if s == node] for node in range(n)}
+        lasso = nested_dfs([0], lambda node: successors[node], lambda node: node in accepting)
+
+        # Reference: an accepting node that is reachable from 0 and lies on a cycle
+        def reach(sources):
+            seen, stack = set(sources), list(sources)
+            while stack:
+                for succ in successors[stack.pop()]:
+                    if succ not in seen:
+                        seen.add(succ)
+                        stack.append(succ)
+            return seen
+
+        exists = any(node in reach(successors[node]) for node in accepting & reach([0]))
+        assert (lasso is not None) == exists
+        if lasso is not None:
+            stem, cycle = lasso
+            path = stem + cycle + [cycle[0]]
+            assert path[0] == 0
+            assert all(edge in edges for edge in zip(path, path[1:]))
+            assert accepting & set(cycle)
+
+
+def test_nested_dfs_on_deep_chain():
+    n = 50000
+    lasso = nested_dfs([0], lambda node: [node + 1] if node < n else [n - 1], lambda node: node == n)
+    stem, cycle = lasso
+    assert stem == list(range(n - 1))
+    assert cycle == [n - 1, n]
+
+
+def test_on_the_fly_and_full_product_agree_and_return_violating_runs():
+    rng = random.Random(3)
+    violated, satisfied = 0, 0
+    for _ in range(40):
+        module = random_module(rng)
+        for _ in range(3):
+            phi = random_formula(rng, rng.randint(1, 3))
+            verdict, counterexample = model_check_ltl(module, phi)
+            full_verdict, full_counterexample = model_check_ltl(module, phi, on_the_fly=False)
+            assert verdict == full_verdict, phi
+            if not verdict:
+                violated += 1
+                assert_violating_run(module, phi, *counterexample)
+                assert_violating_run(module, phi, *full_counterexample)
+            else:
+                satisfied += 1
+                assert counterexample is None and full_counterexample is None
+    assert violated > 0 and satisfied > 0
+
+
+def test_example_module():
+    with open(os.path.join(os.path.dirname(__file__), "..", "examples", "source.txt")) as f:
+        module = TIMPTransformer().transform(imp_parser.parse(f.read()))
+    assert model_check_ltl(module, G(Implies(AP("a"), X(AP("b")))))[0] is True
+    verdict, (stem, cycle) = model_check_ltl(module, G(Implies(AP("b"), X(AP("b")))))
+    assert verdict is False
+    assert_violating_run(module, G(Implies(AP("b"), X(AP("b")))), stem, cycle)
@@ -0,0 +1,166 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from vnmc.logics.pctl.pctl_factory import P, AP, U, X, tt
+from vnmc.model_checking.pctl_model_checking import model_check_pctl
+from vnmc.probabilistic import MDP
+from vnmc.probabilistic.mdp.engine import _group_optimum
+from vnmc.probabilistic.mdp.mec import build_quotient, compute_mecs
+
+METHODS = ["value-iteration", "policy-iteration"]
+
+
+def end_component_mdp(method="value-iteration"):
+    """
+    s0 and s1 form an end component via a and b. Leaving it, d reaches t with probability 0.3 from s0 and c reaches t
+    with probability 0.5 from s1, hence the maximal probability of reaching t is 0.5 and the minimal one is 0
+    """
+    mdp = MDP()
+    s0, s1 = mdp.create_state("s0"), mdp.create_state("s1")
+    t, z = mdp.create_state("t", atomic_propositions={AP("t")}), mdp.create_state("z")
+    mdp.create_transition(s0, "a", 1, s1)
+    mdp.create_transition(s0, "d", 0.3, t)
+    mdp.create_transition(s0, "d", 0.7, z)
+    mdp.create_transition(s1, "b", 1, s0)
+    mdp.create_transition(s1, "c", 0.5, t)
+    mdp.create_transition(s1, "c", 0.5, z)
+    mdp.build(method=method)
+    return mdp, [s0, s1, t, z]
+
+
+def random_mdp(rng, num_states=6, max_actions=2, num_successors=2):
+    """
+    Random MDP whose first state is the target and whose second state is absorbing
+    """
+    mdp = MDP()
+    states = [mdp.create_state(f"s{i}", atomic_propositions={AP("t")} if i == 0 else set())
+              for i in range(num_states)]
+    for i in range(2, num_states):
+        for action in range(rng.integers(1, max_actions + 1)):
+            successors = rng.choice(num_states, size=num_successors, replace=False)
+            probabilities = rng.random(num_successors)
+            for j, p in zip(successors, probabilities / probabilities.sum()):
+                mdp.create_transition(states[i], action, p, states[j])
+    return mdp, states
+
+
+def induced_reachability(mdp, choices, target_mask):
+    """
+    Reachability probabilities of the DTMC induced by selecting one choice per state
+    """
+    matrix = mdp.engine.choice_matrix[choices].toarray()
+    matrix[target_mask] = 0
+    matrix[target_mask, np.flatnonzero(target_mask)] = 1
+    for _ in range(12):
+        matrix = matrix.dot(matrix)
+    return matrix[:, target_mask].sum(axis=1)
+
+
+def optimum_over_schedulers(mdp, target_mask, maximize):
+    """
+    Optimal reachability probabilities by enumerating all memoryless deterministic schedulers
+    """
+    row_groups = mdp.engine.row_groups
+    groups = [range(row_groups[i], row_groups[i + 1]) for i in range(len(row_groups) - 1)]
+    values = [induced_reachability(mdp, list(choices), target_mask) for choices in itertools.product(*groups)]
+    return np.max(values, axis=0) if maximize else np.min(values, axis=0)
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_unbounded_reachability_with_end_component(method):
+    mdp, (s0, s1, t, z) = end_component_mdp(method)
+    maximal = mdp.compute_unbounded_reachability(set(), {t}, maximize=True)
+    minimal = mdp.compute_unbounded_reachability(set(), {t}, maximize=False)
+    assert [maximal[s] for s in [s0, s1, t, z]] == pytest.approx([0.5, 0.5, 1, 0])
+    assert [minimal[s] for s in [s0, s1, t, z]] == pytest.approx([0, 0, 1, 0])
+
+
+@pytest.mark.parametrize("maximize", [True, False])
+def test_value_and_policy_iteration_agree_with_scheduler_enumeration(maximize):
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        mdp, states = random_mdp(rng)
+        mdp.build()
+        target_mask = np.zeros(len(states), dtype=np.bool_)
+        target_mask[0] = True
+        expected = optimum_over_schedulers(mdp, target_mask, maximize)
+        for method in METHODS:
+            mdp.build(method=method)
+            bad_mask = np.zeros(len(states), dtype=np.bool_)
+            values = mdp.engine.compute_reachability_vector(bad_mask, target_mask, maximize)
+            assert values == pytest.approx(expected, abs=1e-8)
+            # The extracted scheduler attains the optimum
+            scheduler = mdp.engine.compute_scheduler_vector(bad_mask, target_mask, maximize)
+            assert induced_reachability(mdp, scheduler, target_mask) == pytest.approx(expected, abs=1e-6)
+
+
+def test_scheduler_leaves_end_component():
+    mdp, (s0, s1, t, z) = end_component_mdp()
+    # Both a and b are optimal w.r.t. the maximal probabilities, but only leaving via c attains them
+    assert mdp.compute_scheduler(set(), {t}, maximize=True)[s1] == "c"
+    assert mdp.compute_scheduler(set(), {t}, maximize=True)[s0] == "a"
+    minimal = mdp.compute_scheduler(set(), {t}, maximize=False)
+    assert (minimal[s0], minimal[s1]) == ("a", "b")
+
+
+def test_bounded_reachability():
+    mdp, (s0, s1, t, z) = end_component_mdp()
+    for steps, expected_max, expected_min in [(0, 0, 0), (1, 0.3, 0), (2, 0.5, 0), (5, 0.5, 0)]:
+        assert mdp.compute_bounded_reachability(set(), {t}, steps, maximize=True)[s0] == pytest.approx(expected_max)
+        assert mdp.compute_bounded_reachability(set(), {t}, steps, maximize=False)[s0] == pytest.approx(expected_min)
+    # Avoiding s1 rules out the detour via a
+    assert mdp.compute_bounded_reachability({s1}, {t}, 5, maximize=True)[s0] == pytest.approx(0.3)
+
+
+def test_maximal_end_components_and_quotient():
+    mdp, (s0, s1, t, z) = end_component_mdp()
+    engine = mdp.engine
+    mecs = {frozenset(states.tolist()): [engine.choice_actions[c] for c in choices] for states, choices in
+            engine.compute_mecs()}
+    # t and z are deadlocks, which get a self-loop choice
+    assert mecs == {frozenset({s0.node_id, s1.node_id}): ["a", "b"], frozenset({t.node_id}): [None],
+                    frozenset({z.node_id}): [None]}
+    quotient = engine.build_quotient()
+    assert quotient.num_states == 3
+    assert quotient.state_to_quotient[s0.node_id] == quotient.state_to_quotient[s1.node_id]
+    collapsed = quotient.state_to_quotient[s0.node_id]
+    choices = range(quotient.row_groups[collapsed], quotient.row_groups[collapsed + 1])
+    assert sorted(engine.choice_actions[quotient.choice_origin[c]] for c in choices) == ["c", "d"]
+
+
+def test_unreduced_value_iteration_overshoots_in_end_component():
+    mdp, (s0, s1, t, z) = end_component_mdp()
+    engine = mdp.engine
+    target_mask = engine.to_mask({t})
+    bad_mask = np.zeros(engine.num_states, dtype=np.bool_)
+    _, undetermined, choice_matrix, b, row_groups, leaving = engine._build_reachability_system(bad_mask, target_mask,
+                                                                                               maximize=True)
+    assert sorted(undetermined.tolist()) == sorted([s0.node_id, s1.node_id])
+
+    def iterate_from_above(matrix, b, groups):
+        x = np.ones(len(groups) - 1)
+        for _ in range(1000):
+            x = _group_optimum(matrix.dot(x) + b, groups, True)
+        return x
+
+    # Without collapsing the end component, 1 is a fixpoint of the Bellman equations and the iteration from above
+    # stays there instead of converging to 0.5
+    assert iterate_from_above(choice_matrix, b, row_groups) == pytest.approx([1, 1])
+    quotient = build_quotient(choice_matrix, row_groups, compute_mecs(choice_matrix, row_groups, leaving=leaving))
+    values = quotient.lift(iterate_from_above(quotient.choice_matrix, quotient.restrict(b), quotient.row_groups))
+    assert values == pytest.approx([0.5, 0.5])
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_model_check_pctl_on_mdp(method):
+    mdp, (s0, s1, t, z) = end_component_mdp(method)
+    # The probability of eventually reaching t lies in [0, 0.5] depending on the scheduler
+    assert model_check_pctl(mdp, P(U(tt(), AP("t")), 0, 0.6), s0)
+    assert not model_check_pctl(mdp, P(U(tt(), AP("t")), 0, 0.4), s0)
+    assert not model_check_pctl(mdp, P(U(tt(), AP("t")), 0.1, 1), s0)
+    # The probability of moving to t in one step is 0 under a and 0.3 under d
+    assert model_check_pctl(mdp, P(X(AP("t")), 0, 0.3), s0)
+    assert not model_check_pctl(mdp, P(X(AP("t")), 0.1, 1), s0)
+    assert model_check_pctl(mdp, P(X(AP("t")), 1, 1), t)
@@ -0,0 +1,108 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from vnmc.logics.pctl.pctl_factory import P, AP, S, U, X, tt
+from vnmc.model_checking.pctl_model_checking import VectorizedDTMCModelChecker, model_check_pctl
+from vnmc.probabilistic import DTMC
+
+
+def geometric_dtmc(p_target: float, p_sink: float):
+    """
+    DTMC whose initial state loops with the remaining probability, hence the probability of reaching the target is
+    p_target / (p_target + p_sink), which interval iteration only approaches in the limit
+    """
+    dtmc = DTMC()
+    s0 = dtmc.create_state("s0")
+    target = dtmc.create_state("t", atomic_propositions={AP("t")})
+    sink = dtmc.create_state("z")
+    dtmc.create_transition(s0, 1 - p_target - p_sink, s0)
+    dtmc.create_transition(s0, p_target, target)
+    dtmc.create_transition(s0, p_sink, sink)
+    dtmc.create_transition(target, 1, target)
+    dtmc.create_transition(sink, 1, sink)
+    dtmc.build(engine="sparse")
+    return dtmc, s0
+
+
+@pytest.mark.parametrize("epsilon", [1e-3, 1e-6])
+def test_interval_iteration_within_epsilon_of_bound(epsilon):
+    # The probability is 0.4999, which is within epsilon = 1e-3 of the lower bound 0.5
+    dtmc, s0 = geometric_dtmc(0.24995, 0.25005)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert not model_check_pctl(dtmc, P(U(tt(), AP("t")), 0.5, 1), s0, epsilon=epsilon)
+        assert model_check_pctl(dtmc, P(U(tt(), AP("t")), 0, 0.5), s0, epsilon=epsilon)
+        assert model_check_pctl(dtmc, P(U(tt(), AP("t")), 0.4998, 1), s0, epsilon=epsilon)
+
+
+def test_interval_iteration_agrees_with_exact_solution():
+    dtmc, s0 = geometric_dtmc(0.3, 0.1)
+    for lb, ub in [(0.7, 1), (0.76, 1), (0, 0.74), (0.74, 0.76)]:
+        phi = P(U(tt(), AP("t")), lb, ub)
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            assert model_check_pctl(dtmc, phi, s0, epsilon=1e-3) == model_check_pctl(dtmc, phi, s0)
+
+
+def test_interval_iteration_warns_if_probability_equals_bound():
+    # The probability is 1/3, which the bounds only approach in the limit and never separate from the bound 1/3
+    dtmc, s0 = geometric_dtmc(0.1, 0.2)
+    with pytest.warns(RuntimeWarning):
+        model_check_pctl(dtmc, P(U(tt(), AP("t")), 1 / 3, 1), s0, epsilon=1e-3)
+
+
+def test_interval_iteration_records_undecided_states():
+    dtmc, s0 = geometric_dtmc(0.1, 0.2)
+    idx = dtmc.engine.state_to_idx[s0]
+    checker = VectorizedDTMCModelChecker(dtmc, epsilon=1e-3)
+    with pytest.warns(RuntimeWarning):
+        P(U(tt(), AP("t")), 1 / 3, 1).accept(checker)
+    result, = checker.solver_results
+    assert result.undecided[idx]
+    assert np.count_nonzero(result.undecided) == 1
+
+    checker = VectorizedDTMCModelChecker(dtmc, epsilon=1e-3)
+    P(U(tt(), AP("t")), 0.3, 1).accept(checker)
+    result, = checker.solver_results
+    assert not np.any(result.undecided)
+
+
+def bscc_dtmc():
+    """
+    s0 moves to the BSCC {s1, s2} with probability 0.4 and to the BSCC {z} with probability 0.6, where the chain
+    alternates deterministically between s1 and s2 and only s2 is labelled with a
+    """
+    dtmc = DTMC()
+    s0 = dtmc.create_state("s0")
+    s1 = dtmc.create_state("s1")
+    s2 = dtmc.create_state("s2", atomic_propositions={AP("a")})
+    z = dtmc.create_state("z")
+    dtmc.create_transition(s0, 0.4, s1)
+    dtmc.create_transition(s0, 0.6, z)
+    dtmc.create_transition(s1, 1, s2)
+    dtmc.create_transition(s2, 1, s1)
+    dtmc.create_transition(z, 1, z)
+    dtmc.build(engine="sparse")
+    return dtmc, [s0, s1, s2, z]
+
+
+@pytest.mark.parametrize("vectorized", [True, False])
+def test_steady_state_operator(vectorized):
+    # The long-run probability of a is 0.2 in s0, 0.5 in s1 and s2 and 0 in z
+    dtmc, (s0, s1, s2, z) = bscc_dtmc()
+    expected = {s0: 0.2, s1: 0.5, s2: 0.5, z: 0}
+    for state, probability in expected.items():
+        lb, ub = max(probability - 1e-9, 0), probability + 1e-9
+        assert model_check_pctl(dtmc, S(AP("a"), lb, ub), state, vectorized=vectorized)
+        assert not model_check_pctl(dtmc, S(AP("a"), probability + 0.05, 1), state, vectorized=vectorized)
+        if probability > 0:
+            assert not model_check_pctl(dtmc, S(AP("a"), 0, probability - 0.05), state, vectorized=vectorized)
+
+
+def test_steady_state_operator_of_nested_formula():
+    # S[0.5, 1](P[1, 1](X a)) holds where the chain is in s1 with probability at least 1/2 in the long run
+    dtmc, (s0, s1, s2, z) = bscc_dtmc()
+    phi = S(P(X(AP("a")), 1, 1), 0.5, 1)
+    assert [model_check_pctl(dtmc, phi, state) for state in [s0, s1, s2, z]] == [False, True, True, False]
@@ -0,0 +1,78 @@
+import random
+
+from vnmc.logics.ctl import ctl_factory as ctl
+from vnmc.model_checking.ctl_model_checking import VectorizedCTLModelChecker, model_check_ctl, timp_to_kripke
+from vnmc.model_checking.symbolic_ctl_model_checking import SymbolicCTLModelChecker, model_check_ctl_symbolic, \
+    timp_to_symbolic
+from vnmc.timp.command import AssignmentCommand, IfElseCommand, RepeatCommand, SequentialCompositionCommand, \
+    SkipCommand
+from vnmc.timp.expr import Conjunction, Disjunction, Negation, Variable
+from vnmc.timp.module import Module
+
+VARIABLES = ["x", "y", "z"]
+PROPOSITIONS = VARIABLES + ["a", "b"]
+
+
+def random_expr(rng, depth=2):
+    if depth == 0 or rng.random() < 0.3:
+        return Variable(rng.choice(VARIABLES))
+    choice = rng.randrange(3)
+    if choice == 0:
+        return Conjunction(random_expr(rng, depth - 1), random_expr(rng, depth - 1))
+    if choice == 1:
+        return Disjunction(random_expr(rng, depth - 1), random_expr(rng, depth - 1))
+    return Negation(random_expr(rng, depth - 1))
+
+
+def random_command(rng, depth=3):
+    choice = rng.randrange(5) if depth > 0 else 0
+    if choice <= 1:
+        command = AssignmentCommand(Variable(rng.choice(VARIABLES)), random_expr(rng))
+    elif choice == 2:
+        command = IfElseCommand(random_expr(rng), random_command(rng, depth - 1), random_command(rng, depth - 1))
+    elif choice == 3:
+        command = SequentialCompositionCommand(random_command(rng, depth - 1), random_command(rng, depth - 1))
+    else:
+        command = SkipCommand()
+    if rng.random() < 0.4:
+        command = command.with_annotations({rng.choice("ab")})
+    return command
+
+
+def random_module(rng):
+    command = random_command(rng)
+    if rng.random() < 0.7:
+        command = SequentialCompositionCommand(random_command(rng, 1), RepeatCommand(command))
+    return Module("random", command)
+
+
+def random_formula(rng, depth):
+    if depth == 0:
+        return ctl.AP(rng.choice(PROPOSITIONS))
+    sub = lambda: random_formula(rng, depth - 1)
+    return rng.choice([lambda: ctl.And(sub(), sub()), lambda: ctl.Or(sub(), sub()), lambda: ctl.Neg(sub()),
+                       lambda: ctl.EX(sub()), lambda: ctl.EU(sub(), sub()), lambda: ctl.EG(sub()),
+                       lambda: ctl.AU(sub(), sub()), lambda: ctl.AG(sub()), lambda: ctl.AF(sub())])()
+
+
+def test_symbolic_and_explicit_state_spaces_agree():
+    rng = random.Random(0)
+    for _ in range(50):
+        module = random_module(rng)
+        kripke, system = timp_to_kripke(module), timp_to_symbolic(module)
+        assert system.count_states(system.reachable) == len(kripke.states)
+        for _ in range(5):
+            phi = random_formula(rng, rng.randint(0, 3))
+            explicit = int(phi.accept(VectorizedCTLModelChecker(kripke)).sum())
+            assert system.count_states(phi.accept(SymbolicCTLModelChecker(system))) == explicit
+            assert model_check_ctl_symbolic(module, phi) == model_check_ctl(module, phi)
+
+
+def test_repeat_skip_in_dead_branch():
+    x = Variable("x")
+    command = SequentialCompositionCommand(
+        AssignmentCommand(x, Conjunction(x, Negation(x))),
+        IfElseCommand(x, RepeatCommand(SkipCommand()), SkipCommand().with_annotations({"a"})))
+    module = Module("dead", command)
+    assert model_check_ctl_symbolic(module, ctl.AP("a")) is False
+    assert model_check_ctl_symbolic(module, ctl.AF(ctl.AP("a"))) is True
@@ -1,9 +1,9 @@
 import abc
 import itertools
 from collections import deque
-from typing import Set, Dict, Any, Callable, List
+from typing import Set, Dict, Any, Callable, FrozenSet, List
 
-from vnmc.common.graph import Graph
+from vnmc.common.graph import Graph, CSRGraph, CSRAdjacency
 
 
 class _AutomatonState:
@@ -42,14 +42,23 @@ class _AutomatonTransition:
 
 
 class FiniteAutomaton(abc.ABC):
+    """
+    Finite automaton whose transitions are stored in a CSRGraph over the state ids, where every edge carries the id
+    of its label. The labels are interned, i.e. equal labels share their id.
+    """
 
     def __init__(self, alphabet):
         self.states: Set[_AutomatonState] = set()
         self.initial_states: Set[_AutomatonState] = set()
-        self.transitions: Set[_AutomatonTransition] = set()
         self.alphabet: Set = alphabet
-        self.state_to_action_dict: Dict[_AutomatonState, Dict[Any, Set[_AutomatonState]]] = dict()
-        self._state_ids = 0
+        self.graph = CSRGraph(columns={"label": "q"})
+        self.id_to_state: List[_AutomatonState] = []
+        self.label_to_id: Dict[Any, int] = dict()
+        self.id_to_label: List[Any] = []
+        # Outgoing edges of the states that have been queried since the graph was last frozen
+        self._edge_cache: Dict[int, List] = dict()
+        # Transition objects, built on first access and discarded on modification
+        self._transitions: FrozenSet[_AutomatonTransition] = None
 
     def get_initial_state(self):
         """
@@ -63,21 +72,52 @@ class FiniteAutomaton(abc.ABC):
         return next(iter(self.initial_states))
 
     def create_state(self, name, **kwargs) -> _AutomatonState:
-        state = _AutomatonState(name=name, state_id=self._state_ids, **kwargs)
-        self._state_ids += 1
+        state = _AutomatonState(name=name, state_id=self.graph.add_node(), **kwargs)
         self.states.add(state)
+        self.id_to_state.append(state)
         return state
 
+    def _add_edge(self, source: _AutomatonState, label, target: _AutomatonState):
+        if label not in self.label_to_id:
+            self.label_to_id[label] = len(self.id_to_label)
+            self.id_to_label.append(label)
+        self.graph.add_edge(source.state_id, target.state_id, label=self.label_to_id[label])
+        self._transitions = None
+        return _AutomatonTransition(source, label, target)
+
     def create_transition(self, source, letter, target):
-        transition = _AutomatonTransition(source, letter, target)
-        self.transitions.add(transition)
-        action_dict = self.state_to_action_dict.setdefault(source, dict())
-        succs = action_dict.setdefault(letter, set())
-        succs.add(target)
-        return transition
+        return self._add_edge(source, letter, target)
+
+    def _get_labelled_edges(self, source: _AutomatonState) -> List:
+        # The outgoing edges of a state as pairs of a label and a target
+        self.get_adjacency()
+        labelled_edges = self._edge_cache.get(source.state_id)
+        if labelled_edges is None:
+            edges = self.graph.get_edges(source.state_id)
+            labelled_edges = [(self.id_to_label[label], self.id_to_state[target]) for label, target in
+                              zip(self.graph.columns["label"][edges].tolist(),
+                                  self.graph.successors.indices[edges].tolist())]
+            self._edge_cache[source.state_id] = labelled_edges
+        return labelled_edges
+
+    def get_adjacency(self) -> CSRAdjacency:
+        """
+        Returns the adjacency over the state ids, ignoring the labels
+        """
+        if not self.graph.is_frozen:
+            self.graph.freeze()
+            self._edge_cache.clear()
+        return self.graph.successors
+
+    @property
+    def transitions(self) -> FrozenSet[_AutomatonTransition]:
+        if self._transitions is None:
+            self._transitions = frozenset(_AutomatonTransition(state, label, target) for state in self.id_to_state
+                                          for label, target in self._get_labelled_edges(state))
+        return self._transitions
 
     def get_successors(self, source, letter) -> set:
-        return self.state_to_action_dict.get(source, dict()).get(letter, set())
+        return {target for label, target in self._get_labelled_edges(source) if label == letter}
 
     def to_dot(self, state_formatter: Callable[[Any], str] = None, letter_formatter: Callable[[Any], str] = None):
         out = "digraph G {\n"
@@ -93,19 +133,105 @@ class FiniteAutomaton(abc.ABC):
         return out + "}"
 
 
-class GBA(FiniteAutomaton, Graph):
+class Guard:
+    """
+    Conjunction of literals over indexed atomic propositions, i.e. a cube, which is encoded by the bitmasks of the
+    atomic propositions that have to be true and of those that have to be false. A letter, i.e. a set of atomic
+    propositions, is encoded by the bitmask of its atomic propositions.
 
-    def __init__(self, alphabet):
-        super().__init__(alphabet)
+    Parameters
+    ----------
+    positive: int
+        Bitmask of the atomic propositions that have to be true
+    negative: int
+        Bitmask of the atomic propositions that have to be false
+    """
+
+    def __init__(self, positive: int = 0, negative: int = 0):
+        self.positive = positive
+        self.negative = negative
+
+    def is_satisfiable(self) -> bool:
+        return self.positive & self.negative == 0
+
+    def intersect(self, other):
+        return Guard(self.positive | other.positive, self.negative | other.negative)
+
+    def is_satisfied_by(self, letter_mask: int) -> bool:
+        return letter_mask & self.positive == self.positive and letter_mask & self.negative == 0
+
+    def __eq__(self, other):
+        if isinstance(other, Guard):
+            return other.positive == self.positive and other.negative == self.negative
+        return False
+
+    def __hash__(self):
+        return hash((self.positive, self.negative))
+
+    def __repr__(self):
+        return f"Guard(positive={bin(self.positive)}, negative={bin(self.negative)})"
+
+
+class GBA(FiniteAutomaton, Graph):
+    """
+    Generalized Büchi automaton over the powerset of its atomic propositions. The alphabet is represented
+    symbolically, every transition is labelled with a guard over the indices of the atomic propositions instead of a
+    single letter, hence the transitions of a state are never enumerated per letter.
+
+    Parameters
+    ----------
+    atomic_propositions: List
+        The atomic propositions, the i-th atomic proposition has index i
+    """
+
+    def __init__(self, atomic_propositions: List):
+        super().__init__(alphabet=None)
+        self.atomic_propositions = list(atomic_propositions)
+        self.ap_to_bit: Dict[Any, int] = {ap: idx for idx, ap in enumerate(self.atomic_propositions)}
         self.accepting_state_sets: List[Set[_AutomatonState]] = []
 
+    def letter_to_mask(self, letter) -> int:
+        mask = 0
+        for ap in letter:
+            if ap not in self.ap_to_bit:
+                raise ValueError(f"{ap} is not an atomic proposition of the automaton")
+            mask |= 1 << self.ap_to_bit[ap]
+        return mask
+
+    def letter_to_guard(self, letter) -> Guard:
+        mask = self.letter_to_mask(letter)
+        return Guard(mask, ((1 << len(self.atomic_propositions)) - 1) & ~mask)
+
+    def create_guarded_transition(self, source, guard: Guard, target):
+        return self._add_edge(source, guard, target)
+
+    def create_transition(self, source, letter, target):
+        return self.create_guarded_transition(source, self.letter_to_guard(letter), target)
+
+    def get_guarded_edges(self, source) -> List:
+        return self._get_labelled_edges(source)
+
+    def get_successors(self, source, letter) -> set:
+        return self.get_mask_successors(source, self.letter_to_mask(letter))
+
+    def get_mask_successors(self, source, letter_mask: int) -> set:
+        return {target for guard, target in self.get_guarded_edges(source) if guard.is_satisfied_by(letter_mask)}
+
+    def format_guard(self, guard: Guard) -> str:
+        literals = [str(ap) if guard.positive >> idx & 1 else f"¬{ap}"
+                    for idx, ap in enumerate(self.atomic_propositions) if (guard.positive | guard.negative) >> idx & 1]
+        return " ∧ ".join(literals) if literals else "true"
+
+    def to_dot(self, state_formatter: Callable[[Any], str] = None, letter_formatter: Callable[[Any], str] = None):
+        return super().to_dot(state_formatter=state_formatter,
+                              letter_formatter=self.format_guard if letter_formatter is None else letter_formatter)
+
     def create_single_initial_state(self):
         if len(self.initial_states) > 1:
+            edges = [edge for init in self.initial_states for edge in self.get_guarded_edges(init)]
             fresh_init = self.create_state(f"({', '.join(map(lambda s: s.name, self.initial_states))})")
-            for init in self.initial_states:
-                for letter in self.alphabet:
-                    for succ in self.get_successors(init, letter):
-                        self.create_transition(fresh_init, letter, succ)
+            for guard, succ in edges:
+                self.create_guarded_transition(fresh_init, guard, succ)
             self.initial_states = {fresh_init}
             return fresh_init
         return next(iter(self.initial_states))
@@ -113,26 +239,37 @@ class GBA(FiniteAutomaton, Graph):
     def get_graph_successors(self, node):
         if not isinstance(node, _AutomatonState):
             raise TypeError("Node has to be an automaton state")
-        successors = set()
-        for letter in self.alphabet:
-            successors = successors.union(self.get_successors(node, letter))
-        return successors
+        return {target for _, target in self.get_guarded_edges(node)}
 
 
 class ProductGBA(GBA):
+    """
+    Synchronous product of two GBAs over the same atomic propositions, the guard of a product transition is the
+    intersection of the guards of the component transitions. Only the pairs reachable via satisfiable guards are
+    created.
+    """
 
     def __init__(self, gba1: GBA, gba2: GBA):
-        if gba1.alphabet != gba2.alphabet:
-            print(gba1.alphabet)
-            print(gba2.alphabet)
-            raise ValueError("Both GBAs have to have the same alphabet")
-        super().__init__(gba1.alphabet)
+        if set(gba1.atomic_propositions) != set(gba2.atomic_propositions):
+            raise ValueError("Both GBAs have to have the same atomic propositions")
+        super().__init__(gba1.atomic_propositions)
         self.gba1 = gba1
         self.gba2 = gba2
+        # Bit of every atomic proposition of gba2 in the indexing of the product
+        self._bits2 = [self.ap_to_bit[ap] for ap in gba2.atomic_propositions]
         self._pair_to_state = dict()
         self._build_initial_states()
         self._build_product()
 
+    def _translate_guard2(self, guard: Guard) -> Guard:
+        if self._bits2 == list(range(len(self._bits2))):
+            return guard
+        positive, negative = 0, 0
+        for idx, bit in enumerate(self._bits2):
+            positive |= (guard.positive >> idx & 1) << bit
+            negative |= (guard.negative >> idx & 1) << bit
+        return Guard(positive, negative)
+
     def _build_initial_states(self):
         for init1, init2 in itertools.product(self.gba1.initial_states, self.gba2.initial_states):
             self._pair_to_state[(init1.state_id, init2.state_id)] = self.create_state(
@@ -142,7 +279,6 @@ class ProductGBA(GBA):
 
     def _build_product(self):
         queue = deque(self.initial_states)
-        explored = set()
 
         def get_state_pair(state):
             return state.props["q"], state.props["p"]
@@ -150,18 +286,18 @@ class ProductGBA(GBA):
         while queue:
             current = queue.popleft()
             q, p = get_state_pair(current)
-            explored.add((q.state_id, p.state_id))
-            for letter in self.alphabet:
-                for q_succ, p_succ in itertools.product(self.gba1.get_successors(q, letter),
-                                                        self.gba2.get_successors(p, letter)):
+            edges2 = [(self._translate_guard2(guard), p_succ) for guard, p_succ in self.gba2.get_guarded_edges(p)]
+            for guard1, q_succ in self.gba1.get_guarded_edges(q):
+                for guard2, p_succ in edges2:
+                    guard = guard1.intersect(guard2)
+                    if not guard.is_satisfiable():
+                        continue
                     if (q_succ.state_id, p_succ.state_id) not in self._pair_to_state:
                         state = self.create_state(name=f"({q_succ.name}, {p_succ.name})",
                                                   q=q_succ, p=p_succ)
                         self._pair_to_state[(q_succ.state_id, p_succ.state_id)] = state
+                        queue.append(state)
 
-                        if (q_succ.state_id, p_succ.state_id) not in explored:
-                            queue.append(state)
-
-                    self.create_transition(source=current,
-                                           letter=letter,
-                                           target=self._pair_to_state[(q_succ.state_id, p_succ.state_id)])
+                    self.create_guarded_transition(source=current,
+                                                   guard=guard,
+                                                   target=self._pair_to_state[(q_succ.state_id, p_succ.state_id)])
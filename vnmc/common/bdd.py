@@ -0,0 +1,284 @@
+from typing import Dict, Iterable, List
+
+
+class BDD:
+    """
+    Manager of reduced ordered binary decision diagrams (ROBDDs). Nodes are integers indexing the node table, where 0
+    and 1 are the terminal nodes FALSE and TRUE. The unique table guarantees that every Boolean function is represented
+    by exactly one node, hence equivalence checks are integer comparisons. The results of the Boolean operations,
+    quantifications and renamings are memoized in operation caches.
+
+    Variables are identified by their level in the variable order, i.e. variables added first are closer to the root.
+    """
+
+    FALSE = 0
+    TRUE = 1
+
+    def __init__(self):
+        # Terminals have the largest level, such that comparisons with variable levels need no special case
+        self._level: List[float] = [float("inf"), float("inf")]
+        self._low: List[int] = [0, 1]
+        self._high: List[int] = [0, 1]
+        self._unique: Dict[tuple, int] = dict()
+        self._apply_cache: Dict[tuple, int] = dict()
+        self._neg_cache: Dict[int, int] = dict()
+        self._quantify_cache: Dict[tuple, int] = dict()
+        self._and_exists_cache: Dict[tuple, int] = dict()
+        self._rename_cache: Dict[tuple, int] = dict()
+        self.var_names: List[str] = []
+        self.name_to_level: Dict[str, int] = dict()
+
+    def __len__(self):
+        return len(self._level)
+
+    @property
+    def num_vars(self):
+        return len(self.var_names)
+
+    def add_var(self, name: str) -> int:
+        """
+        Appends a variable to the variable order and returns its level
+        """
+        if name in self.name_to_level:
+            raise ValueError(f"Variable {name} already exists")
+        self.name_to_level[name] = len(self.var_names)
+        self.var_names.append(name)
+        return self.name_to_level[name]
+
+    def var(self, name: str) -> int:
+        return self.mk(self.name_to_level[name], BDD.FALSE, BDD.TRUE)
+
+    def level(self, u: int) -> float:
+        return self._level[u]
+
+    def low(self, u: int) -> int:
+        return self._low[u]
+
+    def high(self, u: int) -> int:
+        return self._high[u]
+
+    def mk(self, level: int, low: int, high: int) -> int:
+        if low == high:
+            return low
+        key = (level, low, high)
+        u = self._unique.get(key)
+        if u is None:
+            u = len(self._level)
+            self._level.append(level)
+            self._low.append(low)
+            self._high.append(high)
+            self._unique[key] = u
+        return u
+
+    def clear_caches(self):
+        self._apply_cache.clear()
+        self._neg_cache.clear()
+        self._quantify_cache.clear()
+        self._and_exists_cache.clear()
+        self._rename_cache.clear()
+
+    def neg(self, u: int) -> int:
+        if u <= 1:
+            return 1 - u
+        result = self._neg_cache.get(u)
+        if result is None:
+            result = self.mk(self._level[u], self.neg(self._low[u]), self.neg(self._high[u]))
+            self._neg_cache[u] = result
+        return result
+
+    def conj(self, u: int, v: int) -> int:
+        return self._apply("and", u, v)
+
+    def disj(self, u: int, v: int) -> int:
+        return self._apply("or", u, v)
+
+    def iff(self, u: int, v: int) -> int:
+        return self._apply("iff", u, v)
+
+    def implies(self, u: int, v: int) -> int:
+        return self.disj(self.neg(u), v)
+
+    def ite(self, f: int, g: int, h: int) -> int:
+        return self.disj(self.conj(f, g), self.conj(self.neg(f), h))
+
+    def conj_all(self, nodes: Iterable[int]) -> int:
+        result = BDD.TRUE
+        for u in nodes:
+            result = self.conj(result, u)
+        return result
+
+    def disj_all(self, nodes: Iterable[int]) -> int:
+        result = BDD.FALSE
+        for u in nodes:
+            result = self.disj(result, u)
+        return result
+
+    def _apply(self, op: str, u: int, v: int) -> int:
+        if op == "and":
+            if u == 0 or v == 0:
+                return 0
+            if u == 1 or u == v:
+                return v
+            if v == 1:
+                return u
+        elif op == "or":
+            if u == 1 or v == 1:
+                return 1
+            if u == 0 or u == v:
+                return v
+            if v == 0:
+                return u
+        elif op == "iff":
+            if u == v:
+                return 1
+            if u <= 1 and v <= 1:
+                return 0
+            if u == 1:
+                return v
+            if v == 1:
+                return u
+        # The operations are commutative, normalising the key increases the cache hit rate
+        if u > v:
+            u, v = v, u
+        key = (op, u, v)
+        result = self._apply_cache.get(key)
+        if result is not None:
+            return result
+        level_u, level_v = self._level[u], self._level[v]
+        level = min(level_u, level_v)
+        u_low, u_high = (self._low[u], self._high[u]) if level_u == level else (u, u)
+        v_low, v_high = (self._low[v], self._high[v]) if level_v == level else (v, v)
+        result = self.mk(level, self._apply(op, u_low, v_low), self._apply(op, u_high, v_high))
+        self._apply_cache[key] = result
+        return result
+
+    def exists(self, u: int, levels: frozenset) -> int:
+        """
+        Existentially quantifies the variables with the given levels
+        """
+        if u <= 1 or not levels:
+            return u
+        key = (u, levels)
+        result = self._quantify_cache.get(key)
+        if result is not None:
+            return result
+        low, high = self.exists(self._low[u], levels), self.exists(self._high[u], levels)
+        if self._level[u] in levels:
+            result = self.disj(low, high)
+        else:
+            result = self.mk(self._level[u], low, high)
+        self._quantify_cache[key] = result
+        return result
+
+    def forall(self, u: int, levels: frozenset) -> int:
+        return self.neg(self.exists(self.neg(u), levels))
+
+    def and_exists(self, u: int, v: int, levels: frozenset) -> int:
+        """
+        Computes the relational product exists levels. u and v without building the conjunction first
+        """
+        if u == 0 or v == 0:
+            return 0
+        if u == 1 and v == 1:
+            return 1
+        if u == 1:
+            return self.exists(v, levels)
+        if v == 1:
+            return self.exists(u, levels)
+        if u > v:
+            u, v = v, u
+        key = (u, v, levels)
+        result = self._and_exists_cache.get(key)
+        if result is not None:
+            return result
+        level_u, level_v = self._level[u], self._level[v]
+        level = min(level_u, level_v)
+        u_low, u_high = (self._low[u], self._high[u]) if level_u == level else (u, u)
+        v_low, v_high = (self._low[v], self._high[v]) if level_v == level else (v, v)
+        low = self.and_exists(u_low, v_low, levels)
+        if level in levels and low == 1:
+            result = 1
+        else:
+            high = self.and_exists(u_high, v_high, levels)
+            result = self.disj(low, high) if level in levels else self.mk(level, low, high)
+        self._and_exists_cache[key] = result
+        return result
+
+    def rename(self, u: int, mapping: Dict[int, int]) -> int:
+        """
+        Renames the variables according to the mapping between levels, which needs to preserve the variable order on
+        the variables occurring in u
+        """
+        key = tuple(sorted(mapping.items()))
+        return self._rename(u, mapping, key)
+
+    def _rename(self, u: int, mapping: Dict[int, int], key: tuple) -> int:
+        if u <= 1:
+            return u
+        cache_key = (u, key)
+        result = self._rename_cache.get(cache_key)
+        if result is not None:
+            return result
+        low, high = self._rename(self._low[u], mapping, key), self._rename(self._high[u], mapping, key)
+        level = mapping.get(self._level[u], self._level[u])
+        if level >= self._level[low] or level >= self._level[high]:
+            raise ValueError("The renaming does not preserve the variable order")
+        result = self.mk(level, low, high)
+        self._rename_cache[cache_key] = result
+        return result
+
+    def cube(self, assignment: Dict[str, bool]) -> int:
+        """
+        Builds the conjunction of the given literals
+        """
+        result = BDD.TRUE
+        for name, value in sorted(assignment.items(), key=lambda item: -self.name_to_level[item[0]]):
+            level = self.name_to_level[name]
+            result = self.mk(level, BDD.FALSE, result) if value else self.mk(level, result, BDD.FALSE)
+        return result
+
+    def evaluate(self, u: int, assignment: Dict[str, bool]) -> bool:
+        while u > 1:
+            u = self._high[u] if assignment[self.var_names[self._level[u]]] else self._low[u]
+        return u == 1
+
+    def sat_count(self, u: int, levels: Iterable[int]) -> int:
+        """
+        Counts the satisfying assignments of u over the given variables, which need to contain the support of u
+        """
+        levels = sorted(levels)
+        position = {level: idx for idx, level in enumerate(levels)}
+        cache = dict()
+
+        def count(node):
+            # Number of assignments to the variables from the level of node on
+            if node <= 1:
+                return node
+            if node not in cache:
+                skipped_low = self._skipped(node, self._low[node], position, len(levels))
+                skipped_high = self._skipped(node, self._high[node], position, len(levels))
+                cache[node] = count(self._low[node]) * 2 ** skipped_low + count(self._high[node]) * 2 ** skipped_high
+            return cache[node]
+
+        if u <= 1:
+            return u * 2 ** len(levels)
+        return count(u) * 2 ** position[self._level[u]]
+
+    def _skipped(self, parent: int, child: int, position: Dict[int, int], num_levels: int) -> int:
+        child_position = num_levels if child <= 1 else position[self._level[child]]
+        return child_position - position[self._level[parent]] - 1
+
+    def pick_one(self, u: int) -> Dict[str, bool]:
+        """
+        Returns a satisfying partial assignment of u, which needs to be satisfiable
+        """
+        if u == BDD.FALSE:
+            raise ValueError("The BDD is unsatisfiable")
+        assignment = dict()
+        while u > 1:
+            name = self.var_names[self._level[u]]
+            if self._low[u] != BDD.FALSE:
+                assignment[name], u = False, self._low[u]
+            else:
+                assignment[name], u = True, self._high[u]
+        return assignment
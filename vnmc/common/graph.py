@@ -1,4 +1,8 @@
 import abc
+from array import array
+from typing import Dict
+
+import numpy as np
 
 
 class Graph(abc.ABC):
@@ -53,3 +57,121 @@ class GraphEdge(abc.ABC):
 
     def __str__(self):
         return f"{str(self.source)} -> {str(self.target)}"
+
+
+class CSRAdjacency:
+    """
+    Adjacency of a graph over the integer node ids 0, ..., n-1 in compressed sparse row format, i.e. the
+    successors of node i are indices[indptr[i]:indptr[i + 1]]
+
+    Parameters
+    ----------
+    num_nodes: int
+        Number of nodes
+    sources: np.ndarray
+        Source ids of the edges
+    targets: np.ndarray
+        Target ids of the edges
+    """
+
+    def __init__(self, num_nodes: int, sources: np.ndarray, targets: np.ndarray):
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        order = np.argsort(sources, kind="stable")
+        self.num_nodes = num_nodes
+        self.indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=num_nodes), out=self.indptr[1:])
+        self.indices = targets[order]
+
+    def get_successors(self, node_id: int) -> np.ndarray:
+        return self.indices[self.indptr[node_id]:self.indptr[node_id + 1]]
+
+    def transpose(self):
+        sources = np.repeat(np.arange(self.num_nodes, dtype=np.int64), np.diff(self.indptr))
+        return CSRAdjacency(self.num_nodes, self.indices, sources)
+
+
+class CSRGraph:
+    """
+    Compact edge store shared by the models. Nodes are the integer ids 0, ..., n-1. During construction, edges are
+    appended to flat typed buffers, optionally with one value per column, e.g. a probability or the id of a label.
+    Freezing compiles the buffers into the forward and backward CSR adjacency, and the columns into arrays aligned
+    with the forward adjacency, i.e. the edge at position k of successors.indices has the values columns[name][k].
+    Appending edges after freezing is allowed and requires freezing again.
+
+    Parameters
+    ----------
+    columns: Dict[str, str]
+        Names of the edge columns with the typecodes of their buffers, e.g. {"p": "d"}
+    unique: bool
+        Whether freezing removes duplicate edges, i.e. edges with the same source, target and column values
+    """
+
+    def __init__(self, columns: Dict[str, str] = None, unique=True):
+        self.num_nodes = 0
+        self.unique = unique
+        self._sources = array("q")
+        self._targets = array("q")
+        self._buffers = {name: array(typecode) for name, typecode in (columns or dict()).items()}
+        self.successors: CSRAdjacency = None
+        self.predecessors: CSRAdjacency = None
+        self.columns: Dict[str, np.ndarray] = dict()
+        self.predecessor_edges: np.ndarray = None
+        self.is_frozen = False
+
+    def add_node(self) -> int:
+        self.num_nodes += 1
+        self.is_frozen = False
+        return self.num_nodes - 1
+
+    def add_edge(self, source: int, target: int, **values):
+        self._sources.append(source)
+        self._targets.append(target)
+        for name, buffer in self._buffers.items():
+            buffer.append(values[name])
+        self.is_frozen = False
+
+    @property
+    def num_edges(self):
+        return len(self.successors.indices) if self.is_frozen else len(self._sources)
+
+    def freeze(self):
+        """
+        Compiles the edge buffers into the CSR arrays, the edges of every node are kept in insertion order
+        """
+        sources = np.frombuffer(self._sources, dtype=np.int64) if self._sources else np.zeros(0, dtype=np.int64)
+        targets = np.frombuffer(self._targets, dtype=np.int64) if self._targets else np.zeros(0, dtype=np.int64)
+        columns = {name: np.array(buffer) for name, buffer in self._buffers.items()}
+        keep = np.ones(len(sources), dtype=np.bool_)
+        if self.unique and len(sources) > 0:
+            # Keep the first occurrence of every edge
+            order = np.lexsort([columns[name] for name in sorted(columns)] + [targets, sources])
+            keys = [sources[order], targets[order]] + [columns[name][order] for name in sorted(columns)]
+            duplicate = np.zeros(len(order), dtype=np.bool_)
+            duplicate[1:] = np.logical_and.reduce([key[1:] == key[:-1] for key in keys])
+            keep[order[duplicate]] = False
+        sources, targets = sources[keep], targets[keep]
+        order = np.argsort(sources, kind="stable")
+        self.successors = CSRAdjacency(self.num_nodes, sources, targets)
+        self.columns = {name: column[keep][order] for name, column in columns.items()}
+        self.predecessor_edges = np.argsort(self.successors.indices, kind="stable")
+        self.predecessors = CSRAdjacency(self.num_nodes, self.successors.indices, self.edge_sources())
+        self.is_frozen = True
+
+    def edge_sources(self) -> np.ndarray:
+        """
+        Returns the source of every edge of the forward adjacency
+        """
+        return np.repeat(np.arange(self.num_nodes, dtype=np.int64), np.diff(self.successors.indptr))
+
+    def restrict(self, edges: np.ndarray) -> CSRAdjacency:
+        """
+        Returns the forward adjacency of the edges selected by the boolean mask
+        """
+        return CSRAdjacency(self.num_nodes, self.edge_sources()[edges], self.successors.indices[edges])
+
+    def get_edges(self, node_id: int) -> slice:
+        """
+        Returns the positions of the outgoing edges of a node in the forward arrays
+        """
+        return slice(self.successors.indptr[node_id], self.successors.indptr[node_id + 1])
@@ -1,7 +1,10 @@
 from collections import deque
-from typing import List, Any, Callable
+from typing import List, Any, Callable, Tuple
 
-from vnmc.common.graph import Graph
+import numpy as np
+from numba import njit
+
+from vnmc.common.graph import Graph, CSRAdjacency
 
 
 def dfs(graph: Graph, nodes: List[Any], forward = True):
@@ -16,10 +19,200 @@ def dfs(graph: Graph, nodes: List[Any], forward = True):
     return explored
 
 
+@njit(cache=True)
+def _csr_reachable(indptr: np.ndarray, indices: np.ndarray, explored: np.ndarray, allowed: np.ndarray):
+    stack = np.empty(len(explored), dtype=np.int64)
+    size = 0
+    for node in range(len(explored)):
+        if explored[node]:
+            stack[size] = node
+            size += 1
+    while size > 0:
+        size -= 1
+        current = stack[size]
+        for k in range(indptr[current], indptr[current + 1]):
+            succ = indices[k]
+            if not explored[succ] and allowed[succ]:
+                explored[succ] = True
+                stack[size] = succ
+                size += 1
+    return explored
+
+
+def reachable(adjacency: CSRAdjacency, initial: np.ndarray, allowed: np.ndarray = None) -> np.ndarray:
+    """
+    Computes the nodes reachable from the initial nodes, where only allowed nodes are traversed
+
+    Parameters
+    ----------
+    adjacency: CSRAdjacency
+        Adjacency of the graph, pass the transposed adjacency for backward reachability
+    initial: np.ndarray
+        Boolean mask of the initial nodes
+    allowed: np.ndarray
+        Boolean mask of the nodes that may be visited, all nodes by default
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask of the reachable nodes (including the initial nodes)
+    """
+    allowed = np.ones(adjacency.num_nodes, dtype=np.bool_) if allowed is None else allowed
+    return _csr_reachable(adjacency.indptr, adjacency.indices, np.array(initial, dtype=np.bool_), allowed)
+
+
+@njit(cache=True)
+def _csr_layers(indptr: np.ndarray, indices: np.ndarray, initial: np.ndarray, allowed: np.ndarray):
+    layers = np.full(len(initial), -1, dtype=np.int64)
+    queue = np.empty(len(initial), dtype=np.int64)
+    tail = 0
+    for node in range(len(initial)):
+        if initial[node]:
+            layers[node] = 0
+            queue[tail] = node
+            tail += 1
+    head = 0
+    while head < tail:
+        current = queue[head]
+        head += 1
+        for k in range(indptr[current], indptr[current + 1]):
+            succ = indices[k]
+            if layers[succ] < 0 and allowed[succ]:
+                layers[succ] = layers[current] + 1
+                queue[tail] = succ
+                tail += 1
+    return layers
+
+
+def bfs_layers(adjacency: CSRAdjacency, initial: np.ndarray, allowed: np.ndarray = None) -> np.ndarray:
+    """
+    Computes the breadth-first layers of the nodes reachable from the initial nodes, where only allowed nodes are
+    traversed. Every node in layer k > 0 has a predecessor in layer k - 1, hence a shortest path to the initial
+    nodes is found by descending the layers along the transposed adjacency.
+
+    Parameters
+    ----------
+    adjacency: CSRAdjacency
+        Adjacency of the graph, pass the transposed adjacency for backward reachability
+    initial: np.ndarray
+        Boolean mask of the initial nodes, which form layer 0
+    allowed: np.ndarray
+        Boolean mask of the nodes that may be visited, all nodes by default
+
+    Returns
+    -------
+    np.ndarray
+        The layer of every node, which is -1 for the nodes that are not reachable
+    """
+    allowed = np.ones(adjacency.num_nodes, dtype=np.bool_) if allowed is None else allowed
+    return _csr_layers(adjacency.indptr, adjacency.indices, np.asarray(initial, dtype=np.bool_), allowed)
+
+
+@njit(cache=True)
+def _csr_sccs(indptr: np.ndarray, indices: np.ndarray, allowed: np.ndarray):
+    # Iterative version of Pearce's space-efficient variant of Tarjan's algorithm. rindex holds the DFS index of the
+    # active nodes, lowered to the smallest reachable index, and n - 1 - label for the nodes of completed SCCs, which
+    # are labelled in the order of completion, i.e. in reverse topological order.
+    n = len(allowed)
+    rindex = np.zeros(n, dtype=np.int64)
+    root = np.zeros(n, dtype=np.bool_)
+    edge = np.zeros(n, dtype=np.int64)
+    call_stack = np.empty(n, dtype=np.int64)
+    scc_stack = np.empty(n, dtype=np.int64)
+    call_size, scc_size = 0, 0
+    index, component = 1, n - 1
+    for start in range(n):
+        if not allowed[start] or rindex[start] != 0:
+            continue
+        rindex[start], root[start], edge[start] = index, True, indptr[start]
+        index += 1
+        call_stack[0] = start
+        call_size = 1
+        while call_size > 0:
+            v = call_stack[call_size - 1]
+            if edge[v] < indptr[v + 1]:
+                w = indices[edge[v]]
+                if allowed[w] and rindex[w] == 0:
+                    # Descend, the edge is revisited after w is finished
+                    rindex[w], root[w], edge[w] = index, True, indptr[w]
+                    index += 1
+                    call_stack[call_size] = w
+                    call_size += 1
+                    continue
+                if allowed[w] and rindex[w] < rindex[v]:
+                    rindex[v] = rindex[w]
+                    root[v] = False
+                edge[v] += 1
+                continue
+            call_size -= 1
+            if root[v]:
+                index -= 1
+                while scc_size > 0 and rindex[v] <= rindex[scc_stack[scc_size - 1]]:
+                    scc_size -= 1
+                    rindex[scc_stack[scc_size]] = component
+                    index -= 1
+                rindex[v] = component
+                component -= 1
+            else:
+                scc_stack[scc_size] = v
+                scc_size += 1
+    labels = np.where(allowed, n - 1 - rindex, -1)
+    return n - 1 - component, labels
+
+
+def compute_sccs(adjacency: CSRAdjacency, allowed: np.ndarray = None) -> Tuple[int, np.ndarray]:
+    """
+    Computes the strongly connected components of the subgraph induced by the allowed nodes with an iterative
+    version of Pearce's variant of Tarjan's algorithm, hence the depth of the graph is not limited by the recursion
+    limit
+
+    Parameters
+    ----------
+    adjacency: CSRAdjacency
+        Adjacency of the graph
+    allowed: np.ndarray
+        Boolean mask of the nodes of the subgraph, all nodes by default
+
+    Returns
+    -------
+    Tuple[int, np.ndarray]
+        The number of SCCs and the SCC label of every node, which is -1 for the nodes that are not allowed. The SCCs
+        are labelled in reverse topological order, i.e. every edge between different SCCs leads to a smaller label.
+    """
+    allowed = np.ones(adjacency.num_nodes, dtype=np.bool_) if allowed is None else np.asarray(allowed, dtype=np.bool_)
+    return _csr_sccs(adjacency.indptr, adjacency.indices, allowed)
+
+
+def bottom_sccs(adjacency: CSRAdjacency, num_sccs: int, labels: np.ndarray) -> List[np.ndarray]:
+    """
+    Selects the bottom SCCs, i.e. the SCCs without edges to other SCCs
+
+    Returns
+    -------
+    List[np.ndarray]
+        The node ids of every bottom SCC
+    """
+    sources = np.repeat(np.arange(adjacency.num_nodes, dtype=np.int64), np.diff(adjacency.indptr))
+    leaving = labels[sources[labels[sources] != labels[adjacency.indices]]]
+    bottom = np.ones(num_sccs, dtype=np.bool_)
+    bottom[leaving[leaving >= 0]] = False
+    return [scc for label, scc in enumerate(group_by_label(num_sccs, labels)) if bottom[label]]
+
+
+def group_by_label(num_labels: int, labels: np.ndarray) -> List[np.ndarray]:
+    """
+    Groups the node ids by their label, nodes with negative labels are omitted
+    """
+    nodes = np.flatnonzero(labels >= 0)
+    order = nodes[np.argsort(labels[nodes], kind="stable")]
+    boundaries = np.cumsum(np.bincount(labels[nodes], minlength=num_labels))[:-1]
+    return np.split(order, boundaries) if num_labels > 0 else []
+
+
 def get_path(graph: Graph, node, targets):
     pred = dict()
     queue = deque([node])
-    explored = set()
+    explored = {node}
     targets = set(targets)
     target = None
     while queue:
@@ -27,10 +220,10 @@ def get_path(graph: Graph, node, targets):
         if current in targets:
             target = current
             break
-        explored.add(current)
         for succ in graph.get_graph_successors(current):
             if succ not in explored:
-                pred[succ] = node
+                explored.add(succ)
+                pred[succ] = current
                 queue.append(succ)
 
     # Backtrack
@@ -47,45 +240,229 @@ def get_path(graph: Graph, node, targets):
     return path
 
 
+@njit(cache=True)
+def _csr_bfs(indptr: np.ndarray, indices: np.ndarray, source: int, targets: np.ndarray, allowed: np.ndarray,
+             min_one_step: bool):
+    # Returns the BFS parents and the first target found, or -1. If min_one_step holds, the source is not explored
+    # before its first expansion, hence it is found again as a target only via a cycle.
+    n = len(allowed)
+    parent = np.full(n, -1, dtype=np.int64)
+    explored = np.zeros(n, dtype=np.bool_)
+    queue = np.empty(n + 1, dtype=np.int64)
+    if not min_one_step:
+        if targets[source]:
+            return parent, source
+        explored[source] = True
+    queue[0] = source
+    head, tail = 0, 1
+    while head < tail:
+        current = queue[head]
+        head += 1
+        for k in range(indptr[current], indptr[current + 1]):
+            succ = indices[k]
+            if allowed[succ] and not explored[succ]:
+                explored[succ] = True
+                parent[succ] = current
+                if targets[succ]:
+                    return parent, succ
+                queue[tail] = succ
+                tail += 1
+    return parent, -1
+
+
+def bfs_path(adjacency: CSRAdjacency, source: int, targets: np.ndarray, allowed: np.ndarray = None,
+             min_one_step=False) -> List[int]:
+    """
+    Computes a shortest path from the source to one of the targets by a breadth-first search with a parent array
+
+    Parameters
+    ----------
+    adjacency: CSRAdjacency
+        Adjacency of the graph
+    source: int
+        The node id the path starts from
+    targets: np.ndarray
+        Boolean mask of the targets
+    allowed: np.ndarray
+        Boolean mask of the nodes the path may visit after the source, all nodes by default
+    min_one_step: bool
+        Whether the path needs to have at least one edge, e.g. to close a cycle through the source
+
+    Returns
+    -------
+    List[int]
+        The node ids of the path including the source and the target, or None if no target is reachable
+    """
+    allowed = np.ones(adjacency.num_nodes, dtype=np.bool_) if allowed is None else allowed
+    parent, target = _csr_bfs(adjacency.indptr, adjacency.indices, source, np.asarray(targets, dtype=np.bool_),
+                              allowed, min_one_step)
+    if target < 0:
+        return None
+    path = [target]
+    if target == source and not min_one_step:
+        return path
+    current = parent[target]
+    while current != source:
+        path.append(current)
+        current = parent[current]
+    path.append(source)
+    path.reverse()
+    return [int(node) for node in path]
+
+
+def find_accepting_lasso(adjacency: CSRAdjacency, initial: int, accepting_sets: List[np.ndarray]):
+    """
+    Searches for a lasso from the initial node whose cycle visits every accepting set, i.e. an accepting run of a
+    generalized Büchi automaton. The non-trivial SCCs of the reachable nodes that intersect every accepting set are
+    accepting. The stem is a shortest path to an accepting SCC, found by a single breadth-first search, and the cycle
+    visits the accepting sets in turn by breadth-first searches restricted to the SCC, hence the lasso is computed in
+    time linear in the size of the graph for a fixed number of accepting sets.
+
+    Parameters
+    ----------
+    adjacency: CSRAdjacency
+        Adjacency of the graph
+    initial: int
+        The initial node id
+    accepting_sets: List[np.ndarray]
+        Boolean masks of the accepting sets, without accepting sets every infinite run is accepting
+
+    Returns
+    -------
+    Tuple[List[int], List[int]]
+        The path from the initial node to the cycle (excluding the first node of the cycle) and the cycle, whose last
+        node has an edge to its first node, or None if there is no accepting lasso
+    """
+    initial_mask = np.zeros(adjacency.num_nodes, dtype=np.bool_)
+    initial_mask[initial] = True
+    reachable_nodes = reachable(adjacency, initial_mask)
+    num_sccs, labels = compute_sccs(adjacency, reachable_nodes)
+    sources = np.repeat(np.arange(adjacency.num_nodes, dtype=np.int64), np.diff(adjacency.indptr))
+    internal = (labels[sources] >= 0) & (labels[sources] == labels[adjacency.indices])
+    accepting_sccs = np.zeros(num_sccs, dtype=np.bool_)
+    accepting_sccs[labels[sources[internal]]] = True
+    for accepting_set in accepting_sets:
+        hit = np.zeros(num_sccs, dtype=np.bool_)
+        hit[labels[accepting_set & reachable_nodes]] = True
+        accepting_sccs &= hit
+
+    in_accepting_scc = reachable_nodes & accepting_sccs[labels]
+    stem = bfs_path(adjacency, initial, in_accepting_scc)
+    if stem is None:
+        return None
+    entry = stem[-1]
+    scc = labels == labels[entry]
+    cycle, current = [entry], entry
+    for accepting_set in accepting_sets:
+        path = bfs_path(adjacency, current, accepting_set & scc, allowed=scc)
+        cycle.extend(path[1:])
+        current = path[-1]
+    entry_mask = np.zeros(adjacency.num_nodes, dtype=np.bool_)
+    entry_mask[entry] = True
+    cycle.extend(bfs_path(adjacency, current, entry_mask, allowed=scc, min_one_step=True)[1:-1])
+    return stem[:-1], cycle
+
+
+def nested_dfs(initial_nodes: List[Any], successors: Callable[[Any], List[Any]], accepting: Callable[[Any], bool]):
+    """
+    Searches for a reachable cycle through an accepting node with the nested depth-first search of Courcoubetis et
+    al., where the successors are only computed when a node is expanded. The outer (blue) search starts an inner (red)
+    search from every accepting node after its successors have been explored. The red search stops as soon as it
+    reaches a node on the blue stack, which closes a cycle through the accepting node. Red marks are kept across
+    inner searches, hence every node is visited at most twice.
+
+    Parameters
+    ----------
+    initial_nodes: List[Any]
+        The nodes the search starts from
+    successors: Callable[[Any], List[Any]]
+        Computes the successors of a node
+    accepting: Callable[[Any], bool]
+        Decides whether a node is accepting
+
+    Returns
+    -------
+    Tuple[List[Any], List[Any]]
+        A lasso given by a path from an initial node to the cycle (excluding the first node of the cycle) and the
+        cycle, or None if there is no accepting cycle
+    """
+    blue, red = set(), set()
+    for initial in initial_nodes:
+        if initial in blue:
+            continue
+        blue.add(initial)
+        # The blue stack holds the nodes with their remaining successors, on_stack maps the nodes to their position
+        stack = [(initial, iter(successors(initial)))]
+        on_stack = {initial: 0}
+        while stack:
+            node, remaining = stack[-1]
+            succ = next(remaining, None)
+            if succ is not None:
+                if succ not in blue:
+                    blue.add(succ)
+                    on_stack[succ] = len(stack)
+                    stack.append((succ, iter(successors(succ))))
+                continue
+            if accepting(node):
+                red_path = _red_dfs(node, successors, on_stack, red)
+                if red_path is not None:
+                    position = on_stack[red_path[-1]]
+                    path = [n for n, _ in stack]
+                    return path[:position], path[position:] + red_path[1:-1]
+            stack.pop()
+            del on_stack[node]
+    return None
+
+
+def _red_dfs(seed, successors: Callable[[Any], List[Any]], on_stack, red):
+    # Returns the path from the seed to a node on the blue stack, whose last element is that node
+    red.add(seed)
+    stack = [(seed, iter(successors(seed)))]
+    while stack:
+        node, remaining = stack[-1]
+        succ = next(remaining, None)
+        if succ is None:
+            stack.pop()
+        elif succ in on_stack:
+            return [n for n, _ in stack] + [succ]
+        elif succ not in red:
+            red.add(succ)
+            stack.append((succ, iter(successors(succ))))
+    return None
+
+
 def tarjan(graph: Graph, node):
-    necklace = []
-    active = set()
-    dfs_num = 0
-    state_to_num = dict()
-    sccs = []
-    pred = dict()
+    """
+    Computes the non-trivial SCCs reachable from a node, i.e. the SCCs with at least one edge. The reachable nodes
+    are numbered by a breadth-first search and the SCCs are computed on the integer-indexed graph by compute_sccs.
 
-    def tarjan_dfs(node):
-        nonlocal dfs_num
-        state_to_num[node] = dfs_num
-        dfs_num += 1
-        active.add(node)
-        necklace.append((node, {node}))
-
-        for succ in graph.get_graph_successors(node):
-            if succ in active:
-                scc = set()
-                u, subset = necklace.pop()
-                scc = scc.union(subset)
-                while state_to_num[u] > state_to_num[succ]:
-                    u, subset = necklace.pop()
-                    scc = scc.union(subset)
-                necklace.append((u, scc))
-            elif succ not in state_to_num:
-                pred[succ] = node
-                tarjan_dfs(succ)
-
-        root, scc = necklace[-1]
-        if root == node:
-            necklace.pop()
-            sccs.append(scc)
-            for node in scc:
-                active.remove(node)
-
-    tarjan_dfs(node)
+    Returns
+    -------
+    Tuple[List[Set], Dict]
+        The SCCs in reverse topological order and the predecessors of the nodes in the breadth-first search
+    """
+    nodes, node_ids, pred = [node], {node: 0}, dict()
+    sources, targets = [], []
+    queue = deque([node])
+    while queue:
+        current = queue.popleft()
+        for succ in graph.get_graph_successors(current):
+            if succ not in node_ids:
+                node_ids[succ] = len(nodes)
+                nodes.append(succ)
+                pred[succ] = current
+                queue.append(succ)
+            sources.append(node_ids[current])
+            targets.append(node_ids[succ])
 
+    adjacency = CSRAdjacency(len(nodes), sources, targets)
+    num_sccs, labels = compute_sccs(adjacency)
     # Only return real SCCs
-    sccs = [scc for scc in sccs if len(scc) > 1 or next(iter(scc)) in graph.get_graph_successors(next(iter(scc)))]
+    sources, targets = np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64)
+    non_trivial = np.zeros(num_sccs, dtype=np.bool_)
+    non_trivial[labels[sources[labels[sources] == labels[targets]]]] = True
+    sccs = [{nodes[idx] for idx in scc} for label, scc in enumerate(group_by_label(num_sccs, labels))
+            if non_trivial[label]]
 
     return sccs, pred
 
@@ -106,7 +106,7 @@ class ConjunctionCTL(CTLFormula):
     def accept(self, visitor: CTLVisitor):
         phi1 = self.phi1.accept(visitor)
         phi2 = self.phi2.accept(visitor)
-        return visitor.visit_conjunction(self, self, phi1, phi2)
+        return visitor.visit_conjunction(self, phi1, phi2)
 
     def __eq__(self, other):
         if isinstance(other, ConjunctionCTL):
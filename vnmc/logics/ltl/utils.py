@@ -2,7 +2,7 @@ import itertools
 from itertools import combinations, chain
 from typing import Set, List
 
-from vnmc.common.automaton import GBA
+from vnmc.common.automaton import GBA, Guard
 from vnmc.logics.ltl.syntax import LTLVisitor, LTLFormula, ConjunctionLTL, UntilLTL, NegationLTL, AtomicPropositionLTL, \
     NextLTL, TrueLTL, FalseLTL
 
@@ -155,7 +155,7 @@ def _check_consistent(formulae_set: Set[LTLFormula], closure: Set[LTLFormula]):
             if phi not in formulae_set:
                 return False
         if phi in formulae_set:
-            if phi.phi1 not in formulae_set or phi.phi1 not in formulae_set:
+            if phi.phi1 not in formulae_set or phi.phi2 not in formulae_set:
                 return False
 
     # Check local consistency w.r.t Until-operator
@@ -187,20 +187,169 @@ def compute_elementary_sets(phi: LTLFormula, atomic_propositions=None):
     return elementary
 
 
-def ltl_to_gba(phi: LTLFormula, atomic_propositions: List[AtomicPropositionLTL] = None):
+class _LTLToNNF(LTLVisitor):
+    """
+    Computes the negation normal forms of a formula and of its negation. The normal forms are nested tuples, where
+    negations only occur in literals ("ap", symbol, polarity) and the dual of until is release ("R", phi1, phi2).
+    """
+
+    def visit_true(self, element):
+        return ("true",), ("false",)
+
+    def visit_false(self, element):
+        return ("false",), ("true",)
+
+    def visit_atomic_proposition(self, element):
+        return ("ap", element.symbol, True), ("ap", element.symbol, False)
+
+    def visit_conjunction(self, element, phi1, phi2):
+        return ("and", phi1[0], phi2[0]), ("or", phi1[1], phi2[1])
+
+    def visit_disjunction(self, element, phi1, phi2):
+        return ("or", phi1[0], phi2[0]), ("and", phi1[1], phi2[1])
+
+    def visit_negation(self, element, phi):
+        return phi[1], phi[0]
+
+    def visit_next(self, element, phi):
+        return ("X", phi[0]), ("X", phi[1])
+
+    def visit_until(self, element, phi1, phi2):
+        return ("U", phi1[0], phi2[0]), ("R", phi1[1], phi2[1])
+
+
+_INIT = -1
+
+
+def _expand_tableau(nnf):
+    """
+    Builds the tableau of Gerth, Peled, Vardi and Wolper for a formula in negation normal form. A node is a triple of
+    its incoming node ids (_INIT for the initial nodes), the formulae that hold in it and the formulae that have to
+    hold in its successors. Nodes are only created when they are reachable from the initial nodes, and nodes with the
+    same formulae are merged.
+    """
+    nodes = []
+    node_ids = dict()
+    # Every entry of the stack is a node under construction: incoming, formulae to be processed, processed
+    # formulae and formulae of the successors
+    stack = [({_INIT}, [nnf], set(), set())]
+    while stack:
+        incoming, new, old, next = stack.pop()
+        if not new:
+            key = (frozenset(old), frozenset(next))
+            if key in node_ids:
+                nodes[node_ids[key]][0].update(incoming)
+            else:
+                node_ids[key] = len(nodes)
+                nodes.append((set(incoming), key[0], key[1]))
+                stack.append(({node_ids[key]}, sorted(key[1], key=repr), set(), set()))
+            continue
+        eta = new.pop()
+        if eta in old:
+            stack.append((incoming, new, old, next))
+            continue
+        kind = eta[0]
+        if kind == "false" or (kind == "ap" and ("ap", eta[1], not eta[2]) in old):
+            continue
+        old.add(eta)
+        if kind == "and":
+            new.extend(psi for psi in eta[1:] if psi not in old)
+        elif kind == "X":
+            next.add(eta[1])
+        elif kind in ("or", "U", "R"):
+            # phi1 U phi2 = phi2 or (phi1 and X(phi1 U phi2)), phi1 R phi2 = phi2 and (phi1 or X(phi1 R phi2))
+            if kind == "or":
+                new1, next1, new2 = [eta[1]], [], [eta[2]]
+            elif kind == "U":
+                new1, next1, new2 = [eta[1]], [eta], [eta[2]]
+            else:
+                new1, next1, new2 = [eta[2]], [eta], [eta[1], eta[2]]
+            stack.append((set(incoming), new + [psi for psi in new2 if psi not in old], set(old), set(next)))
+            new.extend(psi for psi in new1 if psi not in old)
+            next.update(next1)
+        stack.append((incoming, new, old, next))
+    return nodes
+
+
+def _nnf_subformulae(nnf):
+    result = {nnf}
+    for psi in nnf[1:]:
+        if isinstance(psi, tuple):
+            result.update(_nnf_subformulae(psi))
+    return result
+
+
+def ltl_to_gba(phi: LTLFormula, atomic_propositions: List[AtomicPropositionLTL] = None, tableau=True):
+    """
+    Translates an LTL formula to a generalized Büchi automaton over the powerset of the atomic propositions. The letter
+    of a transition is read in its source state.
+
+    Parameters
+    ----------
+    phi: LTLFormula
+        The formula
+    atomic_propositions: List[AtomicPropositionLTL]
+        The atomic propositions of the alphabet, by default the atomic propositions of the formula
+    tableau: bool
+        Whether the states are built on the fly by the tableau construction, which only creates reachable states,
+        otherwise the states are the elementary sets of the closure
+
+    Returns
+    -------
+    GBA
+    """
+    if tableau:
+        return _tableau_to_gba(phi, atomic_propositions)
+    return _elementary_sets_to_gba(phi, atomic_propositions)
+
+
+def _tableau_to_gba(phi: LTLFormula, atomic_propositions: List[AtomicPropositionLTL] = None):
+    nnf = phi.accept(_LTLToNNF())[0]
+    nodes = _expand_tableau(nnf)
+    atomic_propositions = [ap for ap in compute_closure(phi) if isinstance(ap, AtomicPropositionLTL)] \
+        if atomic_propositions is None else atomic_propositions
+    gba = GBA(atomic_propositions)
+
+    states = [gba.create_state(name=f"s_{idx}", formulae=old) for idx, (_, old, _) in enumerate(nodes)]
+    for idx, (incoming, _, _) in enumerate(nodes):
+        if _INIT in incoming:
+            gba.initial_states.add(states[idx])
+
+    for until in [psi for psi in _nnf_subformulae(nnf) if psi[0] == "U"]:
+        gba.accepting_state_sets.append({states[idx] for idx, (_, old, _) in enumerate(nodes)
+                                         if until not in old or until[2] in old})
+
+    # The transitions leaving a node are guarded by its literals, negative literals of atomic propositions outside
+    # of the alphabet always hold and positive ones never
+    guards = []
+    for _, old, _ in nodes:
+        literals = [(AtomicPropositionLTL(psi[1]), psi[2]) for psi in old if psi[0] == "ap"]
+        if any(polarity and ap not in gba.ap_to_bit for ap, polarity in literals):
+            guards.append(None)
+            continue
+        positive = gba.letter_to_mask(ap for ap, polarity in literals if polarity)
+        negative = gba.letter_to_mask(ap for ap, polarity in literals if not polarity and ap in gba.ap_to_bit)
+        guards.append(Guard(positive, negative))
+    for idx, (incoming, _, _) in enumerate(nodes):
+        for source in incoming:
+            if source != _INIT and guards[source] is not None and guards[source].is_satisfiable():
+                gba.create_guarded_transition(states[source], guards[source], states[idx])
+    return gba
+
+
+def _elementary_sets_to_gba(phi: LTLFormula, atomic_propositions: List[AtomicPropositionLTL] = None):
     # Compute elementary sets
     elementary_sets = compute_elementary_sets(phi, atomic_propositions)
     n = len(elementary_sets)
 
-    # Compute alphabet and initialize alphabet
+    # Compute the atomic propositions and initialize the automaton
     closure = compute_closure(phi)
     atomic_propositions = [ap for ap in closure if isinstance(ap, AtomicPropositionLTL)] if atomic_propositions is None \
         else atomic_propositions
     closure = set(closure).union(atomic_propositions)
     nexts = [phi for phi in closure if isinstance(phi, NextLTL)]
     untils = [phi for phi in closure if isinstance(phi, UntilLTL)]
-    alphabet = set([frozenset(subset) for subset in compute_powerset(atomic_propositions)])
-    gba = GBA(alphabet)
+    gba = GBA(atomic_propositions)
 
     # Create GBA states
     states = []
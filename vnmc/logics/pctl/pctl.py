@@ -31,6 +31,12 @@ class PCTLVisitor(abc.ABC):
     def visit_next(self, element, phi):
         pass
 
+    def enter_probability_operator(self, element):
+        """
+        Called before the path formula of the probability operator is visited
+        """
+        pass
+
     @abc.abstractmethod
     def visit_probability_operator(self, element, phi):
         pass
@@ -39,6 +45,10 @@ class PCTLVisitor(abc.ABC):
     def visit_until(self, element, phi1, phi2):
         pass
 
+    def visit_steady_state(self, element, phi):
+        # Not abstract, such that visitors written before the steady-state operator remain instantiable
+        raise NotImplementedError(f"{type(self).__name__} does not support the steady-state operator")
+
     @abc.abstractmethod
     def visit_bounded_until(self, element, phi1, phi2):
         pass
@@ -118,7 +128,7 @@ class ConjunctionPCTL(PCTLStateFormula):
     def accept(self, visitor: PCTLVisitor):
         phi1 = self.phi1.accept(visitor)
         phi2 = self.phi2.accept(visitor)
-        return visitor.visit_conjunction(self, self, phi1, phi2)
+        return visitor.visit_conjunction(self, phi1, phi2)
 
     def __eq__(self, other):
         if isinstance(other, ConjunctionPCTL):
@@ -186,9 +196,16 @@ class ProbabilityOperatorPCTL(PCTLStateFormula):
         self.ub = ub
 
     def accept(self, visitor: PCTLVisitor):
+        visitor.enter_probability_operator(self)
         phi = self.phi.accept(visitor)
         return visitor.visit_probability_operator(self, phi)
 
+    def is_qualitative(self):
+        """
+        Returns true if the bounds only distinguish between probability 0, probability 1 and everything in between
+        """
+        return (self.lb <= 0 or self.lb >= 1) and (self.ub <= 0 or self.ub >= 1)
+
     def __eq__(self, other):
         if isinstance(other, ProbabilityOperatorPCTL):
             return other.phi == self.phi
@@ -201,6 +218,31 @@ class ProbabilityOperatorPCTL(PCTLStateFormula):
         return f"𝗣[{self.lb}, {self.ub}]({str(self.phi)})"
 
 
+class SteadyStatePCTL(PCTLStateFormula):
+
+    def __init__(self, phi: PCTLStateFormula, lb: float, ub: float):
+        if lb > ub:
+            raise ValueError("The lower bound has to be smaller than the upper bound")
+        self.phi = phi
+        self.lb = lb
+        self.ub = ub
+
+    def accept(self, visitor: PCTLVisitor):
+        phi = self.phi.accept(visitor)
+        return visitor.visit_steady_state(self, phi)
+
+    def __eq__(self, other):
+        if isinstance(other, SteadyStatePCTL):
+            return other.phi == self.phi and other.lb == self.lb and other.ub == self.ub
+        return False
+
+    def __hash__(self):
+        return hash(self.phi) + 5
+
+    def __str__(self):
+        return f"𝗦[{self.lb}, {self.ub}]({str(self.phi)})"
+
+
 class NextPCTL(PCTLPathFormula):
 
     def __init__(self, phi: PCTLStateFormula):
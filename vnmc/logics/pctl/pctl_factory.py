@@ -1,5 +1,6 @@
 from vnmc.logics.pctl.pctl import TruePCTL, FalsePCTL, AtomicPropositionPCTL, PCTLStateFormula, NegationPCTL, \
-    ConjunctionPCTL, DisjunctionPCTL, PCTLPathFormula, ProbabilityOperatorPCTL, NextPCTL, UntilPCTL, BoundedUntilPCTL
+    ConjunctionPCTL, DisjunctionPCTL, PCTLPathFormula, ProbabilityOperatorPCTL, NextPCTL, UntilPCTL, BoundedUntilPCTL, \
+    SteadyStatePCTL
 
 
 def state_formulae_arguments(func):
@@ -46,6 +47,11 @@ def P(phi: PCTLPathFormula, lb: float, ub: float):
     return ProbabilityOperatorPCTL(phi, lb=lb, ub=ub)
 
 
+@state_formulae_arguments
+def S(phi: PCTLStateFormula, lb: float, ub: float):
+    return SteadyStatePCTL(phi, lb=lb, ub=ub)
+
+
 @state_formulae_arguments
 def X(phi: PCTLStateFormula):
     return NextPCTL(phi)
@@ -1,45 +1,45 @@
 from collections import deque
-from typing import Set
+from typing import Callable, Dict, List, Set
 
-from vnmc.logics.ctl.ctl import AtomicPropositionCTL, CTLVisitor, CTLFormula
+import numpy as np
+
+from vnmc.common.graph_algorithms import reachable, compute_sccs, bfs_layers, bfs_path
+from vnmc.logics.ctl.ctl import AtomicPropositionCTL, CTLVisitor, CTLFormula, ConjunctionCTL, DisjunctionCTL, \
+    ExistsGloballyCTL, ExistsNextCTL, ExistsUntilCTL, NegationCTL
 from vnmc.logics.ctl.ctl_factory import AP
-from vnmc.model_checking.kripke import KripkeStructure
-from vnmc.timp.command import Configuration
+from vnmc.model_checking.kripke import KripkeStructure, _KripkeState
+from vnmc.model_checking.symbolic_ctl_model_checking import model_check_ctl_symbolic
+from vnmc.timp.cfg import compile_module
 from vnmc.timp.module import Module
-from vnmc.timp.preprocessing import VariableCollector
 
 
 def timp_to_kripke(module: Module):
     kripke = KripkeStructure()
-    variables = module.command.accept_visitor(VariableCollector())
-    init_config = Configuration(command=module.command, state={v: False for v in variables})
-    queue = deque([init_config])
-    explored = set()
+    cfg = compile_module(module)
+    queue = deque([cfg.initial])
     state_ids = 1
-    config_to_state = dict()
+    key_to_state = dict()
+    variable_aps = [AP(v.name) for v in cfg.variables]
+
+    def create_state(key, name):
+        true_variables: Set[AtomicPropositionCTL] = {ap for idx, ap in enumerate(variable_aps) if key >> idx & 1}
+        atomic_propositions = set(map(AP, cfg.get_annotations(key))).union(true_variables)
+        key_to_state[key] = kripke.create_state(name=name, config=cfg.to_configuration(key),
+                                                atomic_propositions=atomic_propositions)
 
-    true_variables: Set[AtomicPropositionCTL] = {AP(v.name) for v in init_config.state if init_config.state[v]}
-    atomic_propositions = set(map(AP, init_config.command.get_annotations(init_config.state))).union(true_variables)
-    config_to_state[init_config] = kripke.create_state(name="init",
-                                                       config=init_config,
-                                                       atomic_propositions=atomic_propositions)
-    kripke.initial_states.add(config_to_state[init_config])
+    create_state(cfg.initial, "init")
+    kripke.initial_states.add(key_to_state[cfg.initial])
 
-    # Start GBA creation
+    # Explore the packed configurations of the control-flow graph, a configuration is discovered when its state is
+    # created
     while queue:
         current = queue.popleft()
-        explored.add(current)
-
-        for config in current.get_successors():
-            if config not in explored:
-                queue.append(config)
-                true_variables: Set[AtomicPropositionCTL] = {AP(v.name) for v in config.state if config.state[v]}
-                atomic_propositions = set(map(AP, current.command.get_annotations(current.state))).union(true_variables)
-                config_to_state[config] = kripke.create_state(name=f"q_{state_ids}",
-                                                              config=config,
-                                                              atomic_propositions=atomic_propositions)
+        for key in cfg.get_successors(current):
+            if key not in key_to_state:
+                queue.append(key)
+                create_state(key, f"q_{state_ids}")
                 state_ids += 1
-            kripke.create_transition(source=config_to_state[current], target=config_to_state[config])
+            kripke.create_transition(source=key_to_state[current], target=key_to_state[key])
 
     return kripke
 
@@ -71,27 +71,270 @@ class GlobalCTLModelChecker(CTLVisitor):
         return self.kripke_structure.get_predecessors(phi)
 
     def visit_eu(self, element, phi1: Set, phi2: Set):
-        satisfying_states = set()
-        updated_set = phi2
-        while satisfying_states != updated_set:
-            satisfying_states = updated_set
-            updated_set = phi1.intersection(self.kripke_structure.get_predecessors(satisfying_states))
-            updated_set = updated_set.union(phi2)
+        # Backward search from phi2 through phi1 states, every state is added to the worklist at most once
+        satisfying_states = set(phi2)
+        worklist = deque(phi2)
+        while worklist:
+            current = worklist.pop()
+            for pred in self.kripke_structure.get_predecessors(current):
+                if pred not in satisfying_states and pred in phi1:
+                    satisfying_states.add(pred)
+                    worklist.append(pred)
         return satisfying_states
 
     def visit_eg(self, element, phi: Set):
-        # Compute fixpoint
-        satisfying_states = set()
-        updated_set = phi
-        while satisfying_states != updated_set:
-            satisfying_states = updated_set
-            updated_set = phi.intersection(self.kripke_structure.get_predecessors(satisfying_states))
+        # Count the successors of every phi state that satisfy phi, states whose count drops to 0 cannot continue an
+        # infinite phi path and are removed, which in turn decrements the counts of their predecessors
+        satisfying_states = set(phi)
+        count = {state: len(phi.intersection(self.kripke_structure.get_successors(state))) for state in phi}
+        worklist = deque(state for state in phi if count[state] == 0)
+        while worklist:
+            current = worklist.pop()
+            satisfying_states.discard(current)
+            for pred in self.kripke_structure.get_predecessors(current):
+                if pred in satisfying_states:
+                    count[pred] -= 1
+                    if count[pred] == 0:
+                        worklist.append(pred)
         return satisfying_states
 
 
-def model_check_ctl(module: Module, phi: CTLFormula):
+class CTLEvidence:
+    """
+    Evidence that a state satisfies or violates a CTL formula, which is a tree: the node explains the formula by a
+    lasso-shaped path starting in the state, and the children explain the subformulas the path relies on. Formulas
+    without path evidence, e.g. atomic propositions and conjunctions, have the path consisting of the state alone.
+
+    Parameters
+    ----------
+    formula: CTLFormula
+        The explained formula
+    holds: bool
+        Whether the state satisfies the formula, i.e. the node is a witness, otherwise it is a counterexample
+    stem: List
+        The stem of the path, the cycle follows its last state
+    cycle: List
+        The cycle of the path, whose last state is followed by its first state, empty for finite paths
+    children: List[CTLEvidence]
+        The evidence of the subformulas
+    """
+
+    def __init__(self, formula: CTLFormula, holds: bool, stem: List, cycle: List, children: List["CTLEvidence"]):
+        self.formula = formula
+        self.holds = holds
+        self.stem = stem
+        self.cycle = cycle
+        self.children = children
+
+    @property
+    def state(self):
+        return (self.stem + self.cycle)[0]
+
+    def map_states(self, f: Callable) -> "CTLEvidence":
+        """
+        Returns the evidence where every state is replaced by its image under f
+        """
+        return CTLEvidence(self.formula, self.holds, [f(s) for s in self.stem], [f(s) for s in self.cycle],
+                           [child.map_states(f) for child in self.children])
+
+    def __repr__(self):
+        return f"CTLEvidence(formula={self.formula}, holds={self.holds}, stem={self.stem}, cycle={self.cycle}, " \
+               f"children={len(self.children)})"
+
+
+class VectorizedCTLModelChecker(CTLVisitor):
+    """
+    Global CTL model checker that represents satisfaction sets by boolean masks indexed by the state ids. Boolean
+    operators are element-wise operations, EX scatters over the edge arrays, EU is a backward reachability restricted
+    to the states satisfying the first operand and EG is the backward reachability of the non-trivial SCCs of the
+    states satisfying the operand.
+
+    If evidence is recorded, the checker keeps the satisfaction set of every subformula, and the backward searches
+    of EU and EG are breadth-first searches that keep their layers: the layer of an EU state is its distance to the
+    states satisfying the second operand, the layer (ring) of an EG state is its distance to the non-trivial SCCs.
+    Witnesses and counterexamples are then extracted by descending the layers.
+
+    Parameters
+    ----------
+    kripke_structure: KripkeStructure
+        The Kripke structure, whose adjacency is built if necessary
+    record_evidence: bool
+        Whether the information for witnesses and counterexamples is recorded
+    """
+
+    def __init__(self, kripke_structure: KripkeStructure, record_evidence=False):
+        self.kripke_structure = kripke_structure
+        if not kripke_structure.is_built:
+            kripke_structure.build_adjacency()
+        adjacency = kripke_structure.successors
+        self._sources = np.repeat(np.arange(adjacency.num_nodes, dtype=np.int64), np.diff(adjacency.indptr))
+        self.record_evidence = record_evidence
+        self.satisfaction: Dict[CTLFormula, np.ndarray] = dict()
+        self.layers: Dict[CTLFormula, np.ndarray] = dict()
+        self.scc_labels: Dict[CTLFormula, np.ndarray] = dict()
+
+    @property
+    def num_states(self):
+        return self.kripke_structure.state_ids
+
+    def _record(self, element, result: np.ndarray) -> np.ndarray:
+        if self.record_evidence:
+            self.satisfaction[element] = result
+        return result
+
+    def visit_ap(self, element) -> np.ndarray:
+        return self._record(element, np.fromiter((element in state.atomic_propositions
+                                                  for state in self.kripke_structure.id_to_state),
+                                                 dtype=np.bool_, count=self.num_states))
+
+    def visit_true(self, element) -> np.ndarray:
+        return self._record(element, np.ones(self.num_states, dtype=np.bool_))
+
+    def visit_false(self, element) -> np.ndarray:
+        return self._record(element, np.zeros(self.num_states, dtype=np.bool_))
+
+    def visit_conjunction(self, element, phi1: np.ndarray, phi2: np.ndarray) -> np.ndarray:
+        return self._record(element, phi1 & phi2)
+
+    def visit_disjunction(self, element, phi1: np.ndarray, phi2: np.ndarray) -> np.ndarray:
+        return self._record(element, phi1 | phi2)
+
+    def visit_negation(self, element, phi: np.ndarray) -> np.ndarray:
+        return self._record(element, ~phi)
+
+    def visit_ex(self, element, phi: np.ndarray) -> np.ndarray:
+        result = np.zeros(self.num_states, dtype=np.bool_)
+        result[self._sources[phi[self.kripke_structure.successors.indices]]] = True
+        return self._record(element, result)
+
+    def visit_eu(self, element, phi1: np.ndarray, phi2: np.ndarray) -> np.ndarray:
+        if not self.record_evidence:
+            return reachable(self.kripke_structure.predecessors, phi2, allowed=phi1)
+        self.layers[element] = bfs_layers(self.kripke_structure.predecessors, phi2, allowed=phi1)
+        return self._record(element, self.layers[element] >= 0)
+
+    def visit_eg(self, element, phi: np.ndarray) -> np.ndarray:
+        adjacency = self.kripke_structure.successors
+        num_sccs, labels = compute_sccs(adjacency, phi)
+        # An SCC is non-trivial if it has an internal edge, i.e. more than one state or a self-loop
+        internal = labels[self._sources] == labels[adjacency.indices]
+        non_trivial = np.zeros(num_sccs + 1, dtype=np.bool_)
+        non_trivial[labels[self._sources[internal & phi[self._sources]]]] = True
+        # The states not satisfying phi have label -1, which refers to the extra entry that remains False
+        initial = non_trivial[labels]
+        if not self.record_evidence:
+            return reachable(self.kripke_structure.predecessors, initial, allowed=phi)
+        self.layers[element] = bfs_layers(self.kripke_structure.predecessors, initial, allowed=phi)
+        self.scc_labels[element] = labels
+        return self._record(element, self.layers[element] >= 0)
+
+    def get_witness(self, phi: CTLFormula, state: _KripkeState) -> CTLEvidence:
+        """
+        Computes a witness that a state satisfies a formula, which has been checked with recorded evidence. The
+        witness of EX is a transition to a successor satisfying the operand, the witness of EU is a finite path
+        through states satisfying the first operand to a state satisfying the second operand, and the witness of EG
+        is a lasso of states satisfying the operand. The witness of a negation is the counterexample of its operand,
+        i.e. the witness of a violated universal formula is a path of the dual existential formula.
+
+        The evidence of the subformulas is attached as children: both operands of a conjunction, a satisfied operand
+        of a disjunction, the operand of EX at the successor and the second operand of EU at the end of the path.
+        Dually, a counterexample of a disjunction explains both operands and that of a conjunction a violated operand.
+
+        Returns
+        -------
+        CTLEvidence
+            The witness, whose paths consist of Kripke states
+        """
+        return self._explain(phi, state.state_id, True).map_states(lambda idx: self.kripke_structure.id_to_state[idx])
+
+    def get_counterexample(self, phi: CTLFormula, state: _KripkeState) -> CTLEvidence:
+        """
+        Computes a counterexample that a state violates a formula, i.e. a witness that the state satisfies the
+        negation of the formula (see get_witness)
+        """
+        return self._explain(phi, state.state_id, False).map_states(lambda idx: self.kripke_structure.id_to_state[idx])
+
+    def _explain(self, phi: CTLFormula, state_id: int, positive: bool) -> CTLEvidence:
+        # Evidence over state ids for phi holding at the state if positive holds, otherwise for phi being violated.
+        # Only existential formulas that hold and their negations that are violated have path evidence.
+        if self.satisfaction[phi][state_id] != positive:
+            raise ValueError(f"The state does not {'satisfy' if positive else 'violate'} the formula")
+        if isinstance(phi, NegationCTL):
+            return self._explain(phi.phi, state_id, not positive)
+        if isinstance(phi, (ConjunctionCTL, DisjunctionCTL)):
+            operands = [phi.phi1, phi.phi2]
+            if isinstance(phi, ConjunctionCTL) != positive:
+                # A satisfied disjunction or a violated conjunction is explained by its first deciding operand
+                operands = [next(psi for psi in operands if self.satisfaction[psi][state_id] == positive)]
+            return CTLEvidence(phi, positive, [state_id], [], [self._explain(psi, state_id, positive)
+                                                               for psi in operands])
+        if not positive:
+            return CTLEvidence(phi, positive, [state_id], [], [])
+        successors = self.kripke_structure.successors
+        if isinstance(phi, ExistsNextCTL):
+            operand = self.satisfaction[phi.phi]
+            succ = next(succ for succ in successors.get_successors(state_id).tolist() if operand[succ])
+            return CTLEvidence(phi, positive, [state_id, succ], [], [self._explain(phi.phi, succ, True)])
+        if isinstance(phi, (ExistsUntilCTL, ExistsGloballyCTL)):
+            # Descend the layers to layer 0
+            layers, path = self.layers[phi], [state_id]
+            while layers[path[-1]] > 0:
+                path.append(next(succ for succ in successors.get_successors(path[-1]).tolist()
+                                 if layers[succ] == layers[path[-1]] - 1))
+            if isinstance(phi, ExistsUntilCTL):
+                return CTLEvidence(phi, positive, path, [], [self._explain(phi.phi2, path[-1], True)])
+            # Close a cycle within the non-trivial SCC of the last state
+            entry = path[-1]
+            labels = self.scc_labels[phi]
+            entry_mask = np.zeros(self.num_states, dtype=np.bool_)
+            entry_mask[entry] = True
+            cycle = bfs_path(successors, entry, entry_mask, allowed=labels == labels[entry], min_one_step=True)
+            return CTLEvidence(phi, positive, path[:-1], cycle[:-1], [])
+        return CTLEvidence(phi, positive, [state_id], [], [])
+
+
+def model_check_ctl(module: Module, phi: CTLFormula, vectorized=True, symbolic=False, evidence=False):
+    """
+    Checks whether all initial configurations of the module satisfy the CTL formula
+
+    Parameters
+    ----------
+    module: Module
+        The model to be verified
+    phi: CTLFormula
+        The formula to be satisfied
+    vectorized: bool
+        Whether the satisfaction sets are boolean masks, otherwise they are sets of states
+    symbolic: bool
+        Whether the module is checked symbolically with BDDs
+    evidence: bool
+        Whether a witness or counterexample is returned alongside the verdict, which is only supported by the
+        vectorized explicit model checker
+
+    Returns
+    -------
+    Union[bool, Tuple[bool, CTLEvidence]]
+        The verdict and, if evidence is requested, a witness for an initial configuration if the formula is
+        satisfied, otherwise a counterexample for a violating initial configuration. The paths of the evidence
+        consist of configurations (see VectorizedCTLModelChecker.get_witness).
+    """
+    if evidence and (symbolic or not vectorized):
+        raise ValueError("Evidence is only supported by the vectorized explicit model checker")
+    if symbolic:
+        return model_check_ctl_symbolic(module, phi)
     kripke_structure = timp_to_kripke(module)
+    if evidence:
+        checker = VectorizedCTLModelChecker(kripke_structure, record_evidence=True)
+        global_result = phi.accept(checker)
+        initial_states = sorted(kripke_structure.initial_states, key=lambda s: s.state_id)
+        violating = [state for state in initial_states if not global_result[state.state_id]]
+        if violating:
+            result = checker.get_counterexample(phi, violating[0])
+        else:
+            result = checker.get_witness(phi, initial_states[0])
+        return not violating, result.map_states(lambda state: state.config)
+    if vectorized:
+        global_result = phi.accept(VectorizedCTLModelChecker(kripke_structure))
+        return bool(np.all(global_result[[state.state_id for state in kripke_structure.initial_states]]))
     global_result = phi.accept(GlobalCTLModelChecker(kripke_structure))
     return kripke_structure.initial_states.issubset(global_result)
-
-
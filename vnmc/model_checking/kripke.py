@@ -1,7 +1,9 @@
-from typing import Set, Dict, Union
+from typing import FrozenSet, List, Set, Union
+
+import numpy as np
 
 from vnmc.logics.ctl.ctl import AtomicPropositionCTL
-from vnmc.common.graph import Graph
+from vnmc.common.graph import Graph, CSRAdjacency, CSRGraph
 
 
 class _KripkeState:
@@ -45,43 +47,94 @@ class _KripkeTransition:
 
 
 class KripkeStructure(Graph):
+    """
+    Kripke structure whose transitions are stored in a CSRGraph over the state ids, the adjacency is built lazily
+    when the successors or predecessors are first queried after a modification
+    """
 
     def __init__(self):
         self.states: Set[_KripkeState] = set()
         self.initial_states: Set[_KripkeState] = set()
-        self.transitions: Set[_KripkeTransition] = set()
-        self.state_to_successors: Dict[_KripkeState, Set[_KripkeState]] = dict()
-        self.state_to_predecessors: Dict[_KripkeState, Set[_KripkeState]] = dict()
-        self.state_ids = 0
+        self.graph = CSRGraph()
+        self.id_to_state: List[_KripkeState] = []
+        # Transition objects, built on first access and discarded on modification
+        self._transitions: FrozenSet[_KripkeTransition] = None
+
+    @property
+    def state_ids(self):
+        return self.graph.num_nodes
+
+    @property
+    def is_built(self):
+        return self.graph.is_frozen
+
+    @property
+    def successors(self) -> CSRAdjacency:
+        return self.graph.successors
+
+    @property
+    def predecessors(self) -> CSRAdjacency:
+        return self.graph.predecessors
+
+    @property
+    def transitions(self) -> FrozenSet[_KripkeTransition]:
+        if self._transitions is None:
+            if not self.is_built:
+                self.build_adjacency()
+            self._transitions = frozenset(_KripkeTransition(self.id_to_state[source], self.id_to_state[target])
+                                          for source, target in zip(self.graph.edge_sources().tolist(),
+                                                                    self.graph.successors.indices.tolist()))
+        return self._transitions
 
     def get_initial_state(self):
         return next(iter(self.initial_states))
 
     def create_state(self, name: str, atomic_propositions: Set[AtomicPropositionCTL], **kwargs):
-        state = _KripkeState(name=name, state_id=self.state_ids, atomic_propositions=atomic_propositions, **kwargs)
+        state = _KripkeState(name=name, state_id=self.graph.add_node(), atomic_propositions=atomic_propositions,
+                             **kwargs)
         self.states.add(state)
-        self.state_ids += 1
+        self.id_to_state.append(state)
         return state
 
-    def create_transition(self, source: _KripkeState, target: _KripkeTransition):
-        transition = _KripkeTransition(source, target)
-        successors = self.state_to_successors.setdefault(source, set())
-        successors.add(target)
-        predecessors = self.state_to_predecessors.setdefault(target, set())
-        predecessors.add(source)
-        self.transitions.add(transition)
-        return transition
+    def create_transition(self, source: _KripkeState, target: _KripkeState):
+        self.graph.add_edge(source.state_id, target.state_id)
+        self._transitions = None
+        return _KripkeTransition(source, target)
+
+    def build_adjacency(self):
+        """
+        Builds the forward and backward adjacency over the state ids
+        """
+        self.graph.freeze()
+
+    def to_mask(self, states: Set[_KripkeState]) -> np.ndarray:
+        mask = np.zeros(self.state_ids, dtype=np.bool_)
+        mask[[state.state_id for state in states]] = True
+        return mask
+
+    def to_states(self, mask: np.ndarray) -> Set[_KripkeState]:
+        return set([self.id_to_state[idx] for idx in np.flatnonzero(mask)])
+
+    def _to_states(self, state_ids: np.ndarray) -> Set[_KripkeState]:
+        return {self.id_to_state[idx] for idx in state_ids.tolist()}
 
     def get_successors(self, state: _KripkeState) -> Set[_KripkeState]:
-        return self.state_to_successors.get(state, set())
+        if not self.is_built:
+            self.build_adjacency()
+        return self._to_states(self.successors.get_successors(state.state_id))
 
     def get_predecessors(self, states: Union[_KripkeState, Set[_KripkeState]]) -> Set[_KripkeState]:
+        if not self.is_built:
+            self.build_adjacency()
         if isinstance(states, _KripkeState):
-            states = {states}
+            return self._to_states(self.predecessors.get_successors(states.state_id))
         predecessors = set()
         for state in states:
-            predecessors = predecessors.union(self.state_to_predecessors.get(state, set()))
+            predecessors.update(self._to_states(self.predecessors.get_successors(state.state_id)))
         return predecessors
 
     def get_graph_successors(self, node):
-        return self.state_to_successors.get(node, set())
\ No newline at end of file
+        return self.get_successors(node)
+
+    def get_graph_predecessors(self, node):
+        return self.get_predecessors(node)
@@ -1,17 +1,21 @@
+import numpy as np
+
 from vnmc.common.automaton import ProductGBA
-from vnmc.common.graph_algorithms import tarjan, get_path
+from vnmc.common.graph_algorithms import find_accepting_lasso, nested_dfs
 from vnmc.logics.ltl.syntax import LTLFormula, AtomicPropositionLTL
 from vnmc.logics.ltl.utils import ltl_to_gba, compute_closure
+from vnmc.timp.cfg import compile_module
 from vnmc.timp.module import Module
 from vnmc.timp.preprocessing import AnnotationCollector
 from vnmc.timp.utils import timp_to_gba
 
 
 def counterexample_from_path(path):
-    return [str(s) for s in path]
+    # The configuration of a product state is the configuration of its module state
+    return [s.props["q"].props["config"] for s in path]
 
 
-def model_check_ltl(module: Module, phi: LTLFormula):
+def model_check_ltl(module: Module, phi: LTLFormula, on_the_fly=True):
     """
     Checks whether the module statisfies the LTL formula
 
@@ -21,10 +25,19 @@ def model_check_ltl(module: Module, phi: LTLFormula):
         The model to be verified
     phi: LTLFormula
         The formula to be satisfied
+    on_the_fly: bool
+        Whether the product of the module and the automaton of the negated formula is explored on the fly by a nested
+        depth-first search, which is the default. Otherwise the product is built completely and an accepting lasso is
+        extracted from its SCCs, which serves as a reference implementation. The automata can be inspected with
+        their to_dot methods, the check itself does not write any files.
 
     Returns
     -------
-
+    Tuple[bool, Tuple[List[Configuration], List[Configuration]]]
+        The verdict and a counterexample, which is None if the formula is satisfied. A counterexample is a lasso-shaped
+        run given by the pair (stem, cycle) of configuration lists: the run starts with the stem, which may be empty,
+        and then repeats the cycle forever, i.e. the last configuration of the stem is followed by the first
+        configuration of the cycle, and the last configuration of the cycle is followed by its first configuration
     """
     module_aps = [AtomicPropositionLTL(a) for a in module.command.accept_visitor(AnnotationCollector())]
     phi_aps = [ap for ap in compute_closure(phi) if isinstance(ap, AtomicPropositionLTL)]
@@ -32,37 +45,55 @@ def model_check_ltl(module: Module, phi: LTLFormula):
     if not set(phi_aps).issubset(module_aps):
         raise ValueError("The atomic propositions in the LTL formula have to be part of the modules annotations")
 
+    if on_the_fly:
+        return _model_check_ltl_on_the_fly(module, phi, module_aps)
+
     module_gba = timp_to_gba(module)
     neg_phi_gba = ltl_to_gba(phi.negate(), atomic_propositions=list(module_aps))
+    if not neg_phi_gba.initial_states:
+        # The negated formula is unsatisfiable
+        return True, None
 
     product = ProductGBA(gba1=module_gba, gba2=neg_phi_gba)
     init = product.create_single_initial_state()
     init.props["q"] = module_gba.get_initial_state()
 
-    with open("module_gba.txt", "w") as f:
-        f.write(module_gba.to_dot(state_formatter=lambda s: s.props["config"].pretty(),
-                                  letter_formatter=lambda l: "{" + ", ".join(map(str, l)) + "}"))
-
-    with open("neg_phi_gba.txt", "w") as f:
-        f.write(neg_phi_gba.to_dot(letter_formatter=lambda l: "{" + ", ".join(map(str, l)) + "}"))
+    accepting_sets = [np.fromiter((s.props.get("p") in accepting_set for s in product.id_to_state), dtype=np.bool_,
+                                  count=len(product.id_to_state))
+                      for accepting_set in neg_phi_gba.accepting_state_sets]
+    lasso = find_accepting_lasso(product.get_adjacency(), product.get_initial_state().state_id, accepting_sets)
+    if lasso is None:
+        return True, None
+    stem, cycle = lasso
+    return False, (counterexample_from_path([product.id_to_state[idx] for idx in stem]),
+                   counterexample_from_path([product.id_to_state[idx] for idx in cycle]))
 
-    with open("product_gba.txt", "w") as f:
-        f.write(product.to_dot(letter_formatter=lambda l: "{" + ", ".join(map(str, l)) + "}"))
 
-    sccs, pred = tarjan(product, product.get_initial_state())
-
-    if len(sccs) > 0 and len(neg_phi_gba.accepting_state_sets) == 0:
-        cex = counterexample_from_path(get_path(product, product.get_initial_state(), sccs[-1]))
-        return False, cex
-
-    for scc in sccs:
-        states = [s.props["p"] for s in scc]
-        counter = 0
-        for accepting_set in neg_phi_gba.accepting_state_sets:
-            if len(accepting_set.intersection(states)) > 0:
-                counter += 1
-        if counter == len(neg_phi_gba.accepting_state_sets):
-            cex = counterexample_from_path(get_path(product, product.get_initial_state(), scc))
-            return False, cex
-
-    return True, None
+def _model_check_ltl_on_the_fly(module: Module, phi: LTLFormula, module_aps):
+    cfg = compile_module(module)
+    neg_phi_gba = ltl_to_gba(phi.negate(), atomic_propositions=list(module_aps))
+    # Degeneralization: a product node (key, p, i) waits for the i-th accepting set, a formula automaton without
+    # accepting sets accepts every infinite run
+    accepting_sets = neg_phi_gba.accepting_state_sets if neg_phi_gba.accepting_state_sets else [neg_phi_gba.states]
+    k = len(accepting_sets)
+    letter_masks = dict()
+
+    def successors(node):
+        key, p, i = node
+        annotations = cfg.get_annotations(key)
+        if annotations not in letter_masks:
+            letter_masks[annotations] = neg_phi_gba.letter_to_mask(map(AtomicPropositionLTL, annotations))
+        formula_successors = neg_phi_gba.get_mask_successors(p, letter_masks[annotations])
+        next_i = (i + 1) % k if p in accepting_sets[i] else i
+        return [(succ_key, succ_p, next_i) for succ_key in cfg.get_successors(key) for succ_p in formula_successors]
+
+    def accepting(node):
+        _, p, i = node
+        return i == 0 and p in accepting_sets[0]
+
+    lasso = nested_dfs([(cfg.initial, p, 0) for p in neg_phi_gba.initial_states], successors, accepting)
+    if lasso is None:
+        return True, None
+    stem, cycle = lasso
+    return False, ([cfg.to_configuration(key) for key, _, _ in stem],
+                   [cfg.to_configuration(key) for key, _, _ in cycle])
@@ -1,9 +1,12 @@
-from typing import Dict, Union
+import warnings
+from typing import Dict, List, Set, Tuple, Union
+
+import numpy as np
 
 from vnmc.logics.pctl.pctl import PCTLVisitor, PCTLStateFormula
-from vnmc.probabilistic import DTMC
+from vnmc.probabilistic import DTMC, MDP
 from vnmc.probabilistic.dtmc.dtmc import DTMCState
-from vnmc.probabilistic.mdp.mdp import MDP
+from vnmc.probabilistic.dtmc.engine import IntervalIterationResult, is_decided
 
 
 class DTMCModelChecker(PCTLVisitor):
@@ -30,13 +33,7 @@ class DTMCModelChecker(PCTLVisitor):
         return self.dtmc.states.difference(phi)
 
     def visit_next(self, element, phi) -> Dict[DTMCState, float]:
-        result = dict()
-        for state in self.dtmc.states:
-            result[state] = 0
-            for t in self.dtmc.transitions:
-                if t.source == state and t.target in phi:
-                    result[state] += t.get_probability()
-        return result
+        return self.dtmc.compute_next_probabilities(target_states=phi)
 
     def visit_probability_operator(self, element, phi: Dict[DTMCState, float]):
         lb, ub = element.lb, element.ub
@@ -60,10 +57,201 @@ class DTMCModelChecker(PCTLVisitor):
             result[state] = 1
         return result
 
+    def visit_steady_state(self, element, phi):
+        result = self.dtmc.compute_long_run_probabilities(phi)
+        return set([s for s in result if element.lb <= result[s] <= element.ub])
+
+
+class VectorizedDTMCModelChecker(PCTLVisitor):
+    """
+    PCTL model checker that evaluates state formulae to boolean masks and path formulae to probability vectors, both
+    indexed by the state ids of the DTMC
+
+    Parameters
+    ----------
+    dtmc: DTMC
+        A built DTMC
+    epsilon: float
+        If given, unbounded until is approximated by interval iteration. Below a probability operator, the iteration
+        continues until the bounds of every state lie completely inside or outside of the interval of the operator,
+        hence the verdicts are sound. If the bounds of a state stop improving before that, e.g. because its
+        probability equals a bound of the operator, a RuntimeWarning is issued and the verdict of the state is only a
+        guess by the midpoint of its bounds. These states are recorded in the undecided mask of the corresponding
+        entry of solver_results. Path formulae outside of a probability operator are approximated up to epsilon.
+    """
+
+    def __init__(self, dtmc: DTMC, epsilon: float = None):
+        self.dtmc = dtmc
+        self.engine = dtmc.engine
+        self.epsilon = epsilon
+        self.solver_results: List[IntervalIterationResult] = []
+        self._operators = []
+
+    def visit_ap(self, element) -> np.ndarray:
+        return np.fromiter((element in state.get_atomic_propositions() for state in self.dtmc.id_to_state),
+                           dtype=np.bool_, count=self.engine.num_states)
+
+    def visit_true(self, element) -> np.ndarray:
+        return np.ones(self.engine.num_states, dtype=np.bool_)
+
+    def visit_false(self, element) -> np.ndarray:
+        return np.zeros(self.engine.num_states, dtype=np.bool_)
+
+    def visit_conjunction(self, element, phi1: np.ndarray, phi2: np.ndarray) -> np.ndarray:
+        return phi1 & phi2
+
+    def visit_disjunction(self, element, phi1: np.ndarray, phi2: np.ndarray) -> np.ndarray:
+        return phi1 | phi2
+
+    def visit_negation(self, element, phi: np.ndarray) -> np.ndarray:
+        return ~phi
+
+    def visit_next(self, element, phi: np.ndarray) -> np.ndarray:
+        return self.engine.compute_next_probabilities_vector(phi)
+
+    def enter_probability_operator(self, element):
+        self._operators.append(element)
+
+    def visit_probability_operator(self, element, phi: Union[np.ndarray, IntervalIterationResult]) -> np.ndarray:
+        self._operators.pop()
+        if isinstance(phi, IntervalIterationResult):
+            certain = (element.lb <= phi.lower) & (phi.upper <= element.ub)
+            undecided = ~is_decided(phi.lower, phi.upper, element.lb, element.ub)
+            phi.undecided = undecided
+            if np.any(undecided):
+                warnings.warn(f"The probabilities of {np.count_nonzero(undecided)} states cannot be separated from "
+                              f"the bounds of {element}, their verdicts are guessed by the midpoint of the "
+                              f"computed interval", RuntimeWarning)
+                midpoint = phi.values
+                certain |= undecided & (element.lb <= midpoint) & (midpoint <= element.ub)
+            return certain
+        return (element.lb <= phi) & (phi <= element.ub)
+
+    def visit_until(self, element, phi1: np.ndarray, phi2: np.ndarray) -> np.ndarray:
+        bad_mask = ~(phi1 | phi2)
+        if self._operators and self._operators[-1].is_qualitative():
+            # Qualitative bounds only need the precomputation, the remaining states get an arbitrary value in (0, 1)
+            prob0, prob1 = self.engine.compute_qualitative_reachability_vector(bad_mask=bad_mask, target_mask=phi2)
+            result = np.full(self.engine.num_states, 0.5)
+            result[prob0] = 0
+            result[prob1] = 1
+            return result
+        if self.epsilon is not None:
+            bounds = (self._operators[-1].lb, self._operators[-1].ub) if self._operators else None
+            result = self.engine.compute_reachability_bounds(bad_mask=bad_mask, target_mask=phi2,
+                                                             epsilon=self.epsilon, bounds=bounds)
+            self.solver_results.append(result)
+            return result
+        return self.engine.compute_reachability_vector(bad_mask=bad_mask, target_mask=phi2)
+
+    def visit_bounded_until(self, element, phi1: np.ndarray, phi2: np.ndarray) -> np.ndarray:
+        return self.engine.compute_reachability_vector(bad_mask=~(phi1 | phi2), target_mask=phi2, t=element.k)
+
+    def visit_steady_state(self, element, phi: np.ndarray) -> np.ndarray:
+        result = self.engine.compute_long_run_probabilities_vector(phi)
+        return (element.lb <= result) & (result <= element.ub)
+
+
+class MDPModelChecker(PCTLVisitor):
+    """
+    PCTL model checker for MDPs that evaluates state formulae to boolean masks indexed by the state ids. A state
+    satisfies P[lb, ub](phi) if the probability of phi lies within the bounds under all schedulers, i.e. if the
+    minimal probability is at least lb and the maximal probability is at most ub. Path formulae evaluate to the pair
+    of the minimal and maximal probability vectors, where a bound that cannot be violated is not computed and None.
+
+    Parameters
+    ----------
+    mdp: MDP
+        A built MDP
+    """
+
+    def __init__(self, mdp: MDP):
+        self.mdp = mdp
+        self.engine = mdp.engine
+        self._operators = []
+
+    def visit_ap(self, element) -> np.ndarray:
+        return np.fromiter((element in state.atomic_propositions for state in self.mdp.id_to_state),
+                           dtype=np.bool_, count=self.engine.num_states)
+
+    def visit_true(self, element) -> np.ndarray:
+        return np.ones(self.engine.num_states, dtype=np.bool_)
+
+    def visit_false(self, element) -> np.ndarray:
+        return np.zeros(self.engine.num_states, dtype=np.bool_)
+
+    def visit_conjunction(self, element, phi1: np.ndarray, phi2: np.ndarray) -> np.ndarray:
+        return phi1 & phi2
+
+    def visit_disjunction(self, element, phi1: np.ndarray, phi2: np.ndarray) -> np.ndarray:
+        return phi1 | phi2
+
+    def visit_negation(self, element, phi: np.ndarray) -> np.ndarray:
+        return ~phi
+
+    def _compute_extrema(self, compute) -> Tuple[np.ndarray, np.ndarray]:
+        operator = self._operators[-1] if self._operators else None
+        minimum = compute(False) if operator is None or operator.lb > 0 else None
+        maximum = compute(True) if operator is None or operator.ub < 1 else None
+        return minimum, maximum
+
+    def visit_next(self, element, phi: np.ndarray):
+        return self._compute_extrema(lambda maximize: self.engine.compute_next_probabilities_vector(phi, maximize))
+
+    def enter_probability_operator(self, element):
+        self._operators.append(element)
+
+    def visit_probability_operator(self, element, phi: Tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+        self._operators.pop()
+        minimum, maximum = phi
+        result = np.ones(self.engine.num_states, dtype=np.bool_)
+        if minimum is not None:
+            result &= element.lb <= minimum
+        if maximum is not None:
+            result &= maximum <= element.ub
+        return result
+
+    def visit_until(self, element, phi1: np.ndarray, phi2: np.ndarray):
+        return self._compute_extrema(lambda maximize: self.engine.compute_reachability_vector(
+            bad_mask=~(phi1 | phi2), target_mask=phi2, maximize=maximize))
+
+    def visit_bounded_until(self, element, phi1: np.ndarray, phi2: np.ndarray):
+        return self._compute_extrema(lambda maximize: self.engine.compute_reachability_vector(
+            bad_mask=~(phi1 | phi2), target_mask=phi2, maximize=maximize, t=element.k))
+
+    def visit_steady_state(self, element, phi):
+        raise NotImplementedError("The steady-state operator is not supported for MDPs")
+
+
+def check_pctl(dtmc: DTMC, phi: PCTLStateFormula, epsilon: float = None) -> Set[DTMCState]:
+    """
+    Computes the states of the DTMC satisfying the PCTL state formula
+
+    Parameters
+    ----------
+    dtmc: DTMC
+        A built DTMC
+    phi: PCTLStateFormula
+        The formula to be checked
+    epsilon: float
+        Precision of the interval iteration, unbounded until is solved exactly if None
+
+    Returns
+    -------
+    Set[DTMCState]
+    """
+    return dtmc.engine.to_states(phi.accept(VectorizedDTMCModelChecker(dtmc, epsilon=epsilon)))
+
 
-def model_check_pctl(model: Union[DTMC, MDP], phi: PCTLStateFormula, state):
+def model_check_pctl(model: Union[DTMC, MDP], phi: PCTLStateFormula, state, vectorized=True, epsilon: float = None):
     if isinstance(model, DTMC):
+        if vectorized:
+            result = phi.accept(VectorizedDTMCModelChecker(model, epsilon=epsilon))
+            return bool(result[model.engine.state_to_idx[state]])
         states = phi.accept(DTMCModelChecker(model))
         return state in states
+    elif isinstance(model, MDP):
+        result = phi.accept(MDPModelChecker(model))
+        return bool(result[model.engine.state_to_idx[state]])
     else:
         raise NotImplementedError("Unsupported model type")
\ No newline at end of file
@@ -0,0 +1,227 @@
+from typing import Dict, List
+
+from vnmc.common.bdd import BDD
+from vnmc.logics.ctl.ctl import CTLVisitor, CTLFormula
+from vnmc.timp.cfg import build_decision_trees
+from vnmc.timp.command import Command
+from vnmc.timp.expr import BooleanExpressionVisitor
+from vnmc.timp.module import Module
+
+
+class _ExprToBDD(BooleanExpressionVisitor):
+
+    def __init__(self, bdd: BDD):
+        self.bdd = bdd
+
+    def visit_variable(self, element):
+        return self.bdd.var(element.name)
+
+    def visit_constant(self, element):
+        return BDD.TRUE if element.value else BDD.FALSE
+
+    def visit_conjunction(self, element, expr1, expr2):
+        return self.bdd.conj(expr1, expr2)
+
+    def visit_disjunction(self, element, expr1, expr2):
+        return self.bdd.disj(expr1, expr2)
+
+    def visit_negation(self, element, expr):
+        return self.bdd.neg(expr)
+
+    def visit_brackets(self, element, expr):
+        return expr
+
+
+def _guarded_leaves(expr_to_bdd: _ExprToBDD, tree, guard=BDD.TRUE):
+    """
+    Yields the leaves of a decision tree (see build_decision_trees), each with the BDD of the conjunction of the
+    conditions on its path
+    """
+    if isinstance(tree, tuple) and len(tree) == 3:
+        condition, tree1, tree2 = tree
+        bdd, condition = expr_to_bdd.bdd, condition.accept(expr_to_bdd)
+        yield from _guarded_leaves(expr_to_bdd, tree1, bdd.conj(guard, condition))
+        yield from _guarded_leaves(expr_to_bdd, tree2, bdd.conj(guard, bdd.neg(condition)))
+    else:
+        yield guard, tree
+
+
+class SymbolicTransitionSystem:
+    """
+    Symbolic representation of the state space of a TIMP module. A state consists of a control location, i.e. the
+    command that remains to be executed, encoded by program counter bits, and the valuation of the module variables.
+    Every state bit has a current and a next copy, which are interleaved in the variable order.
+
+    Parameters
+    ----------
+    bdd: BDD
+        The BDD manager
+    locations: List[Command]
+        The control locations, the i-th location is encoded by the binary representation of i
+    current: List[str]
+        Names of the current-state variables
+    next: List[str]
+        Names of the next-state variables
+    """
+
+    def __init__(self, bdd: BDD, locations: List[Command], current: List[str], next: List[str]):
+        self.bdd = bdd
+        self.locations = locations
+        self.current = current
+        self.next = next
+        self.current_levels = frozenset(bdd.name_to_level[name] for name in current)
+        self.next_levels = frozenset(bdd.name_to_level[name] for name in next)
+        self._to_next = {bdd.name_to_level[c]: bdd.name_to_level[n] for c, n in zip(current, next)}
+        self._to_current = {n: c for c, n in self._to_next.items()}
+        self.initial = BDD.FALSE
+        self.transition_relation = BDD.FALSE
+        self.reachable = BDD.FALSE
+        self.labels: Dict[str, int] = dict()
+
+    def to_next(self, u: int) -> int:
+        return self.bdd.rename(u, self._to_next)
+
+    def to_current(self, u: int) -> int:
+        return self.bdd.rename(u, self._to_current)
+
+    def pre(self, u: int) -> int:
+        """
+        Computes the states having a successor in u
+        """
+        return self.bdd.and_exists(self.transition_relation, self.to_next(u), self.next_levels)
+
+    def post(self, u: int) -> int:
+        """
+        Computes the successors of the states in u
+        """
+        return self.to_current(self.bdd.and_exists(self.transition_relation, u, self.current_levels))
+
+    def compute_reachable(self) -> int:
+        """
+        Computes the reachable states by a breadth-first fixpoint iteration that only expands the frontier
+        """
+        reachable, frontier = self.initial, self.initial
+        while frontier != BDD.FALSE:
+            frontier = self.bdd.conj(self.post(frontier), self.bdd.neg(reachable))
+            reachable = self.bdd.disj(reachable, frontier)
+        self.reachable = reachable
+        return reachable
+
+    def count_states(self, u: int) -> int:
+        return self.bdd.sat_count(u, self.current_levels)
+
+
+def timp_to_symbolic(module: Module) -> SymbolicTransitionSystem:
+    """
+    Encodes a module as a symbolic transition system. The control locations and the decision trees of their steps and
+    annotations are shared with the control-flow graph (see build_decision_trees), only their conditions and leaves
+    are encoded as BDDs.
+
+    Parameters
+    ----------
+    module: Module
+        Module
+
+    Returns
+    -------
+    SymbolicTransitionSystem
+    """
+    variables = sorted(module.variables, key=lambda v: v.name)
+    locations, step_trees, label_trees = build_decision_trees(module.command)
+    # The number of locations determines the number of program counter bits, which are placed first in the variable
+    # order
+    num_bits = max(1, (len(locations) - 1).bit_length())
+    pc, pc_next = [f"pc_{i}" for i in range(num_bits)], [f"pc_{i}'" for i in range(num_bits)]
+    current, next = pc + [variable.name for variable in variables], pc_next + [f"{v.name}'" for v in variables]
+    bdd = BDD()
+    for name, name_next in zip(current, next):
+        bdd.add_var(name)
+        bdd.add_var(name_next)
+    system = SymbolicTransitionSystem(bdd, locations, current, next)
+    expr_to_bdd = _ExprToBDD(bdd)
+    location_ids = {location: idx for idx, location in enumerate(locations)}
+
+    def encode(location_id, bits):
+        return bdd.cube({bit: bool(location_id >> idx & 1) for idx, bit in enumerate(bits)})
+
+    unchanged = {variable: bdd.iff(bdd.var(variable.name), bdd.var(f"{variable.name}'")) for variable in variables}
+    for location_id, step_tree in enumerate(step_trees):
+        source = encode(location_id, pc)
+        for guard, (update, next_command) in _guarded_leaves(expr_to_bdd, step_tree):
+            assignments = bdd.conj_all(bdd.iff(bdd.var(f"{variable.name}'"), update[variable].accept(expr_to_bdd))
+                                       if variable in update else unchanged[variable] for variable in variables)
+            step = bdd.conj_all([source, guard, encode(location_ids[next_command], pc_next), assignments])
+            system.transition_relation = bdd.disj(system.transition_relation, step)
+
+    system.initial = bdd.conj(encode(0, pc), bdd.cube({variable.name: False for variable in variables}))
+    system.compute_reachable()
+
+    # States are labelled with their true variables and the annotations of their command
+    for variable in variables:
+        system.labels[variable.name] = bdd.var(variable.name)
+    for location_id, label_tree in enumerate(label_trees):
+        source = encode(location_id, pc)
+        for guard, annotations in _guarded_leaves(expr_to_bdd, label_tree):
+            for annotation in annotations:
+                labelled = bdd.conj(source, guard)
+                system.labels[annotation] = bdd.disj(system.labels.get(annotation, BDD.FALSE), labelled)
+    return system
+
+
+class SymbolicCTLModelChecker(CTLVisitor):
+    """
+    CTL model checker that represents satisfaction sets by BDDs over the current-state variables, restricted to the
+    reachable states. EU and EG are computed as least and greatest fixpoints of the symbolic pre-image.
+
+    Parameters
+    ----------
+    system: SymbolicTransitionSystem
+        The symbolic transition system
+    """
+
+    def __init__(self, system: SymbolicTransitionSystem):
+        self.system = system
+        self.bdd = system.bdd
+
+    def visit_ap(self, element):
+        return self.bdd.conj(self.system.labels.get(element.symbol, BDD.FALSE), self.system.reachable)
+
+    def visit_true(self, element):
+        return self.system.reachable
+
+    def visit_false(self, element):
+        return BDD.FALSE
+
+    def visit_conjunction(self, element, phi1, phi2):
+        return self.bdd.conj(phi1, phi2)
+
+    def visit_disjunction(self, element, phi1, phi2):
+        return self.bdd.disj(phi1, phi2)
+
+    def visit_negation(self, element, phi):
+        return self.bdd.conj(self.bdd.neg(phi), self.system.reachable)
+
+    def visit_ex(self, element, phi):
+        return self.bdd.conj(self.system.pre(phi), self.system.reachable)
+
+    def visit_eu(self, element, phi1, phi2):
+        result = phi2
+        while True:
+            updated = self.bdd.disj(phi2, self.bdd.conj(phi1, self.system.pre(result)))
+            if updated == result:
+                return result
+            result = updated
+
+    def visit_eg(self, element, phi):
+        result = phi
+        while True:
+            updated = self.bdd.conj(phi, self.system.pre(result))
+            if updated == result:
+                return result
+            result = updated
+
+
+def model_check_ctl_symbolic(module: Module, phi: CTLFormula):
+    system = timp_to_symbolic(module)
+    result = phi.accept(SymbolicCTLModelChecker(system))
+    return system.bdd.conj(system.initial, system.bdd.neg(result)) == BDD.FALSE
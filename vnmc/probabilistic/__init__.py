@@ -1 +1,2 @@
-from vnmc.probabilistic.dtmc.dtmc import DTMC
\ No newline at end of file
+from vnmc.probabilistic.dtmc.dtmc import DTMC
+from vnmc.probabilistic.mdp.mdp import MDP
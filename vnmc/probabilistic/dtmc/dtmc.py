@@ -1,13 +1,13 @@
 from __future__ import annotations
 
-from typing import Set, Dict, TYPE_CHECKING
+from typing import Set, Dict, FrozenSet, List, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from vnmc.probabilistic.dtmc.engine import DTMCEngine
 
 from numba import njit
 
-from vnmc.common.graph import Graph, GraphNode, GraphEdge
+from vnmc.common.graph import Graph, GraphNode, GraphEdge, CSRAdjacency, CSRGraph
 
 import numpy as np
 
@@ -42,36 +42,92 @@ class DTMC(Graph):
 
     def __init__(self):
         self.states: Set[DTMCState] = set()
-        self.transitions: Set[DTMCTransition] = set()
-        self.state_ids = 0
+        self.graph = CSRGraph(columns={"p": "d"})
         self.is_built = False
         self.engine: DTMCEngine = None
+        self.id_to_state: List[DTMCState] = []
+        self.successors: CSRAdjacency = None
+        self.predecessors: CSRAdjacency = None
+        # Transition objects, built on first access and discarded on modification
+        self._transitions: FrozenSet[DTMCTransition] = None
+
+    @property
+    def state_ids(self):
+        return self.graph.num_nodes
+
+    @property
+    def transitions(self) -> FrozenSet[DTMCTransition]:
+        if self._transitions is None:
+            sources, targets, probabilities = self.get_transition_arrays()
+            self._transitions = frozenset(DTMCTransition(source=self.id_to_state[source], p=p,
+                                                         target=self.id_to_state[target])
+                                          for source, target, p in zip(sources.tolist(), targets.tolist(),
+                                                                       probabilities.tolist()))
+        return self._transitions
 
     def create_state(self, name, atomic_propositions=None, reward=None):
-        state = DTMCState(name=name, state_id=self.state_ids, atomic_propositions=atomic_propositions,
+        state = DTMCState(name=name, state_id=self.graph.add_node(), atomic_propositions=atomic_propositions,
                           reward=reward)
         self.states.add(state)
-        self.state_ids += 1
+        self.id_to_state.append(state)
+        self.is_built = False
         return state
 
     def create_transition(self, source: DTMCState, p: float, target: DTMCState):
-        transition = DTMCTransition(source=source, p=p, target=target)
-        self.transitions.add(transition)
-        return transition
-
-    def build(self, engine):
+        self.graph.add_edge(source.node_id, target.node_id, p=p)
+        self.is_built = False
+        self._transitions = None
+        return DTMCTransition(source=source, p=p, target=target)
+
+    def build_adjacency(self):
+        """
+        Freezes the transitions and builds the forward and backward adjacency of the transitions with positive
+        probability
+        """
+        self.graph.freeze()
+        self.successors = self.graph.restrict(self.graph.columns["p"] > 0)
+        self.predecessors = self.successors.transpose()
+        self.is_built = True
+
+    def get_transition_arrays(self):
+        """
+        Returns the sources, targets and probabilities of the transitions, where identical transitions are only
+        contained once
+        """
+        if not self.is_built:
+            self.build_adjacency()
+        return self.graph.edge_sources(), self.graph.successors.indices, self.graph.columns["p"]
+
+    def build(self, engine, **kwargs):
+        self.build_adjacency()
         if engine == "sparse":
-            self.engine = DTMCSparseEngine(self)
+            self.engine = DTMCSparseEngine(self, **kwargs)
         elif engine == "dense":
             self.engine = DTMCDenseEngine(self)
         elif engine == "dense-numba":
-            self.engine = DTMCDenseNumbaEngine(self)
+            self.engine = DTMCDenseNumbaEngine(self, **kwargs)
         else:
             raise ValueError("Invalid representation type")
 
     def compute_transient_distribution(self, initial_distribution: Dict[DTMCState, float], t: int):
         return self.engine.compute_transient_distribution(initial_distribution, t)
 
+    def compute_transient_distributions(self, initial_distributions: np.ndarray, horizons):
+        return self.engine.compute_transient_distributions(initial_distributions, horizons)
+
+    def compute_steady_state_distribution(self, initial_distribution: Dict[DTMCState, float]):
+        """
+        Computes the long-run distribution by solving the stationary distribution of every bottom strongly connected
+        component (BSCC) and weighting it with the probability of reaching the BSCC
+        """
+        return self.engine.compute_steady_state_distribution(initial_distribution)
+
+    def compute_long_run_probabilities(self, states: Set[DTMCState]):
+        return self.engine.compute_long_run_probabilities(states)
+
+    def compute_next_probabilities(self, target_states: Set[DTMCState]):
+        return self.engine.compute_next_probabilities(target_states)
+
     def compute_bounded_reachability(self, bad_states: Set[DTMCState], target_states: Set[DTMCState], t: int):
         return self.engine.compute_bounded_reachability(bad_states, target_states, t)
 
@@ -82,7 +138,11 @@ class DTMC(Graph):
         return self.engine.compute_expected_reward(target_states)
 
     def get_graph_successors(self, node):
-        return set([t.target for t in self.transitions if t.source == node and t.get_probability() > 0])
+        if not self.is_built:
+            self.build_adjacency()
+        return set([self.id_to_state[i] for i in self.successors.get_successors(node.node_id)])
 
     def get_graph_predecessors(self, node):
-        return set([t.source for t in self.transitions if t.target == node and t.get_probability() > 0])
\ No newline at end of file
+        if not self.is_built:
+            self.build_adjacency()
+        return set([self.id_to_state[i] for i in self.predecessors.get_successors(node.node_id)])
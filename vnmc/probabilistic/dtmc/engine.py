@@ -6,120 +6,583 @@ if TYPE_CHECKING:
     from vnmc.probabilistic.dtmc.dtmc import DTMCState
 
 import abc
-from typing import Set, Dict
-from vnmc.common.graph_algorithms import dfs
+from concurrent.futures import ThreadPoolExecutor
+from typing import Set, Dict, List
+from vnmc.common.graph_algorithms import reachable, compute_sccs, bottom_sccs
+from vnmc.probabilistic.dtmc.qualitative import compute_prob0, compute_prob1
 from numba import njit
 import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+
+
+class IntervalIterationResult:
+    """
+    Lower and upper bounds on the probabilities computed by interval iteration
+
+    Parameters
+    ----------
+    lower: np.ndarray
+        Lower bound of every state
+    upper: np.ndarray
+        Upper bound of every state
+    iterations: int
+        Number of performed iterations
+    undecided: np.ndarray
+        Mask of the states whose bounds could not be separated from the interval of the probability operator, set by
+        the model checker, None if the result was not checked against an operator
+    """
+
+    def __init__(self, lower: np.ndarray, upper: np.ndarray, iterations: int, undecided: np.ndarray = None):
+        self.lower = lower
+        self.upper = upper
+        self.iterations = iterations
+        self.undecided = undecided
+
+    @property
+    def gap(self) -> float:
+        return float(np.max(self.upper - self.lower)) if len(self.lower) > 0 else 0.0
+
+    @property
+    def values(self) -> np.ndarray:
+        return (self.lower + self.upper) / 2
+
+    def __repr__(self):
+        return f"IntervalIterationResult(iterations={self.iterations}, gap={self.gap})"
+
+
+def interval_iteration(transition_matrix, b: np.ndarray, epsilon: float, max_iterations: int, bounds=None):
+    """
+    Iterates x = Ax + b from below (starting at 0) and from above (starting at 1). Both sequences converge to the
+    unique fixpoint if the probability of staying among the undetermined states forever is 0, which holds after the
+    Prob0/Prob1 precomputation.
+
+    Without bounds, the iteration stops once the gap between the upper and lower bound of every state is at most
+    epsilon. Given the closed interval [lb, ub] of a probability operator, the iteration stops once every state is
+    decided, i.e. its bounds lie completely inside or completely outside of the interval, which is sound regardless
+    of epsilon. A state whose probability equals lb or ub may never be decided, hence the iteration also stops once
+    the bounds no longer change.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, int]
+        Lower bounds, upper bounds and the number of iterations, which is -1 if the iteration did not converge
+    """
+    lower, upper = np.zeros(transition_matrix.shape[0]), np.ones(transition_matrix.shape[0])
+    for iteration in range(max_iterations + 1):
+        if transition_matrix.shape[0] == 0:
+            return lower, upper, iteration
+        if bounds is None and np.max(upper - lower) <= epsilon:
+            return lower, upper, iteration
+        if bounds is not None and np.all(is_decided(lower, upper, *bounds)):
+            return lower, upper, iteration
+        next_lower = np.maximum(lower, transition_matrix.dot(lower) + b)
+        next_upper = np.minimum(upper, transition_matrix.dot(upper) + b)
+        if bounds is not None and np.array_equal(next_lower, lower) and np.array_equal(next_upper, upper):
+            return lower, upper, iteration
+        lower, upper = next_lower, next_upper
+    return lower, upper, -1
+
+
+def is_decided(lower: np.ndarray, upper: np.ndarray, lb: float, ub: float) -> np.ndarray:
+    """
+    Decides for every state whether a probability known to lie in [lower, upper] certainly lies inside or certainly
+    lies outside of the closed interval [lb, ub]
+    """
+    return ((lb <= lower) & (upper <= ub)) | (upper < lb) | (ub < lower)
 
 
 class DTMCEngine(abc.ABC):
+    """
+    Numerical backend of a DTMC. Internally, sets of states are represented by boolean masks and probabilities by
+    float vectors, both indexed by the state ids. The methods taking and returning states and dictionaries convert
+    from and to this representation.
+    """
 
     def __init__(self, dtmc: DTMC):
         self.dtmc = dtmc
+        self.state_to_idx = {state: state.node_id for state in self.dtmc.id_to_state}
+        self.probability_matrix = None
+        self._bsccs: List[np.ndarray] = None
+        self._bscc_distributions: List[np.ndarray] = None
+        self._bscc_reachability: np.ndarray = None
+
+    @property
+    def num_states(self):
+        return len(self.dtmc.id_to_state)
+
+    def to_mask(self, states: Set[DTMCState]) -> np.ndarray:
+        mask = np.zeros(self.num_states, dtype=np.bool_)
+        mask[[self.state_to_idx[s] for s in states]] = True
+        return mask
+
+    def to_states(self, mask: np.ndarray) -> Set[DTMCState]:
+        return set([self.dtmc.id_to_state[idx] for idx in np.flatnonzero(mask)])
+
+    def to_dict(self, vector: np.ndarray, mask: np.ndarray = None) -> Dict[DTMCState, float]:
+        idxs = range(self.num_states) if mask is None else np.flatnonzero(mask)
+        return {self.dtmc.id_to_state[idx]: vector[idx] for idx in idxs}
+
+    def compute_initial_distribution(self, initial_distribution: Dict[DTMCState, float]):
+        result = np.zeros(self.num_states)
+        for state, probability in initial_distribution.items():
+            result[self.state_to_idx[state]] = probability
+        return result
+
+    def _to_distribution(self, vector: np.ndarray):
+        return self.to_dict(vector, vector > 0)
 
-    @abc.abstractmethod
     def compute_transient_distribution(self, initial_distribution: Dict[DTMCState, float], t: int):
         """
         Computes the transient distribution
         """
-        pass
+        result = self.compute_transient_distribution_matrix(self.compute_initial_distribution(initial_distribution), t)
+        return self._to_distribution(result)
+
+    def compute_transient_distribution_matrix(self, initial: np.ndarray, t: int) -> np.ndarray:
+        """
+        Computes the transient distributions after t steps for a batch of initial distributions
+
+        Parameters
+        ----------
+        initial: np.ndarray
+            Initial distribution indexed by the state ids, or a matrix whose rows are initial distributions
+        t: int
+            Number of steps
+
+        Returns
+        -------
+        np.ndarray
+            The transient distributions, in the shape of the initial distributions
+        """
+        if t <= 0:
+            return np.array(initial, dtype=np.float64)
+        if self._use_squaring(initial, t):
+            return self._compute_transient_by_squaring(initial, t)
+        return self._compute_transient_by_stepping(initial, t)
+
+    def compute_transient_distributions(self, initial: np.ndarray, horizons) -> np.ndarray:
+        """
+        Computes the transient distributions for several horizons at once, where every horizon continues from the next
+        smaller one
+
+        Parameters
+        ----------
+        initial: np.ndarray
+            Initial distribution indexed by the state ids, or a matrix whose rows are initial distributions
+        horizons: Iterable[int]
+            Numbers of steps
+
+        Returns
+        -------
+        np.ndarray
+            Array whose i-th entry is the transient distribution (or matrix thereof) after horizons[i] steps
+        """
+        horizons = np.asarray(list(horizons), dtype=np.int64)
+        initial = np.asarray(initial, dtype=np.float64)
+        result = np.empty((len(horizons),) + initial.shape)
+        current, steps = initial, 0
+        for idx in np.argsort(horizons, kind="stable"):
+            current = self.compute_transient_distribution_matrix(current, int(horizons[idx]) - steps)
+            steps = int(horizons[idx])
+            result[idx] = current
+        return result
+
+    def _use_squaring(self, initial: np.ndarray, t: int) -> bool:
+        return False
+
+    def _compute_transient_by_squaring(self, initial: np.ndarray, t: int) -> np.ndarray:
+        """
+        Computes initial * P^t with exponentiation by squaring, i.e. with O(log t) matrix products
+        """
+        result, power = initial, self.probability_matrix
+        while t > 0:
+            if t & 1:
+                result = result @ power
+            t >>= 1
+            if t > 0:
+                power = power @ power
+        return np.asarray(result)
 
     @abc.abstractmethod
-    def compute_bounded_reachability(self, bad_states: Set[DTMCState],
-                                     target_states: Set[DTMCState], t: int):
+    def _compute_transient_by_stepping(self, initial: np.ndarray, t: int) -> np.ndarray:
         pass
 
-    @abc.abstractmethod
+    def compute_next_probabilities(self, target_states: Set[DTMCState]):
+        """
+        Computes for every state the probability of moving to the target states in one step
+        """
+        return self.to_dict(self.compute_next_probabilities_vector(self.to_mask(target_states)))
+
+    def compute_next_probabilities_vector(self, target_mask: np.ndarray) -> np.ndarray:
+        return self.probability_matrix.dot(target_mask.astype(np.float64))
+
+    def compute_bounded_reachability(self, bad_states: Set[DTMCState], target_states: Set[DTMCState], t: int):
+        return self.to_dict(self.compute_reachability_vector(self.to_mask(bad_states), self.to_mask(target_states), t))
+
     def compute_unbounded_reachability(self, bad_states: Set[DTMCState], target_states: Set[DTMCState]):
-        pass
+        return self.to_dict(self.compute_reachability_vector(self.to_mask(bad_states), self.to_mask(target_states)))
 
-    @abc.abstractmethod
     def compute_expected_reward(self, target_states: Set[DTMCState]):
-        pass
+        result = self.compute_expected_reward_vector(self.to_mask(target_states))
+        return self.to_dict(result, np.isfinite(result))
 
+    def compute_reachability_vector(self, bad_mask: np.ndarray, target_mask: np.ndarray, t: int = None) -> np.ndarray:
+        """
+        Computes the probability of reaching the target states while avoiding the bad states
+
+        Parameters
+        ----------
+        bad_mask: np.ndarray
+            Boolean mask of the bad states
+        target_mask: np.ndarray
+            Boolean mask of the target states
+        t: int
+            Step bound, unbounded reachability if None
+
+        Returns
+        -------
+        np.ndarray
+            Reachability probability of every state
+        """
+        result, undetermined_idxs, transition_matrix, b = self._build_reachability_system(bad_mask, target_mask,
+                                                                                          bounded=t is not None)
+        if t is None:
+            result[undetermined_idxs] = self._solve_unbounded(transition_matrix, b)
+        else:
+            result[undetermined_idxs] = self._solve_bounded(transition_matrix, b, t)
+        return result
 
-class DTMCSparseEngine(DTMCEngine):
+    def compute_bsccs(self) -> List[np.ndarray]:
+        """
+        Computes the bottom strongly connected components, i.e. the SCCs without outgoing transitions
 
-    def compute_transient_distribution(self, initial_distribution: Dict[DTMCState, float], t: int):
-        pass
+        Returns
+        -------
+        List[np.ndarray]
+            The state ids of every BSCC
+        """
+        if self._bsccs is None:
+            num_sccs, labels = compute_sccs(self.dtmc.successors)
+            self._bsccs = bottom_sccs(self.dtmc.successors, num_sccs, labels)
+        return self._bsccs
 
-    def compute_bounded_reachability(self, bad_states: Set[DTMCState], target_states: Set[DTMCState], t: int):
-        pass
+    def compute_bscc_distributions(self, max_workers: int = None) -> List[np.ndarray]:
+        """
+        Computes the stationary distribution of every BSCC, where the BSCCs are solved independently in parallel
 
-    def compute_unbounded_reachability(self, bad_states: Set[DTMCState], target_states: Set[DTMCState]):
+        Returns
+        -------
+        List[np.ndarray]
+            The stationary distribution of every BSCC, indexed like the state ids returned by compute_bsccs
+        """
+        if self._bscc_distributions is None:
+            bsccs = self.compute_bsccs()
+            if len(bsccs) > 1:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    self._bscc_distributions = list(executor.map(self._solve_stationary_distribution, bsccs))
+            else:
+                self._bscc_distributions = [self._solve_stationary_distribution(bscc) for bscc in bsccs]
+        return self._bscc_distributions
+
+    def compute_bscc_reachability(self) -> np.ndarray:
+        """
+        Computes the probability of eventually reaching every BSCC
+
+        Returns
+        -------
+        np.ndarray
+            Matrix whose entry (i, j) is the probability of reaching the j-th BSCC from state i
+        """
+        if self._bscc_reachability is None:
+            bsccs = self.compute_bsccs()
+            result = np.zeros((self.num_states, len(bsccs)))
+            bad_mask = np.zeros(self.num_states, dtype=np.bool_)
+            for j, bscc in enumerate(bsccs):
+                target_mask = np.zeros(self.num_states, dtype=np.bool_)
+                target_mask[bscc] = True
+                result[:, j] = self.compute_reachability_vector(bad_mask, target_mask)
+            # Every state reaches a BSCC almost surely, normalising removes part of the numerical error
+            self._bscc_reachability = result / result.sum(axis=1, keepdims=True)
+        return self._bscc_reachability
+
+    def compute_steady_state_vector(self, initial: np.ndarray) -> np.ndarray:
+        """
+        Computes the long-run distribution for the given initial distribution indexed by the state ids
+        """
+        result = np.zeros(self.num_states)
+        weights = initial.dot(self.compute_bscc_reachability())
+        for weight, bscc, distribution in zip(weights, self.compute_bsccs(), self.compute_bscc_distributions()):
+            result[bscc] += weight * distribution
+        return result
+
+    def compute_steady_state_distribution(self, initial_distribution: Dict[DTMCState, float]):
+        return self._to_distribution(self.compute_steady_state_vector(self.compute_initial_distribution(
+            initial_distribution)))
+
+    def compute_long_run_probabilities(self, states: Set[DTMCState]):
+        return self.to_dict(self.compute_long_run_probabilities_vector(self.to_mask(states)))
+
+    def compute_long_run_probabilities_vector(self, mask: np.ndarray) -> np.ndarray:
+        """
+        Computes for every state the long-run probability of being in a state of the mask when starting there
+        """
+        weights = np.array([distribution[mask[bscc]].sum() for bscc, distribution in
+                            zip(self.compute_bsccs(), self.compute_bscc_distributions())])
+        return self.compute_bscc_reachability().dot(weights) if len(weights) > 0 else np.zeros(self.num_states)
+
+    def _solve_stationary_distribution(self, bscc: np.ndarray) -> np.ndarray:
+        """
+        Solves pi P = pi subject to sum(pi) = 1 for the transition matrix P restricted to the BSCC
+        """
+        matrix = self.probability_matrix[bscc, :][:, bscc]
+        n = len(bscc)
+        b = np.zeros(n)
+        b[-1] = 1
+        if sp.issparse(matrix):
+            a = (matrix.transpose() - sp.identity(n, format="csr")).tolil()
+            a[n - 1, :] = np.ones(n)
+            return spla.spsolve(a.tocsc(), b) if n > 1 else np.ones(1)
+        a = matrix.T - np.identity(n)
+        a[n - 1, :] = 1
+        return np.linalg.solve(a, b)
+
+    def compute_reachability_bounds(self, bad_mask: np.ndarray, target_mask: np.ndarray, epsilon: float,
+                                    max_iterations: int = 100000, bounds=None) -> IntervalIterationResult:
+        """
+        Approximates the probability of reaching the target states while avoiding the bad states with interval
+        iteration, which yields guaranteed lower and upper bounds
+
+        Parameters
+        ----------
+        bad_mask: np.ndarray
+            Boolean mask of the bad states
+        target_mask: np.ndarray
+            Boolean mask of the target states
+        epsilon: float
+            Maximal difference between the upper and lower bound of every state
+        max_iterations: int
+            Maximal number of iterations
+        bounds: Tuple[float, float]
+            The closed interval of a probability operator, the iteration then stops once every state is decided with
+            respect to the interval (see interval_iteration)
+
+        Returns
+        -------
+        IntervalIterationResult
+        """
+        result, undetermined_idxs, transition_matrix, b = self._build_reachability_system(bad_mask, target_mask)
+        lower, upper, iterations = interval_iteration(transition_matrix, b, epsilon=epsilon,
+                                                      max_iterations=max_iterations, bounds=bounds)
+        if iterations < 0:
+            raise RuntimeError(f"Interval iteration did not converge within {max_iterations} iterations")
+        result_lower, result_upper = result, result.copy()
+        result_lower[undetermined_idxs] = lower
+        result_upper[undetermined_idxs] = upper
+        return IntervalIterationResult(lower=result_lower, upper=result_upper, iterations=iterations)
+
+    def _build_reachability_system(self, bad_mask: np.ndarray, target_mask: np.ndarray, bounded=False):
+        """
+        Restricts the reachability problem to the states whose probability is not determined by the graph structure
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray, Any, np.ndarray]
+            The probabilities of the determined states, the undetermined state ids, the transition matrix among the
+            undetermined states and the one-step probability of moving to a state with probability 1
+        """
+        if np.any(bad_mask & target_mask):
+            raise ValueError("The bad states and target states need to be disjoint")
+        prob0 = compute_prob0(self.dtmc, bad_mask, target_mask)
+        if not bounded:
+            # Target states are contained in prob1, hence b collects the probability of moving to prob1 in one step
+            prob1 = compute_prob1(self.dtmc, bad_mask, target_mask, prob0=prob0)
+            undetermined_idxs = np.flatnonzero(~prob0 & ~prob1)
+            result = prob1.astype(np.float64)
+        else:
+            undetermined_idxs = np.flatnonzero(~prob0 & ~target_mask)
+            result = target_mask.astype(np.float64)
+        transition_matrix = self.probability_matrix[undetermined_idxs, :]
+        b = np.asarray(transition_matrix[:, np.flatnonzero(result)].sum(axis=1), dtype=np.float64).ravel()
+        transition_matrix = transition_matrix[:, undetermined_idxs]
+        return result, undetermined_idxs, transition_matrix, b
+
+    def compute_qualitative_reachability_vector(self, bad_mask: np.ndarray, target_mask: np.ndarray):
+        """
+        Computes the states reaching the target states while avoiding the bad states with probability 0 and 1,
+        respectively, without any numerical computation
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            Boolean masks of the states with probability 0 and 1
+        """
+        if np.any(bad_mask & target_mask):
+            raise ValueError("The bad states and target states need to be disjoint")
+        prob0 = compute_prob0(self.dtmc, bad_mask, target_mask)
+        return prob0, compute_prob1(self.dtmc, bad_mask, target_mask, prob0=prob0)
+
+    def compute_expected_reward_vector(self, target_mask: np.ndarray) -> np.ndarray:
+        """
+        Computes the expected reward accumulated until reaching the target states. The expected reward is infinite
+        for states that do not reach the target states almost surely.
+        """
+        predecessors = reachable(self.dtmc.predecessors, target_mask)
+        unreachable_predecessors = reachable(self.dtmc.predecessors, ~predecessors)
+        undetermined_idxs = np.flatnonzero(~unreachable_predecessors & ~target_mask)
+        transition_matrix = self.probability_matrix[undetermined_idxs, :][:, undetermined_idxs]
+        r = np.array([self.dtmc.id_to_state[idx].get_reward() or 0 for idx in undetermined_idxs], dtype=np.float64)
+
+        result = np.full(self.num_states, np.inf)
+        result[target_mask] = 0
+        result[undetermined_idxs] = self._solve_unbounded(transition_matrix, r)
+        return result
+
+    @abc.abstractmethod
+    def _solve_unbounded(self, transition_matrix, b: np.ndarray) -> np.ndarray:
+        """
+        Solves the equation system x = Ax + b, where A is the given sub-stochastic transition matrix
+        """
         pass
 
+    def _solve_bounded(self, transition_matrix, b: np.ndarray, t: int) -> np.ndarray:
+        """
+        Computes the t-th iterate of x = Ax + b starting from the zero vector
+        """
+        result = np.zeros(transition_matrix.shape[0])
+        for _ in range(t):
+            result = transition_matrix.dot(result) + b
+        return result
+
+
+class DTMCSparseEngine(DTMCEngine):
+    """
+    DTMC engine storing the probability matrix in compressed sparse row (CSR) format
+
+    Parameters
+    ----------
+    dtmc: DTMC
+        The DTMC to be analysed
+    method: str
+        Solver for the linear equation systems, one of "lu" (sparse LU decomposition), "jacobi", "gauss-seidel" and
+        "power" (value iteration)
+    epsilon: float
+        Convergence threshold of the iterative solvers
+    max_iterations: int
+        Maximal number of iterations of the iterative solvers
+    """
+
+    METHODS = ("lu", "jacobi", "gauss-seidel", "power")
+
+    def __init__(self, dtmc, method="lu", epsilon=1e-10, max_iterations=100000):
+        super().__init__(dtmc)
+        if method not in DTMCSparseEngine.METHODS:
+            raise ValueError(f"Invalid solver method {method}")
+        self.method = method
+        self.epsilon = epsilon
+        self.max_iterations = max_iterations
+        n = self.num_states
+        rows, cols, data = self.dtmc.get_transition_arrays()
+        self.probability_matrix: sp.csr_matrix = sp.csr_matrix((data, (rows, cols)), shape=(n, n))
+        self._transposed_probability_matrix: sp.csr_matrix = self.probability_matrix.transpose().tocsr()
+
+    def _compute_transient_by_stepping(self, initial: np.ndarray, t: int) -> np.ndarray:
+        result = np.asarray(initial, dtype=np.float64).T
+        for _ in range(t):
+            result = self._transposed_probability_matrix.dot(result)
+        return result.T
+
+    def _solve_unbounded(self, transition_matrix: sp.csr_matrix, b: np.ndarray):
+        n = transition_matrix.shape[0]
+        if n == 0:
+            return np.zeros(0)
+        if self.method == "lu":
+            return spla.spsolve((sp.identity(n, format="csc") - transition_matrix).tocsc(), b)
+
+        x = np.zeros(n)
+        if self.method == "power":
+            for _ in range(self.max_iterations):
+                x_next = transition_matrix.dot(x) + b
+                if np.max(np.abs(x_next - x)) < self.epsilon:
+                    return x_next
+                x = x_next
+        elif self.method == "jacobi":
+            diagonal = 1 - transition_matrix.diagonal()
+            off_diagonal = transition_matrix - sp.diags(transition_matrix.diagonal(), format="csr")
+            for _ in range(self.max_iterations):
+                x_next = (off_diagonal.dot(x) + b) / diagonal
+                if np.max(np.abs(x_next - x)) < self.epsilon:
+                    return x_next
+                x = x_next
+        else:
+            # Gauss-Seidel: (I - L - D) x_{k+1} = U x_k + b, where A = L + D + U
+            lower = (sp.identity(n, format="csr") - sp.tril(transition_matrix, format="csr")).tocsr()
+            upper = sp.triu(transition_matrix, k=1, format="csr")
+            for _ in range(self.max_iterations):
+                x_next = spla.spsolve_triangular(lower, upper.dot(x) + b, lower=True)
+                if np.max(np.abs(x_next - x)) < self.epsilon:
+                    return x_next
+                x = x_next
+        raise RuntimeError(f"The {self.method} solver did not converge within {self.max_iterations} iterations")
+
 
 class DTMCDenseEngine(DTMCEngine):
 
     def __init__(self, dtmc):
         super().__init__(dtmc)
-        n = len(self.dtmc.states)
-        self.state_to_idx = {k: v for v, k in enumerate(self.dtmc.states)}
+        n = self.num_states
         self.probability_matrix: np.ndarray = np.zeros((n, n))
-        for transition in self.dtmc.transitions:
-            i, j = self.state_to_idx[transition.source], self.state_to_idx[transition.target]
-            self.probability_matrix[i][j] = transition.get_probability()
+        rows, cols, data = self.dtmc.get_transition_arrays()
+        np.add.at(self.probability_matrix, (rows, cols), data)
 
-    def compute_initial_distribution(self, initial_distribution: Dict[DTMCState, float]):
-        result = np.zeros(len(self.state_to_idx))
-        for state, probability in initial_distribution.items():
-            result[self.state_to_idx[state]] = probability
-        return result
+    def _use_squaring(self, initial: np.ndarray, t: int) -> bool:
+        # Squaring costs about n^3 log(t) operations, stepping costs k n^2 t for k initial distributions
+        k = 1 if np.ndim(initial) == 1 else np.shape(initial)[0]
+        return self.num_states * np.log2(t) < k * t
 
-    def compute_transient_distribution(self, initial_distribution: Dict[DTMCState, float], t: int):
-        result = self.compute_initial_distribution(initial_distribution)
+    def _compute_transient_by_stepping(self, initial: np.ndarray, t: int) -> np.ndarray:
+        result = np.asarray(initial, dtype=np.float64)
         for _ in range(t):
             result = result.dot(self.probability_matrix)
-        return {state: result[self.state_to_idx[state]] for state in self.dtmc.states if
-                result[self.state_to_idx[state]] > 0}
-
-    def compute_bounded_reachability(self, bad_states: Set[DTMCState], target_states: Set[DTMCState], t: int):
-        return self._compute_reachability(bad_states=bad_states, target_states=target_states, t=t, unbounded=False)
-
-    def compute_unbounded_reachability(self, bad_states: Set[DTMCState], target_states: Set[DTMCState]):
-        return self._compute_reachability(bad_states=bad_states, target_states=target_states, unbounded=True)
-
-    def compute_expected_reward(self, target_states: Set[DTMCState]):
-        predecessors = dfs(self.dtmc, nodes=list(target_states), forward=False)
-        unreachable = self.dtmc.states.difference(predecessors)
-        unreachable_predecessors = dfs(self.dtmc, nodes=list(unreachable), forward=False)
-        undetermined_states = list(self.dtmc.states.difference(unreachable_predecessors).difference(target_states))
-        undetermined_states_idxs = [self.state_to_idx[s] for s in undetermined_states]
-        transition_matrix = self.probability_matrix[undetermined_states_idxs, :][:, undetermined_states_idxs]
-        r = np.array([s.get_reward() if s.get_reward() is not None else 0 for s in undetermined_states])
-        result = np.linalg.solve(a=transition_matrix - np.identity(len(undetermined_states)), b=-r)
-        result = {state: result[idx] for idx, state in enumerate(undetermined_states)}
-        result.update({state: 0 for state in target_states})
         return result
 
-    def _compute_reachability(self, bad_states: Set[DTMCState], target_states: Set[DTMCState], t=None, unbounded=True):
-        if len(bad_states.intersection(target_states)) > 0:
-            raise ValueError("The bad states and target states need to be disjoint")
-        undetermined_states = dfs(self.dtmc, nodes=list(target_states), forward=False)
-        undetermined_states = list(undetermined_states.difference(bad_states).difference(target_states))
-        undetermined_states_idxs = [self.state_to_idx[s] for s in undetermined_states]
-        target_states_idxs = [self.state_to_idx[s] for s in target_states]
+    def _solve_unbounded(self, transition_matrix: np.ndarray, b: np.ndarray):
+        return np.linalg.solve(a=transition_matrix - np.identity(transition_matrix.shape[0]), b=-b)
 
-        transition_matrix = self.probability_matrix[undetermined_states_idxs, :][:, undetermined_states_idxs]
-        b = self.probability_matrix[undetermined_states_idxs, :][:, target_states_idxs].sum(axis=1)
 
-        if unbounded:
-            result = np.linalg.solve(a=transition_matrix - np.identity(len(undetermined_states)), b=-b)
-        else:
-            result = np.zeros(len(undetermined_states))
-            for _ in range(t):
-                result = transition_matrix.dot(result) + b
-        return {state: result[idx] for idx, state in enumerate(undetermined_states)}
+@njit
+def _matvec_numba(matrix: np.ndarray, x: np.ndarray, b: np.ndarray, out: np.ndarray):
+    """
+    Writes Ax + b into out. The product is delegated to BLAS, a hand-written row loop cannot vectorize its reduction
+    without reassociating floating-point additions.
+    """
+    out[:] = np.dot(matrix, x) + b
 
 
 class DTMCDenseNumbaEngine(DTMCDenseEngine):
-
-    def __init__(self, dtmc):
+    """
+    Dense DTMC engine whose kernels are JIT-compiled with numba
+
+    Parameters
+    ----------
+    dtmc: DTMC
+        The DTMC to be analysed
+    epsilon: float
+        Convergence threshold of the value iteration
+    max_iterations: int
+        Maximal number of iterations of the value iteration
+    """
+
+    def __init__(self, dtmc, epsilon=1e-10, max_iterations=100000):
         super().__init__(dtmc)
+        self.epsilon = epsilon
+        self.max_iterations = max_iterations
 
         # Execute numba functions to trigger compilation
         DTMCDenseNumbaEngine._compute_transient_distribution_numba(np.zeros(2), np.zeros((2, 2)), t=1)
+        DTMCDenseNumbaEngine._compute_bounded_reachability_numba(np.zeros((2, 2)), np.zeros(2), t=1)
+        DTMCDenseNumbaEngine._compute_unbounded_reachability_numba(np.zeros((2, 2)), np.zeros(2), epsilon=1.0,
+                                                                   max_iterations=1)
 
     @staticmethod
     @njit
@@ -131,19 +594,42 @@ class DTMCDenseNumbaEngine(DTMCDenseEngine):
 
     @staticmethod
     @njit
-    def _compute_unbounded_reachability_numba(transition_matrix: np.ndarray, t: int):
-        pass
-
-    def compute_transient_distribution(self, initial_distribution: Dict[DTMCState, float], t: int):
-        init = self.compute_initial_distribution(initial_distribution)
-        result = self._compute_transient_distribution_numba(initial_distribution=init,
-                                                            transition_matrix=self.probability_matrix,
-                                                            t=t)
-        return {state: result[self.state_to_idx[state]] for state in self.dtmc.states if
-                result[self.state_to_idx[state]] > 0}
+    def _compute_bounded_reachability_numba(transition_matrix: np.ndarray, b: np.ndarray, t: int):
+        result, updated = np.zeros(transition_matrix.shape[0]), np.empty(transition_matrix.shape[0])
+        for _ in range(t):
+            _matvec_numba(transition_matrix, result, b, updated)
+            result, updated = updated, result
+        return result
 
-    def compute_bounded_reachability(self, bad_states: Set[DTMCState], target_states: Set[DTMCState], t: int):
-        pass
+    @staticmethod
+    @njit
+    def _compute_unbounded_reachability_numba(transition_matrix: np.ndarray, b: np.ndarray, epsilon: float,
+                                              max_iterations: int):
+        """
+        Value iteration for x = Ax + b, returns the approximation and the number of performed iterations
+        """
+        result, updated = np.zeros(transition_matrix.shape[0]), np.empty(transition_matrix.shape[0])
+        for iteration in range(max_iterations):
+            _matvec_numba(transition_matrix, result, b, updated)
+            if transition_matrix.shape[0] == 0 or np.max(np.abs(updated - result)) < epsilon:
+                return updated, iteration + 1
+            result, updated = updated, result
+        return result, -1
+
+    def _compute_transient_by_stepping(self, initial: np.ndarray, t: int) -> np.ndarray:
+        return self._compute_transient_distribution_numba(initial_distribution=np.ascontiguousarray(initial,
+                                                                                                   dtype=np.float64),
+                                                          transition_matrix=self.probability_matrix,
+                                                          t=t)
+
+    def _solve_unbounded(self, transition_matrix: np.ndarray, b: np.ndarray):
+        # Restricting the probability matrix by fancy indexing yields a Fortran-ordered matrix, the kernels are
+        # compiled for C-contiguous matrices by the warm-up
+        result, iterations = self._compute_unbounded_reachability_numba(np.ascontiguousarray(transition_matrix), b,
+                                                                        self.epsilon, self.max_iterations)
+        if iterations < 0:
+            raise RuntimeError(f"Value iteration did not converge within {self.max_iterations} iterations")
+        return result
 
-    def compute_unbounded_reachability(self, bad_states: Set[DTMCState], target_states: Set[DTMCState]):
-        pass
+    def _solve_bounded(self, transition_matrix: np.ndarray, b: np.ndarray, t: int):
+        return self._compute_bounded_reachability_numba(np.ascontiguousarray(transition_matrix), b, t)
@@ -0,0 +1,56 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from vnmc.probabilistic import DTMC
+
+import numpy as np
+
+from vnmc.common.graph_algorithms import reachable
+
+
+def compute_prob0(dtmc: DTMC, bad_mask: np.ndarray, target_mask: np.ndarray) -> np.ndarray:
+    """
+    Computes the states that reach the target states while avoiding the bad states with probability 0, i.e. the states
+    from which no target state can be reached via states that are neither bad nor target states
+
+    Parameters
+    ----------
+    dtmc: DTMC
+        A DTMC whose adjacency has been built
+    bad_mask: np.ndarray
+        Boolean mask of the bad states
+    target_mask: np.ndarray
+        Boolean mask of the target states
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask of the states with reachability probability 0
+    """
+    return ~reachable(dtmc.predecessors, target_mask, allowed=~bad_mask & ~target_mask)
+
+
+def compute_prob1(dtmc: DTMC, bad_mask: np.ndarray, target_mask: np.ndarray, prob0: np.ndarray = None) -> np.ndarray:
+    """
+    Computes the states that reach the target states while avoiding the bad states with probability 1, i.e. the states
+    from which no state of prob0 can be reached via states that are neither bad nor target states
+
+    Parameters
+    ----------
+    dtmc: DTMC
+        A DTMC whose adjacency has been built
+    bad_mask: np.ndarray
+        Boolean mask of the bad states
+    target_mask: np.ndarray
+        Boolean mask of the target states
+    prob0: np.ndarray
+        Result of compute_prob0, computed if not provided
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask of the states with reachability probability 1
+    """
+    prob0 = compute_prob0(dtmc, bad_mask, target_mask) if prob0 is None else prob0
+    return ~reachable(dtmc.predecessors, prob0, allowed=~bad_mask & ~target_mask)
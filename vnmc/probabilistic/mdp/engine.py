@@ -1,5 +1,365 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from vnmc.probabilistic.mdp.mdp import MDP, MDPState
+
 import abc
+from typing import Any, Dict, List, Set, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+
+from vnmc.probabilistic.mdp.mec import MDPQuotient, build_quotient, compute_mecs
+from vnmc.probabilistic.mdp.qualitative import compute_prob0a, compute_prob0e, compute_prob1a, compute_prob1e
+
+
+def _group_optimum(values: np.ndarray, row_groups: np.ndarray, maximize: bool) -> np.ndarray:
+    """
+    Computes the maximum (or minimum) of the values of every row group, where every group needs to be non-empty
+    """
+    if len(row_groups) <= 1:
+        return np.zeros(0)
+    ufunc = np.maximum if maximize else np.minimum
+    return ufunc.reduceat(values, row_groups[:-1])
+
+
+def _group_argoptimum(values: np.ndarray, row_groups: np.ndarray, maximize: bool) -> np.ndarray:
+    """
+    Computes the index of the first maximal (or minimal) value of every row group
+    """
+    counts = np.diff(row_groups)
+    optimal = np.flatnonzero(values == np.repeat(_group_optimum(values, row_groups, maximize), counts))
+    groups = np.repeat(np.arange(len(counts)), counts)[optimal]
+    _, first = np.unique(groups, return_index=True)
+    return optimal[first]
 
 
 class MDPEngine(abc.ABC):
-    pass
\ No newline at end of file
+    """
+    Numerical backend of an MDP operating on the choice arrays of the frozen MDP: every pair of a state and an enabled
+    action is a choice, the choices of a state form a contiguous row group of the choice matrix, whose columns are
+    the states. As for DTMCs, sets of states are represented by boolean masks and probabilities by float vectors
+    indexed by the state ids.
+    """
+
+    def __init__(self, mdp: MDP):
+        self.mdp = mdp
+        self.state_to_idx = {state: state.node_id for state in self.mdp.id_to_state}
+        self.row_groups: np.ndarray = mdp.row_groups
+        self.choice_actions: List[Any] = mdp.choice_actions
+        self.choice_matrix: sp.csr_matrix = sp.csr_matrix(
+            (mdp.choice_probabilities, mdp.choice_indices, mdp.choice_indptr),
+            shape=(len(mdp.choice_actions), self.num_states))
+
+    @property
+    def num_states(self):
+        return len(self.mdp.id_to_state)
+
+    @property
+    def num_choices(self):
+        return len(self.choice_actions)
+
+    @property
+    def choice_state(self) -> np.ndarray:
+        return np.repeat(np.arange(self.num_states, dtype=np.int64), np.diff(self.row_groups))
+
+    def to_mask(self, states: Set[MDPState]) -> np.ndarray:
+        mask = np.zeros(self.num_states, dtype=np.bool_)
+        mask[[self.state_to_idx[s] for s in states]] = True
+        return mask
+
+    def to_states(self, mask: np.ndarray) -> Set[MDPState]:
+        return set([self.mdp.id_to_state[idx] for idx in np.flatnonzero(mask)])
+
+    def to_dict(self, vector: np.ndarray, mask: np.ndarray = None) -> Dict[MDPState, Any]:
+        idxs = range(self.num_states) if mask is None else np.flatnonzero(mask)
+        return {self.mdp.id_to_state[idx]: vector[idx] for idx in idxs}
+
+    def compute_next_probabilities(self, target_states: Set[MDPState], maximize: bool):
+        return self.to_dict(self.compute_next_probabilities_vector(self.to_mask(target_states), maximize))
+
+    def compute_next_probabilities_vector(self, target_mask: np.ndarray, maximize: bool) -> np.ndarray:
+        """
+        Computes for every state the maximal (or minimal) probability of moving to the target states in one step
+        """
+        return _group_optimum(self.choice_matrix.dot(target_mask.astype(np.float64)), self.row_groups, maximize)
+
+    def compute_bounded_reachability(self, bad_states: Set[MDPState], target_states: Set[MDPState], t: int,
+                                     maximize: bool):
+        return self.to_dict(self.compute_reachability_vector(self.to_mask(bad_states), self.to_mask(target_states),
+                                                             maximize, t))
+
+    def compute_unbounded_reachability(self, bad_states: Set[MDPState], target_states: Set[MDPState],
+                                       maximize: bool):
+        return self.to_dict(self.compute_reachability_vector(self.to_mask(bad_states), self.to_mask(target_states),
+                                                             maximize))
+
+    def compute_scheduler(self, bad_states: Set[MDPState], target_states: Set[MDPState], maximize: bool):
+        """
+        Computes a memoryless scheduler maximising (or minimising) the probability of reaching the target states
+        while avoiding the bad states
+
+        Returns
+        -------
+        Dict[MDPState, Any]
+            The action chosen in every state
+        """
+        choices = self.compute_scheduler_vector(self.to_mask(bad_states), self.to_mask(target_states), maximize)
+        return {self.mdp.id_to_state[idx]: self.choice_actions[choice] for idx, choice in enumerate(choices)}
+
+    def compute_mecs(self) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Computes the maximal end components of the MDP
+
+        Returns
+        -------
+        List[Tuple[np.ndarray, np.ndarray]]
+            The state ids and the choice indices of every MEC
+        """
+        return compute_mecs(self.choice_matrix, self.row_groups)
+
+    def build_quotient(self, mecs: List[Tuple[np.ndarray, np.ndarray]] = None) -> MDPQuotient:
+        """
+        Builds the quotient in which every maximal end component is collapsed into a single state
+        """
+        return build_quotient(self.choice_matrix, self.row_groups, self.compute_mecs() if mecs is None else mecs)
+
+    def compute_reachability_vector(self, bad_mask: np.ndarray, target_mask: np.ndarray, maximize: bool,
+                                    t: int = None) -> np.ndarray:
+        """
+        Computes the maximal (or minimal) probability of reaching the target states while avoiding the bad states
+
+        Parameters
+        ----------
+        bad_mask: np.ndarray
+            Boolean mask of the bad states
+        target_mask: np.ndarray
+            Boolean mask of the target states
+        maximize: bool
+            Whether the maximal or minimal probability over all schedulers is computed
+        t: int
+            Step bound, unbounded reachability if None
+
+        Returns
+        -------
+        np.ndarray
+            Reachability probability of every state
+        """
+        result, undetermined_idxs, choice_matrix, b, row_groups, leaving = self._build_reachability_system(
+            bad_mask, target_mask, maximize, bounded=t is not None)
+        if t is None and maximize:
+            # End components among the undetermined states yield spurious fixpoints of the Bellman equations for
+            # maximal probabilities, collapsing them makes the fixpoint unique and the system smaller
+            mecs = compute_mecs(choice_matrix, row_groups, leaving=leaving)
+            quotient = build_quotient(choice_matrix, row_groups, mecs)
+            values = self._solve_unbounded(quotient.choice_matrix, quotient.restrict(b), quotient.row_groups, maximize)
+            result[undetermined_idxs] = quotient.lift(values)
+        elif t is None:
+            result[undetermined_idxs] = self._solve_unbounded(choice_matrix, b, row_groups, maximize)
+        else:
+            result[undetermined_idxs] = self._solve_bounded(choice_matrix, b, row_groups, maximize, t)
+        return result
+
+    def compute_scheduler_vector(self, bad_mask: np.ndarray, target_mask: np.ndarray, maximize: bool,
+                                 values: np.ndarray = None, tolerance: float = 1e-6) -> np.ndarray:
+        """
+        Extracts an optimal memoryless scheduler from the optimal reachability probabilities. Among the choices that
+        are optimal w.r.t. the given values, the scheduler prefers choices that move closer to the target states.
+        This is required for maximal probabilities, where choosing any optimal choice may stay in an end component
+        forever.
+
+        Parameters
+        ----------
+        values: np.ndarray
+            Result of compute_reachability_vector, computed if not provided
+        tolerance: float
+            Choices whose value is within the tolerance of the optimal value are considered optimal
+
+        Returns
+        -------
+        np.ndarray
+            The index of the choice selected in every state
+        """
+        values = self.compute_reachability_vector(bad_mask, target_mask, maximize) if values is None else values
+        values = np.where(target_mask, 1.0, np.where(bad_mask, 0.0, values))
+        choice_values = self.choice_matrix.dot(values)
+        optimal = np.abs(choice_values - values[self.choice_state]) <= tolerance
+        optimal[_group_argoptimum(choice_values, self.row_groups, maximize)] = True
+        scheduler = self._compute_attractor_choices(self.choice_matrix, self.row_groups, target_mask, optimal)
+        unassigned = np.flatnonzero(scheduler < 0)
+        scheduler[unassigned] = _group_argoptimum(np.where(optimal, 1.0, 0.0), self.row_groups, True)[unassigned]
+        return scheduler
+
+    @staticmethod
+    def _compute_attractor_choices(choice_matrix, row_groups: np.ndarray, target_mask: np.ndarray,
+                                   allowed_choices: np.ndarray, progressing: np.ndarray = None) -> np.ndarray:
+        """
+        Computes for every state an allowed choice that moves closer to the target states with positive probability
+
+        Parameters
+        ----------
+        target_mask: np.ndarray
+            Boolean mask of the target states
+        allowed_choices: np.ndarray
+            Boolean mask of the choices that may be selected
+        progressing: np.ndarray
+            Boolean mask of additional choices that count as moving to a target state
+
+        Returns
+        -------
+        np.ndarray
+            The selected choice of every state, -1 for the target states and the states that are not attracted
+        """
+        n = len(row_groups) - 1
+        choice_state = np.repeat(np.arange(n, dtype=np.int64), np.diff(row_groups))
+        positive = (choice_matrix > 0).astype(np.float64).tocsr()
+        progressing = np.zeros(len(choice_state), dtype=np.bool_) if progressing is None else progressing
+        scheduler = np.full(n, -1, dtype=np.int64)
+        assigned = target_mask.copy()
+        while True:
+            candidates = np.flatnonzero(allowed_choices & ~assigned[choice_state]
+                                        & (progressing | (positive.dot(assigned.astype(np.float64)) > 0)))
+            if len(candidates) == 0:
+                return scheduler
+            states, first = np.unique(choice_state[candidates], return_index=True)
+            scheduler[states] = candidates[first]
+            assigned[states] = True
+
+    def _build_reachability_system(self, bad_mask: np.ndarray, target_mask: np.ndarray, maximize: bool,
+                                   bounded=False):
+        """
+        Restricts the reachability problem to the states whose optimal probability is not determined by the graph
+        structure
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray, Any, np.ndarray, np.ndarray, np.ndarray]
+            The probabilities of the determined states, the undetermined state ids, the choice matrix among the
+            undetermined states, the one-step probability of every choice to move to a state with probability 1, the
+            row groups of the undetermined states and the mask of the choices that may move to a determined state
+        """
+        if np.any(bad_mask & target_mask):
+            raise ValueError("The bad states and target states need to be disjoint")
+        if maximize:
+            prob0 = compute_prob0a(self.choice_matrix, self.row_groups, bad_mask, target_mask)
+        else:
+            prob0 = compute_prob0e(self.choice_matrix, self.row_groups, bad_mask, target_mask)
+        if not bounded:
+            if maximize:
+                prob1 = compute_prob1e(self.choice_matrix, self.row_groups, bad_mask, target_mask, prob0=prob0)
+            else:
+                prob1 = compute_prob1a(self.choice_matrix, self.row_groups, bad_mask, target_mask, prob0=prob0)
+            undetermined = ~prob0 & ~prob1
+            result = prob1.astype(np.float64)
+        else:
+            undetermined = ~prob0 & ~target_mask
+            result = target_mask.astype(np.float64)
+        undetermined_idxs = np.flatnonzero(undetermined)
+        choice_matrix = self.choice_matrix[np.flatnonzero(undetermined[self.choice_state]), :]
+        b = np.asarray(choice_matrix[:, np.flatnonzero(result)].sum(axis=1), dtype=np.float64).ravel()
+        leaving = (choice_matrix > 0).astype(np.float64).dot((~undetermined).astype(np.float64)) > 0
+        choice_matrix = choice_matrix[:, undetermined_idxs]
+        row_groups = np.zeros(len(undetermined_idxs) + 1, dtype=np.int64)
+        np.cumsum(np.diff(self.row_groups)[undetermined_idxs], out=row_groups[1:])
+        return result, undetermined_idxs, choice_matrix, b, row_groups, leaving
+
+    @abc.abstractmethod
+    def _solve_unbounded(self, choice_matrix, b: np.ndarray, row_groups: np.ndarray, maximize: bool) -> np.ndarray:
+        """
+        Solves the Bellman equation x = opt(Ax + b), where opt is the maximum (or minimum) over every row group
+        """
+        pass
+
+    def _solve_bounded(self, choice_matrix, b: np.ndarray, row_groups: np.ndarray, maximize: bool,
+                       t: int) -> np.ndarray:
+        """
+        Computes the t-th iterate of x = opt(Ax + b) starting from the zero vector
+        """
+        result = np.zeros(len(row_groups) - 1)
+        for _ in range(t):
+            result = _group_optimum(choice_matrix.dot(result) + b, row_groups, maximize)
+        return result
+
+
+class MDPSparseEngine(MDPEngine):
+    """
+    MDP engine storing the choice matrix in compressed sparse row (CSR) format
+
+    Parameters
+    ----------
+    mdp: MDP
+        The MDP to be analysed
+    method: str
+        Solver for the Bellman equations, one of "value-iteration" and "policy-iteration"
+    epsilon: float
+        Convergence threshold of the value iteration and improvement threshold of the policy iteration
+    max_iterations: int
+        Maximal number of iterations
+    """
+
+    METHODS = ("value-iteration", "policy-iteration")
+
+    def __init__(self, mdp, method="value-iteration", epsilon=1e-10, max_iterations=100000):
+        super().__init__(mdp)
+        if method not in MDPSparseEngine.METHODS:
+            raise ValueError(f"Invalid solver method {method}")
+        self.method = method
+        self.epsilon = epsilon
+        self.max_iterations = max_iterations
+
+    def _solve_unbounded(self, choice_matrix: sp.csr_matrix, b: np.ndarray, row_groups: np.ndarray,
+                         maximize: bool):
+        n = len(row_groups) - 1
+        if n == 0:
+            return np.zeros(0)
+        if self.method == "value-iteration":
+            x = np.zeros(n)
+            for _ in range(self.max_iterations):
+                x_next = _group_optimum(choice_matrix.dot(x) + b, row_groups, maximize)
+                if np.max(np.abs(x_next - x)) < self.epsilon:
+                    return x_next
+                x = x_next
+        else:
+            policy = self._initial_policy(choice_matrix, b, row_groups, maximize)
+            identity = sp.identity(n, format="csr")
+            x = np.zeros(n)
+            for _ in range(self.max_iterations):
+                x = self._evaluate_policy(identity - choice_matrix[policy, :], b[policy], x)
+                choice_values = choice_matrix.dot(x) + b
+                best = _group_argoptimum(choice_values, row_groups, maximize)
+                difference = choice_values[best] - choice_values[policy]
+                # Only strict improvements are taken, otherwise the policy may switch into an end component
+                improved = difference > self.epsilon if maximize else difference < -self.epsilon
+                if not np.any(improved):
+                    return x
+                policy[improved] = best[improved]
+        raise RuntimeError(f"The {self.method} solver did not converge within {self.max_iterations} iterations")
+
+    def _evaluate_policy(self, matrix: sp.csr_matrix, b: np.ndarray, x0: np.ndarray) -> np.ndarray:
+        """
+        Solves the equation system of the policy evaluation with BiCGSTAB, warm-started with the values of the
+        previous policy. Falls back to a sparse LU decomposition, whose fill-in makes it slow on large models, if the
+        iterative solver fails.
+        """
+        x, info = spla.bicgstab(matrix, b, x0=x0, rtol=self.epsilon, atol=0.0, maxiter=self.max_iterations)
+        if info != 0:
+            return spla.spsolve(matrix.tocsc(), b)
+        return x
+
+    def _initial_policy(self, choice_matrix: sp.csr_matrix, b: np.ndarray, row_groups: np.ndarray,
+                        maximize: bool) -> np.ndarray:
+        """
+        Computes a policy under which the equation system of the policy evaluation has a unique solution. For
+        minimal probabilities every policy qualifies after the precomputation, for maximal probabilities every state
+        needs to move closer to the states with probability 1.
+        """
+        policy = row_groups[:-1].copy()
+        if maximize:
+            allowed = np.ones(choice_matrix.shape[0], dtype=np.bool_)
+            no_targets = np.zeros(len(policy), dtype=np.bool_)
+            attractor = self._compute_attractor_choices(choice_matrix, row_groups, no_targets, allowed,
+                                                        progressing=b > 0)
+            policy[attractor >= 0] = attractor[attractor >= 0]
+        return policy
@@ -1,7 +1,9 @@
-from typing import Any, Set
+from typing import Any, Dict, FrozenSet, List, Set
 
-from vnmc.common.graph import Graph, GraphNode, GraphEdge
-from vnmc.probabilistic.mdp.engine import MDPEngine
+import numpy as np
+
+from vnmc.common.graph import Graph, GraphNode, GraphEdge, CSRAdjacency, CSRGraph
+from vnmc.probabilistic.mdp.engine import MDPEngine, MDPSparseEngine
 
 
 class MDPState(GraphNode):
@@ -28,28 +30,166 @@ class MDPTransition(GraphEdge):
 
 
 class MDP(Graph):
-
-    def get_graph_successors(self, node):
-        return [t.target for t in self.transitions if t.source == node]
+    """
+    Markov decision process. The transitions are stored in a CSRGraph over the state ids, whose edges carry the id of
+    their action and their probability. Freezing the MDP compiles the edges into NumPy arrays: the choices, i.e. the
+    enabled (state, action) pairs, are numbered such that the choices of state i are row_groups[i], ...,
+    row_groups[i + 1] - 1 ordered by the first occurrence of their actions in the MDP, and the successors of choice c
+    with their probabilities are stored in compressed sparse row format in choice_indices and
+    choice_probabilities[choice_indptr[c]:choice_indptr[c + 1]]. The probabilities of transitions with the same
+    source, action and target are summed up, and states without enabled actions get a self-loop choice with action
+    None.
+    """
 
     def __init__(self):
         self.states: Set[MDPState] = set()
-        self.transitions: Set[MDPTransition] = set()
-        self.state_ids = 0
+        self.graph = CSRGraph(columns={"action": "q", "p": "d"})
         self.is_built = False
         self.engine: MDPEngine = None
+        self.id_to_state: List[MDPState] = []
+        self.action_to_id: Dict[Any, int] = dict()
+        self.id_to_action: List[Any] = []
+        self.row_groups: np.ndarray = None
+        self.choice_actions: List[Any] = None
+        self.choice_indptr: np.ndarray = None
+        self.choice_indices: np.ndarray = None
+        self.choice_probabilities: np.ndarray = None
+        self.successors: CSRAdjacency = None
+        self.predecessors: CSRAdjacency = None
+        self._deadlocks: np.ndarray = None
+        # Transition objects, built on first access and discarded on modification
+        self._transitions: FrozenSet[MDPTransition] = None
+
+    @property
+    def state_ids(self):
+        return self.graph.num_nodes
+
+    @property
+    def actions(self):
+        return set(self.id_to_action)
+
+    @property
+    def transitions(self) -> FrozenSet[MDPTransition]:
+        if self._transitions is None:
+            if not self.graph.is_frozen:
+                self.graph.freeze()
+            self._transitions = frozenset(MDPTransition(source=self.id_to_state[source],
+                                                        action=self.id_to_action[action], p=p,
+                                                        target=self.id_to_state[target])
+                                          for source, action, p, target in zip(self.graph.edge_sources().tolist(),
+                                                                               self.graph.columns["action"].tolist(),
+                                                                               self.graph.columns["p"].tolist(),
+                                                                               self.graph.successors.indices.tolist()))
+        return self._transitions
 
     def create_state(self, name, atomic_propositions=None, reward=None):
-        state = MDPState(name=name, state_id=self.state_ids, atomic_propositions=atomic_propositions, reward=reward)
+        state = MDPState(name=name, state_id=self.graph.add_node(), atomic_propositions=atomic_propositions,
+                         reward=reward)
         self.states.add(state)
-        self.state_ids += 1
+        self.id_to_state.append(state)
+        self.is_built = False
         return state
 
     def create_transition(self, source: MDPState, action: Any, p: float, target: MDPState):
-        transition = MDPTransition(source=source, action=action, p=p, target=target)
-        self.transitions.add(transition)
-        return transition
+        if action not in self.action_to_id:
+            self.action_to_id[action] = len(self.id_to_action)
+            self.id_to_action.append(action)
+        self.graph.add_edge(source.node_id, target.node_id, action=self.action_to_id[action], p=p)
+        self.is_built = False
+        self._transitions = None
+        return MDPTransition(source=source, action=action, p=p, target=target)
 
     def get_actions(self):
-        return set([t.get_action() for t in self.transitions])
+        return self.actions
+
+    def _get_choices(self, state: MDPState) -> range:
+        if not self.is_built:
+            self.freeze()
+        if self._deadlocks[state.node_id]:
+            return range(0)
+        return range(self.row_groups[state.node_id], self.row_groups[state.node_id + 1])
+
+    def get_enabled_actions(self, state: MDPState) -> List[Any]:
+        return [self.choice_actions[choice] for choice in self._get_choices(state)]
+
+    def get_distribution(self, state: MDPState, action: Any) -> Dict[MDPState, float]:
+        for choice in self._get_choices(state):
+            if self.choice_actions[choice] == action:
+                first, last = self.choice_indptr[choice], self.choice_indptr[choice + 1]
+                return {self.id_to_state[target]: p for target, p in
+                        zip(self.choice_indices[first:last].tolist(), self.choice_probabilities[first:last].tolist())}
+        raise KeyError(action)
+
+    def get_graph_successors(self, node):
+        if not self.is_built:
+            self.freeze()
+        return set([self.id_to_state[i] for i in self.successors.get_successors(node.node_id)])
+
+    def get_graph_predecessors(self, node):
+        if not self.is_built:
+            self.freeze()
+        return set([self.id_to_state[i] for i in self.predecessors.get_successors(node.node_id)])
+
+    def freeze(self):
+        """
+        Compiles the transitions into the choice arrays and the adjacency of the underlying graph
+        """
+        n = self.state_ids
+        self.graph.freeze()
+        sources, targets = self.graph.edge_sources(), self.graph.successors.indices
+        actions, probabilities = self.graph.columns["action"], self.graph.columns["p"]
+        # Deadlocks get a self-loop with the action id -1, which stands for None
+        self._deadlocks = np.diff(self.graph.successors.indptr) == 0
+        deadlocks = np.flatnonzero(self._deadlocks)
+        sources, targets = np.concatenate([sources, deadlocks]), np.concatenate([targets, deadlocks])
+        actions = np.concatenate([actions, np.full(len(deadlocks), -1, dtype=np.int64)])
+        probabilities = np.concatenate([probabilities, np.ones(len(deadlocks))])
+
+        # Sum up the probabilities of the transitions with the same source, action and target
+        order = np.lexsort((targets, actions, sources))
+        sources, actions, targets, probabilities = sources[order], actions[order], targets[order], probabilities[order]
+        new_choice = np.ones(len(sources), dtype=np.bool_)
+        new_choice[1:] = (sources[1:] != sources[:-1]) | (actions[1:] != actions[:-1])
+        new_entry = new_choice.copy()
+        new_entry[1:] |= targets[1:] != targets[:-1]
+        entries = np.flatnonzero(new_entry)
+        self.choice_probabilities = np.add.reduceat(probabilities, entries) if len(entries) > 0 else np.zeros(0)
+        self.choice_indices = targets[entries]
+        entry_sources = sources[entries]
+
+        choices = np.flatnonzero(new_choice[entries])
+        self.choice_indptr = np.append(choices, len(entries)).astype(np.int64)
+        self.choice_actions = [None if a < 0 else self.id_to_action[a] for a in actions[entries[choices]].tolist()]
+        self.row_groups = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(entry_sources[choices], minlength=n), out=self.row_groups[1:])
+
+        positive = self.choice_probabilities > 0
+        self.successors = CSRAdjacency(n, entry_sources[positive], self.choice_indices[positive])
+        self.predecessors = self.successors.transpose()
+        self.is_built = True
+
+    def build(self, engine="sparse", **kwargs):
+        self.freeze()
+        if engine == "sparse":
+            self.engine = MDPSparseEngine(self, **kwargs)
+        else:
+            raise ValueError("Invalid representation type")
+
+    def compute_next_probabilities(self, target_states: Set[MDPState], maximize: bool):
+        return self.engine.compute_next_probabilities(target_states, maximize)
+
+    def compute_bounded_reachability(self, bad_states: Set[MDPState], target_states: Set[MDPState], t: int,
+                                     maximize: bool):
+        return self.engine.compute_bounded_reachability(bad_states, target_states, t, maximize)
+
+    def compute_unbounded_reachability(self, bad_states: Set[MDPState], target_states: Set[MDPState],
+                                       maximize: bool):
+        return self.engine.compute_unbounded_reachability(bad_states, target_states, maximize)
+
+    def compute_scheduler(self, bad_states: Set[MDPState], target_states: Set[MDPState], maximize: bool):
+        """
+        Computes a memoryless scheduler that maximises (or minimises) the probability of reaching the target states
+        while avoiding the bad states
+        """
+        return self.engine.compute_scheduler(bad_states, target_states, maximize)
 
@@ -0,0 +1,158 @@
+from typing import List, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from vnmc.common.graph import CSRAdjacency
+from vnmc.common.graph_algorithms import compute_sccs, group_by_label
+
+
+def compute_mecs(choice_matrix: sp.csr_matrix, row_groups: np.ndarray, allowed: np.ndarray = None,
+                 leaving: np.ndarray = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Computes the maximal end components (MECs) of an MDP, i.e. the maximal sets of states together with a non-empty
+    set of choices per state such that the choices never leave the set and the induced graph is strongly connected.
+    The SCC decomposition is refined by repeatedly removing the choices that may leave their SCC and the states
+    without remaining choices.
+
+    Parameters
+    ----------
+    choice_matrix: sp.csr_matrix
+        Probability matrix whose rows are the choices and whose columns are the states
+    row_groups: np.ndarray
+        The choices of state i are the rows row_groups[i], ..., row_groups[i + 1] - 1
+    allowed: np.ndarray
+        Boolean mask of the states that may be part of a MEC, all states by default
+    leaving: np.ndarray
+        Boolean mask of the choices that leave the MDP with positive probability, e.g. rows of a sub-stochastic
+        choice matrix, which are never part of a MEC
+
+    Returns
+    -------
+    List[Tuple[np.ndarray, np.ndarray]]
+        The state ids and the choice indices of every MEC
+    """
+    n = len(row_groups) - 1
+    choice_state = np.repeat(np.arange(n, dtype=np.int64), np.diff(row_groups))
+    positive = choice_matrix.tocoo()
+    positive_rows, positive_cols = positive.row[positive.data > 0], positive.col[positive.data > 0]
+    candidates = np.ones(n, dtype=np.bool_) if allowed is None else allowed.copy()
+    enabled = np.ones(len(choice_state), dtype=np.bool_) if leaving is None else ~leaving
+    enabled &= candidates[choice_state]
+    while True:
+        inside = enabled[positive_rows]
+        adjacency = CSRAdjacency(n, choice_state[positive_rows[inside]], positive_cols[inside])
+        num_sccs, labels = compute_sccs(adjacency, candidates)
+        # A choice stays in the end component if all its successors belong to the SCC of its state
+        escaping = positive_rows[labels[positive_cols] != labels[choice_state[positive_rows]]]
+        updated_enabled = enabled.copy()
+        updated_enabled[escaping] = False
+        updated_candidates = candidates & np.logical_or.reduceat(updated_enabled, row_groups[:-1]) \
+            if n > 0 else candidates
+        updated_enabled &= updated_candidates[choice_state]
+        if np.array_equal(updated_enabled, enabled) and np.array_equal(updated_candidates, candidates):
+            break
+        enabled, candidates = updated_enabled, updated_candidates
+
+    mecs = []
+    for states in group_by_label(num_sccs, labels):
+        choices = np.concatenate([np.arange(row_groups[s], row_groups[s + 1]) for s in states])
+        mecs.append((states, choices[enabled[choices]]))
+    return mecs
+
+
+class MDPQuotient:
+    """
+    MDP obtained by collapsing every MEC into a single state. The choices of a collapsed state are the choices of the
+    MEC states that leave the MEC, a MEC without such choices gets a choice without successors, i.e. staying in the
+    MEC forever is modelled as leaving the MDP. The quotient has no end components apart from these sink choices,
+    hence the Bellman equations of reachability have a unique fixpoint.
+
+    Parameters
+    ----------
+    state_to_quotient: np.ndarray
+        The quotient state of every original state
+    choice_matrix: sp.csr_matrix
+        Choice matrix of the quotient
+    row_groups: np.ndarray
+        Row groups of the quotient
+    choice_origin: np.ndarray
+        The original choice of every quotient choice, -1 for the added choices without successors
+    """
+
+    def __init__(self, state_to_quotient: np.ndarray, choice_matrix: sp.csr_matrix, row_groups: np.ndarray,
+                 choice_origin: np.ndarray):
+        self.state_to_quotient = state_to_quotient
+        self.choice_matrix = choice_matrix
+        self.row_groups = row_groups
+        self.choice_origin = choice_origin
+
+    @property
+    def num_states(self):
+        return len(self.row_groups) - 1
+
+    def restrict(self, choice_vector: np.ndarray) -> np.ndarray:
+        """
+        Maps a vector indexed by the original choices to the quotient choices, added choices get 0
+        """
+        return np.where(self.choice_origin >= 0, choice_vector[self.choice_origin], 0)
+
+    def lift(self, values: np.ndarray) -> np.ndarray:
+        """
+        Maps a vector indexed by the quotient states to the original states
+        """
+        return values[self.state_to_quotient]
+
+    def __repr__(self):
+        return f"MDPQuotient(states={self.num_states}, choices={len(self.choice_origin)})"
+
+
+def build_quotient(choice_matrix: sp.csr_matrix, row_groups: np.ndarray,
+                   mecs: List[Tuple[np.ndarray, np.ndarray]]) -> MDPQuotient:
+    """
+    Builds the quotient MDP in which every MEC is collapsed into a single state
+
+    Parameters
+    ----------
+    choice_matrix: sp.csr_matrix
+        Probability matrix whose rows are the choices and whose columns are the states
+    row_groups: np.ndarray
+        The choices of state i are the rows row_groups[i], ..., row_groups[i + 1] - 1
+    mecs: List[Tuple[np.ndarray, np.ndarray]]
+        The MECs as computed by compute_mecs
+
+    Returns
+    -------
+    MDPQuotient
+    """
+    n = len(row_groups) - 1
+    choice_state = np.repeat(np.arange(n, dtype=np.int64), np.diff(row_groups))
+    in_mec = np.zeros(n, dtype=np.bool_)
+    internal = np.zeros(len(choice_state), dtype=np.bool_)
+    for states, choices in mecs:
+        in_mec[states] = True
+        internal[choices] = True
+
+    # States outside of MECs keep their relative order and are followed by one state per MEC
+    state_to_quotient = np.empty(n, dtype=np.int64)
+    num_singletons = n - np.count_nonzero(in_mec)
+    state_to_quotient[~in_mec] = np.arange(num_singletons)
+    for idx, (states, _) in enumerate(mecs):
+        state_to_quotient[states] = num_singletons + idx
+    m = num_singletons + len(mecs)
+
+    kept = np.flatnonzero(~internal)
+    kept = kept[np.argsort(state_to_quotient[choice_state[kept]], kind="stable")]
+    counts = np.bincount(state_to_quotient[choice_state[kept]], minlength=m)
+    # Collapsed states without leaving choices get a choice without successors
+    sinks = np.flatnonzero(counts == 0)
+    choice_origin = np.insert(kept, np.searchsorted(state_to_quotient[choice_state[kept]], sinks), -1)
+    counts[sinks] = 1
+    quotient_row_groups = np.zeros(m + 1, dtype=np.int64)
+    np.cumsum(counts, out=quotient_row_groups[1:])
+
+    aggregation = sp.csr_matrix((np.ones(n), (np.arange(n), state_to_quotient)), shape=(n, m))
+    rows = sp.csr_matrix((np.ones(len(kept)), (np.flatnonzero(choice_origin >= 0), kept)),
+                         shape=(len(choice_origin), choice_matrix.shape[0]))
+    quotient_matrix = (rows @ choice_matrix @ aggregation).tocsr()
+    return MDPQuotient(state_to_quotient, quotient_matrix, quotient_row_groups, choice_origin)
@@ -0,0 +1,130 @@
+import numpy as np
+import scipy.sparse as sp
+
+from vnmc.common.graph import CSRAdjacency
+from vnmc.common.graph_algorithms import reachable
+
+
+def _positive_choices(choice_matrix: sp.csr_matrix) -> sp.csr_matrix:
+    positive = (choice_matrix > 0).astype(np.float64)
+    return positive.tocsr()
+
+
+def _backward_adjacency(choice_matrix: sp.csr_matrix, row_groups: np.ndarray) -> CSRAdjacency:
+    """
+    Computes the predecessor adjacency of the underlying graph of the MDP, i.e. the union over all actions
+    """
+    positive = _positive_choices(choice_matrix).tocoo()
+    choice_state = np.repeat(np.arange(len(row_groups) - 1, dtype=np.int64), np.diff(row_groups))
+    return CSRAdjacency(len(row_groups) - 1, positive.col, choice_state[positive.row])
+
+
+def _hits(positive: sp.csr_matrix, mask: np.ndarray) -> np.ndarray:
+    """
+    Returns for every choice whether it moves to a state of the mask with positive probability
+    """
+    return positive.dot(mask.astype(np.float64)) > 0
+
+
+def compute_prob0a(choice_matrix: sp.csr_matrix, row_groups: np.ndarray, bad_mask: np.ndarray,
+                   target_mask: np.ndarray) -> np.ndarray:
+    """
+    Computes the states that reach the target states while avoiding the bad states with probability 0 under all
+    schedulers, i.e. the states with maximal probability 0
+
+    Parameters
+    ----------
+    choice_matrix: sp.csr_matrix
+        Probability matrix whose rows are the choices and whose columns are the states
+    row_groups: np.ndarray
+        The choices of state i are the rows row_groups[i], ..., row_groups[i + 1] - 1
+    bad_mask: np.ndarray
+        Boolean mask of the bad states
+    target_mask: np.ndarray
+        Boolean mask of the target states
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask of the states with maximal reachability probability 0
+    """
+    return ~reachable(_backward_adjacency(choice_matrix, row_groups), target_mask, allowed=~bad_mask & ~target_mask)
+
+
+def compute_prob0e(choice_matrix: sp.csr_matrix, row_groups: np.ndarray, bad_mask: np.ndarray,
+                   target_mask: np.ndarray) -> np.ndarray:
+    """
+    Computes the states for which some scheduler reaches the target states while avoiding the bad states with
+    probability 0, i.e. the states with minimal probability 0. These are the states that cannot be forced to move
+    towards the target states.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask of the states with minimal reachability probability 0
+    """
+    positive = _positive_choices(choice_matrix)
+    allowed = ~bad_mask & ~target_mask
+    forced = target_mask.copy()
+    while True:
+        updated = target_mask | (allowed & np.logical_and.reduceat(_hits(positive, forced), row_groups[:-1]))
+        if np.array_equal(updated, forced):
+            return ~forced
+        forced = updated
+
+
+def compute_prob1e(choice_matrix: sp.csr_matrix, row_groups: np.ndarray, bad_mask: np.ndarray,
+                   target_mask: np.ndarray, prob0: np.ndarray = None) -> np.ndarray:
+    """
+    Computes the states for which some scheduler reaches the target states while avoiding the bad states with
+    probability 1, i.e. the states with maximal probability 1. The greatest fixpoint repeatedly removes the states
+    that cannot reach the target states with choices that never leave the current candidate set.
+
+    Parameters
+    ----------
+    prob0: np.ndarray
+        Result of compute_prob0a, computed if not provided
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask of the states with maximal reachability probability 1
+    """
+    prob0 = compute_prob0a(choice_matrix, row_groups, bad_mask, target_mask) if prob0 is None else prob0
+    positive = _positive_choices(choice_matrix)
+    choice_state = np.repeat(np.arange(len(row_groups) - 1, dtype=np.int64), np.diff(row_groups))
+    allowed = ~bad_mask & ~target_mask
+    candidates = ~prob0
+    while True:
+        staying = ~_hits(positive, ~candidates) & candidates[choice_state]
+        attractor = target_mask.copy()
+        while True:
+            progressing = staying & _hits(positive, attractor)
+            updated = target_mask | (allowed & np.logical_or.reduceat(progressing, row_groups[:-1]))
+            if np.array_equal(updated, attractor):
+                break
+            attractor = updated
+        if np.array_equal(attractor, candidates):
+            return candidates
+        candidates = attractor
+
+
+def compute_prob1a(choice_matrix: sp.csr_matrix, row_groups: np.ndarray, bad_mask: np.ndarray,
+                   target_mask: np.ndarray, prob0: np.ndarray = None) -> np.ndarray:
+    """
+    Computes the states that reach the target states while avoiding the bad states with probability 1 under all
+    schedulers, i.e. the states with minimal probability 1. These are the states from which no state with minimal
+    probability 0 can be reached.
+
+    Parameters
+    ----------
+    prob0: np.ndarray
+        Result of compute_prob0e, computed if not provided
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask of the states with minimal reachability probability 1
+    """
+    prob0 = compute_prob0e(choice_matrix, row_groups, bad_mask, target_mask) if prob0 is None else prob0
+    return ~reachable(_backward_adjacency(choice_matrix, row_groups), prob0, allowed=~bad_mask & ~target_mask)
@@ -0,0 +1,236 @@
+from typing import Dict, List, Set, Tuple
+
+from vnmc.timp.command import Command, CommandVisitor, Configuration, ConfigurationPacker, SkipCommand, \
+    SequentialCompositionCommand
+from vnmc.timp.expr import BooleanExpressionVisitor, Variable
+from vnmc.timp.module import Module
+
+
+class _ExprCompiler(BooleanExpressionVisitor):
+    """
+    Translates an expression to Python source evaluating it to 0 or 1 on the packed valuation v
+    """
+
+    def __init__(self, variable_to_bit: Dict[Variable, int]):
+        self.variable_to_bit = variable_to_bit
+
+    def visit_variable(self, element):
+        return f"(v >> {self.variable_to_bit[element]} & 1)"
+
+    def visit_constant(self, element):
+        return "1" if element.value else "0"
+
+    def visit_conjunction(self, element, expr1, expr2):
+        return f"({expr1} & {expr2})"
+
+    def visit_disjunction(self, element, expr1, expr2):
+        return f"({expr1} | {expr2})"
+
+    def visit_negation(self, element, expr):
+        return f"(1 ^ {expr})"
+
+    def visit_brackets(self, element, expr):
+        return expr
+
+
+class _StepTree(CommandVisitor):
+    """
+    Computes the decision tree of one step of a command, mirroring Command.get_successors. Inner nodes are triples
+    (condition, tree, tree) branching on a boolean expression, leaves are pairs of the assignments of the step, as a
+    mapping from variables to expressions, and the command that is executed next.
+    """
+
+    def visit_skip(self, element):
+        return dict(), element
+
+    def visit_assignment(self, element, variable, expr):
+        return {element.variable: element.expr}, SkipCommand()
+
+    def visit_sequential_composition(self, element, command1, command2):
+        if isinstance(element.command1, SkipCommand):
+            return command2
+        return _map_leaves(command1, lambda leaf: (leaf[0], element.command2 if isinstance(leaf[1], SkipCommand) else
+                                                   SequentialCompositionCommand(command1=leaf[1],
+                                                                                command2=element.command2)))
+
+    def visit_if_else(self, element, expr, command1, command2):
+        return element.expr, command1, command2
+
+    def visit_repeat(self, element, command):
+        # A body that reaches skip without assigning, e.g. repeat skip, yields a self-loop location
+        return _map_leaves(command, lambda leaf: (leaf[0], element if isinstance(leaf[1], SkipCommand) else
+                                                  SequentialCompositionCommand(command1=leaf[1], command2=element)))
+
+
+class _AnnotationTree(CommandVisitor):
+    """
+    Computes the decision tree of the annotations of a command, mirroring Command.get_annotations. Leaves are the
+    sets of annotations.
+    """
+
+    def visit_skip(self, element):
+        return element.annotations
+
+    def visit_assignment(self, element, variable, expr):
+        return element.annotations
+
+    def visit_sequential_composition(self, element, command1, command2):
+        return _map_leaves(command1, lambda annotations: annotations.union(element.annotations))
+
+    def visit_if_else(self, element, expr, command1, command2):
+        return element.expr, command1, command2
+
+    def visit_repeat(self, element, command):
+        return _map_leaves(command, lambda annotations: annotations.union(element.annotations))
+
+
+def _map_leaves(tree, f):
+    if isinstance(tree, tuple) and len(tree) == 3:
+        return tree[0], _map_leaves(tree[1], f), _map_leaves(tree[2], f)
+    return f(tree)
+
+
+def _leaves(tree):
+    if isinstance(tree, tuple) and len(tree) == 3:
+        yield from _leaves(tree[1])
+        yield from _leaves(tree[2])
+    else:
+        yield tree
+
+
+def build_decision_trees(command: Command) -> Tuple[List[Command], List, List]:
+    """
+    Enumerates the control locations reachable from a command in breadth-first order and computes the decision trees
+    of their steps and annotations. Inner nodes of the trees are triples (condition, tree, tree), the leaves of a step
+    tree are pairs of the assignments and the next location, the leaves of an annotation tree are sets of annotations.
+    Conditions and assigned expressions are kept as boolean expressions, every backend encodes them on its own.
+
+    Parameters
+    ----------
+    command: Command
+        The initial location
+
+    Returns
+    -------
+    Tuple[List[Command], List, List]
+        The locations, the step tree of every location and the annotation tree of every location
+    """
+    step_visitor, annotation_visitor = _StepTree(), _AnnotationTree()
+    locations, seen = [command], {command}
+    steps, labels = [], []
+    for location in locations:
+        step = location.accept_visitor(step_visitor)
+        for _, next_command in _leaves(step):
+            if next_command not in seen:
+                seen.add(next_command)
+                locations.append(next_command)
+        steps.append(step)
+        labels.append(location.accept_visitor(annotation_visitor))
+    return locations, steps, labels
+
+
+def _tree_to_source(tree, expr_compiler, leaf_to_source):
+    if isinstance(tree, tuple) and len(tree) == 3:
+        condition, tree1, tree2 = tree
+        return f"({_tree_to_source(tree1, expr_compiler, leaf_to_source)} if {condition.accept(expr_compiler)} " \
+               f"else {_tree_to_source(tree2, expr_compiler, leaf_to_source)})"
+    return leaf_to_source(tree)
+
+
+class ControlFlowGraph:
+    """
+    Control-flow graph of a TIMP module. The locations are the commands that remain to be executed, as enumerated by
+    executing the module from its initial command. Configurations are identified by their packed keys (see
+    ConfigurationPacker), where the program counter is the index of the location. For every location, the step and
+    the annotations are compiled once to Python functions on packed valuations, hence computing the successor of a
+    configuration is a table lookup followed by a few bit operations.
+
+    Parameters
+    ----------
+    packer: ConfigurationPacker
+        The packer whose program counters are the locations
+    steps: List
+        The compiled step of every location, mapping a packed valuation to the packed key of the successor
+    labels: List
+        The compiled annotations of every location, mapping a packed valuation to a set of annotations
+    """
+
+    def __init__(self, packer: ConfigurationPacker, steps: List, labels: List):
+        self.packer = packer
+        self.steps = steps
+        self.labels = labels
+        self._valuation_mask = (1 << packer.num_bits) - 1
+
+    @property
+    def locations(self) -> List[Command]:
+        return self.packer.pc_to_command
+
+    @property
+    def variables(self) -> List[Variable]:
+        return self.packer.variables
+
+    @property
+    def num_bits(self) -> int:
+        return self.packer.num_bits
+
+    @property
+    def initial(self) -> int:
+        # The initial location has program counter 0 and all variables are false
+        return 0
+
+    def get_successors(self, key: int) -> List[int]:
+        return [self.steps[key >> self.packer.num_bits](key & self._valuation_mask)]
+
+    def get_annotations(self, key: int) -> Set[str]:
+        return self.labels[key >> self.packer.num_bits](key & self._valuation_mask)
+
+    def get_true_variables(self, key: int) -> List[Variable]:
+        return [v for idx, v in enumerate(self.variables) if key >> idx & 1]
+
+    def to_configuration(self, key: int) -> Configuration:
+        return self.packer.unpack(key)
+
+    def __repr__(self):
+        return f"ControlFlowGraph(locations={len(self.locations)}, variables={self.num_bits})"
+
+
+def compile_module(module: Module) -> ControlFlowGraph:
+    """
+    Compiles a module to its control-flow graph
+
+    Parameters
+    ----------
+    module: Module
+        Module
+
+    Returns
+    -------
+    ControlFlowGraph
+    """
+    variables = sorted(module.variables, key=lambda v: v.name)
+    packer = ConfigurationPacker(variables)
+    expr_compiler = _ExprCompiler(packer.variable_to_bit)
+    locations, step_trees, label_trees = build_decision_trees(module.command)
+    for location in locations:
+        packer.get_pc(location)
+    steps, labels = [], []
+
+    def step_leaf_to_source(leaf):
+        update, next_command = leaf
+        assigned = sum(1 << packer.variable_to_bit[variable] for variable in update)
+        terms = [str(packer.get_pc(next_command) << packer.num_bits), f"(v & {~assigned})"]
+        terms += [f"({expr.accept(expr_compiler)} << {packer.variable_to_bit[variable]})"
+                  for variable, expr in update.items()]
+        return "(" + " | ".join(terms) + ")"
+
+    def annotation_leaf_to_source(annotations):
+        constants.append(annotations)
+        return f"_annotations[{len(constants) - 1}]"
+
+    for step_tree, label_tree in zip(step_trees, label_trees):
+        constants = []
+        step_source = _tree_to_source(step_tree, expr_compiler, step_leaf_to_source)
+        label_source = _tree_to_source(label_tree, expr_compiler, annotation_leaf_to_source)
+        steps.append(eval(f"lambda v: {step_source}"))
+        labels.append(eval(f"lambda v: {label_source}", {"_annotations": constants}))
+    return ControlFlowGraph(packer, steps, labels)
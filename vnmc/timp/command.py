@@ -2,6 +2,7 @@ import abc
 from typing import Dict, List
 
 from vnmc.timp.expr import Variable, BooleanExpression, ExpressionEvaluator
+from vnmc.timp.hash_consing import HashConsed
 
 import copy
 
@@ -27,7 +28,53 @@ class Configuration:
         return False
 
     def __hash__(self):
-        return hash(self.command)
+        return hash((self.command, frozenset(self.state.items())))
+
+
+class ConfigurationPacker:
+    """
+    Packs configurations into single integers for state-space exploration. The program counter is the id of the
+    command that remains to be executed, which is interned on first use, and the valuation is stored bitwise, the i-th
+    bit being the value of the i-th variable. The packed key is pc * 2^n + valuation for n variables, hence keys are
+    compact, hash without collisions and compare in constant time.
+
+    Parameters
+    ----------
+    variables: List[Variable]
+        The variables of the module, their order determines the bit positions
+    """
+
+    def __init__(self, variables: List[Variable]):
+        self.variables = list(variables)
+        self.num_bits = len(self.variables)
+        self.variable_to_bit: Dict[Variable, int] = {v: idx for idx, v in enumerate(self.variables)}
+        self.pc_to_command: List[Command] = []
+        self.command_to_pc: Dict[Command, int] = dict()
+
+    def get_pc(self, command) -> int:
+        pc = self.command_to_pc.get(command)
+        if pc is None:
+            pc = len(self.pc_to_command)
+            self.command_to_pc[command] = pc
+            self.pc_to_command.append(command)
+        return pc
+
+    def pack_state(self, state: Dict[Variable, bool]) -> int:
+        valuation = 0
+        for variable, value in state.items():
+            if value:
+                valuation |= 1 << self.variable_to_bit[variable]
+        return valuation
+
+    def unpack_state(self, valuation: int) -> Dict[Variable, bool]:
+        return {v: bool(valuation >> idx & 1) for idx, v in enumerate(self.variables)}
+
+    def pack(self, config: Configuration) -> int:
+        return self.get_pc(config.command) << self.num_bits | self.pack_state(config.state)
+
+    def unpack(self, key: int) -> Configuration:
+        return Configuration(command=self.pc_to_command[key >> self.num_bits],
+                             state=self.unpack_state(key & ((1 << self.num_bits) - 1)))
 
 
 class CommandVisitor(abc.ABC):
@@ -56,10 +103,21 @@ class CommandVisitor(abc.ABC):
         pass
 
 
-class Command(abc.ABC):
+class Command(HashConsed):
+    """
+    Commands are interned, structurally equal commands (including their annotations) are the same object. Hence,
+    annotations are passed on construction and never modified afterwards.
+    """
 
-    def __init__(self):
-        self.annotations = set()
+    def __init__(self, annotations=frozenset()):
+        self.annotations = frozenset(annotations)
+
+    def with_annotations(self, annotations):
+        """
+        Returns the command with the same sub-terms and the given annotations
+        """
+        arguments = {name: getattr(self, name) for name, _ in type(self)._parameters if name != "annotations"}
+        return type(self)(annotations=frozenset(annotations), **arguments)
 
     def accept_visitor(self, visitor: CommandVisitor):
         pass
@@ -88,20 +146,14 @@ class SkipCommand(Command):
     def get_successors(self, state: Dict[Variable, bool]) -> List[Configuration]:
         return [Configuration(command=self, state=copy.copy(state))]
 
-    def __eq__(self, other):
-        return isinstance(other, SkipCommand) and other.annotations == self.annotations
-
-    def __hash__(self):
-        return hash(frozenset(self.annotations))
-
     def get_annotations(self, state: Dict[Variable, bool]):
         return self.annotations
 
 
 class AssignmentCommand(Command):
 
-    def __init__(self, variable: Variable, expr: BooleanExpression):
-        super().__init__()
+    def __init__(self, variable: Variable, expr: BooleanExpression, annotations=frozenset()):
+        super().__init__(annotations)
         self.variable = variable
         self.expr = expr
 
@@ -118,22 +170,14 @@ class AssignmentCommand(Command):
         succ[self.variable] = self.expr.accept(ExpressionEvaluator(state))
         return [Configuration(command=SkipCommand(), state=succ)]
 
-    def __eq__(self, other):
-        if isinstance(other, AssignmentCommand):
-            return other.variable == self.variable and other.expr == self.expr and other.annotations == self.annotations
-        return False
-
-    def __hash__(self):
-        return hash(self.variable) + hash(self.expr)
-
     def get_annotations(self, state: Dict[Variable, bool]):
         return self.annotations
 
 
 class SequentialCompositionCommand(Command):
 
-    def __init__(self, command1: Command, command2: Command):
-        super().__init__()
+    def __init__(self, command1: Command, command2: Command, annotations=frozenset()):
+        super().__init__(annotations)
         self.command1 = command1
         self.command2 = command2
 
@@ -160,20 +204,11 @@ class SequentialCompositionCommand(Command):
     def get_annotations(self, state: Dict[Variable, bool]):
         return self.command1.get_annotations(state).union(self.annotations)
 
-    def __eq__(self, other):
-        if isinstance(other, SequentialCompositionCommand):
-            return other.command1 == self.command1 and other.command2 == self.command2 and \
-                other.annotations == self.annotations
-        return False
-
-    def __hash__(self):
-        return hash(self.command1) + hash(self.command2)
-
 
 class IfElseCommand(Command):
 
-    def __init__(self, expr: BooleanExpression, command1: Command, command2: Command):
-        super().__init__()
+    def __init__(self, expr: BooleanExpression, command1: Command, command2: Command, annotations=frozenset()):
+        super().__init__(annotations)
         self.expr = expr
         self.command1 = command1
         self.command2 = command2
@@ -193,15 +228,6 @@ class IfElseCommand(Command):
             return self.command1.get_successors(state)
         return self.command2.get_successors(state)
 
-    def __eq__(self, other):
-        if isinstance(other, IfElseCommand):
-            return other.expr == self.expr and other.command1 == self.command1 and other.command2 == self.command2 and\
-                self.annotations == other.annotations
-        return False
-
-    def __hash__(self):
-        return hash(self.expr) + hash(self.command1) + hash(self.command2)
-
     def get_annotations(self, state: Dict[Variable, bool]):
         if self.expr.accept(ExpressionEvaluator(state)):
             return self.command1.get_annotations(state)
@@ -210,8 +236,8 @@ class IfElseCommand(Command):
 
 class RepeatCommand(Command):
 
-    def __init__(self, command: Command):
-        super().__init__()
+    def __init__(self, command: Command, annotations=frozenset()):
+        super().__init__(annotations)
         self.command = command
 
     def accept_visitor(self, visitor: CommandVisitor):
@@ -225,14 +251,6 @@ class RepeatCommand(Command):
         unfolding = SequentialCompositionCommand(command1=self.command, command2=RepeatCommand(self.command))
         return unfolding.get_successors(state)
 
-    def __eq__(self, other):
-        if isinstance(other, RepeatCommand):
-            return other.command == self.command and other.annotations == self.annotations
-        return False
-
-    def __hash__(self):
-        return hash(self.command) + 1
-
     def get_annotations(self, state: Dict[Variable, bool]):
         return self.command.get_annotations(state).union(self.annotations)
 
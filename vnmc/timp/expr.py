@@ -1,6 +1,8 @@
 import abc
 from typing import Dict
 
+from vnmc.timp.hash_consing import HashConsed
+
 
 class BooleanExpressionVisitor(abc.ABC):
 
@@ -29,7 +31,10 @@ class BooleanExpressionVisitor(abc.ABC):
         pass
 
 
-class BooleanExpression(abc.ABC):
+class BooleanExpression(HashConsed):
+    """
+    Boolean expressions are interned, structurally equal expressions are the same object
+    """
 
     @abc.abstractmethod
     def accept(self, visitor: BooleanExpressionVisitor):
@@ -48,14 +53,6 @@ class Variable(BooleanExpression):
     def accept(self, visitor: BooleanExpressionVisitor):
         return visitor.visit_variable(self)
 
-    def __eq__(self, other):
-        if isinstance(other, Variable):
-            return other.name == self.name
-        return False
-
-    def __hash__(self):
-        return hash(self.name)
-
     def __str__(self):
         return self.name
 
@@ -79,14 +76,6 @@ class Constant(BooleanExpression):
             return "true"
         return "false"
 
-    def __eq__(self, other):
-        if isinstance(other, Constant):
-            return other.value == self.value
-        return False
-
-    def __hash__(self):
-        return hash(self.value)
-
 
 class Conjunction(BooleanExpression):
 
@@ -102,14 +91,6 @@ class Conjunction(BooleanExpression):
     def pretty(self):
         return f"{self.expr1.pretty()} and {self.expr2.pretty()}"
 
-    def __eq__(self, other):
-        if isinstance(other, Conjunction):
-            return other.expr1 == self.expr1 and other.expr2 == self.expr2
-        return False
-
-    def __hash__(self):
-        return hash(self.expr1) + hash(self.expr2)
-
 
 class Disjunction(BooleanExpression):
 
@@ -125,14 +106,6 @@ class Disjunction(BooleanExpression):
     def pretty(self):
         return f"{self.expr1.pretty()} or {self.expr2.pretty()}"
 
-    def __eq__(self, other):
-        if isinstance(other, Disjunction):
-            return other.expr1 == self.expr1 and other.expr2 == self.expr2
-        return False
-
-    def __hash__(self):
-        return hash(self.expr1) + hash(self.expr2)
-
 
 class Negation(BooleanExpression):
 
@@ -146,14 +119,6 @@ class Negation(BooleanExpression):
     def pretty(self):
         return f"!{self.expr.pretty()}"
 
-    def __eq__(self, other):
-        if isinstance(other, Negation):
-            return other.expr == self.expr
-        return False
-
-    def __hash__(self):
-        return hash(self.expr) + 1
-
 
 class Brackets(BooleanExpression):
 
@@ -167,14 +132,6 @@ class Brackets(BooleanExpression):
     def pretty(self):
         return f"({self.expr.pretty()})"
 
-    def __eq__(self, other):
-        if isinstance(other, Brackets):
-            return other.expr == self.expr
-        return False
-
-    def __hash__(self):
-        return hash(self.expr) + 2
-
 
 class ExpressionEvaluator(BooleanExpressionVisitor):
 
@@ -0,0 +1,51 @@
+import abc
+import inspect
+import weakref
+
+
+class HashConsMeta(abc.ABCMeta):
+    """
+    Metaclass interning the instances of its classes (hash-consing): constructing an instance whose class and
+    constructor arguments equal those of a live instance returns the live instance. Terms built from interned
+    sub-terms are therefore structurally equal if and only if they are identical, which allows identity equality and
+    a hash computed once at construction. The table holds its instances weakly, terms that are no longer referenced
+    are collected.
+
+    Constructor arguments need to be hashable, sets are converted to frozensets.
+    """
+
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+        cls._table = weakref.WeakValueDictionary()
+        parameters = list(inspect.signature(cls.__init__).parameters.values())[1:]
+        cls._parameters = tuple((p.name, p.default) for p in parameters)
+
+    def __call__(cls, *args, **kwargs):
+        if kwargs or len(args) != len(cls._parameters):
+            args = args + tuple(kwargs[name] if name in kwargs else default
+                                for name, default in cls._parameters[len(args):])
+        key = (cls,) + tuple(frozenset(arg) if isinstance(arg, set) else arg for arg in args)
+        instance = cls._table.get(key)
+        if instance is None:
+            instance = super().__call__(*key[1:])
+            instance._hash = hash(key)
+            cls._table[key] = instance
+        return instance
+
+
+class HashConsed(metaclass=HashConsMeta):
+    """
+    Base class of interned terms, which compare by identity and return the hash computed at construction
+    """
+
+    def __eq__(self, other):
+        return self is other
+
+    def __hash__(self):
+        return self._hash
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
@@ -95,9 +95,8 @@ class TIMPTransformer(lark.Transformer):
     def module_def(self, name, command):
         return Module(name=name, command=command)
 
-    def atomic_annotation(self, command, annotation):
-        command.annotations.add(annotation.value)
-        return command
+    def atomic_annotation(self, command, *annotations):
+        return command.with_annotations(command.annotations.union(annotation.value for annotation in annotations))
 
 
 if __name__ == "__main__":
@@ -2,10 +2,9 @@ from collections import deque
 
 from vnmc.common.automaton import GBA
 from vnmc.logics.ltl.utils import AP
-from vnmc.timp.command import Configuration
+from vnmc.timp.cfg import compile_module
 from vnmc.timp.module import Module
-from vnmc.timp.preprocessing import VariableCollector, AnnotationCollector
-from vnmc.utils import compute_powerset
+from vnmc.timp.preprocessing import AnnotationCollector
 
 
 def timp_to_gba(module: Module):
@@ -22,31 +21,27 @@ def timp_to_gba(module: Module):
     GBA
 
     """
-    alphabet = compute_powerset(module.command.accept_visitor(AnnotationCollector()))
-    gba = GBA(alphabet=set(map(frozenset, [map(AP, subset) for subset in alphabet])))
-    variables = module.command.accept_visitor(VariableCollector())
-    init_config = Configuration(command=module.command, state={v: False for v in variables})
-    queue = deque([init_config])
-    explored = set()
+    annotations = sorted(module.command.accept_visitor(AnnotationCollector()))
+    gba = GBA(atomic_propositions=[AP(annotation) for annotation in annotations])
+    cfg = compile_module(module)
+    queue = deque([cfg.initial])
     state_ids = 1
-    config_to_state = dict()
+    key_to_state = dict()
 
-    config_to_state[init_config] = gba.create_state(name="init", config=init_config)
-    gba.initial_states.add(config_to_state[init_config])
+    key_to_state[cfg.initial] = gba.create_state(name="init", config=cfg.to_configuration(cfg.initial))
+    gba.initial_states.add(key_to_state[cfg.initial])
 
-    # Start GBA creation
+    # Explore the packed configurations of the control-flow graph, a configuration is discovered when its state is
+    # created
     while queue:
         current = queue.popleft()
-        explored.add(current)
-
-        for config in current.get_successors():
-            if config not in explored:
-                queue.append(config)
-                config_to_state[config] = gba.create_state(name=f"q_{state_ids}", config=config)
+        guard = gba.letter_to_guard(map(AP, cfg.get_annotations(current)))
+        for key in cfg.get_successors(current):
+            if key not in key_to_state:
+                queue.append(key)
+                key_to_state[key] = gba.create_state(name=f"q_{state_ids}", config=cfg.to_configuration(key))
                 state_ids += 1
-            gba.create_transition(source=config_to_state[current],
-                                  letter=frozenset(map(AP, current.command.get_annotations(current.state))),
-                                  target=config_to_state[config])
+            gba.create_guarded_transition(source=key_to_state[current], guard=guard, target=key_to_state[key])
 
     gba.accepting_state_sets.append(set(gba.states))
 